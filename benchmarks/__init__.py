@@ -0,0 +1,4 @@
+"""Benchmarks for breeze_chms_api. Run them with python -m, e.g.
+
+  python -m benchmarks.join_dicts_bench
+"""
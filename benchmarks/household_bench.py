@@ -0,0 +1,75 @@
+"""Benchmark family values from a HouseholdIndex against _FamilyExtractor,
+which formats every name in every family list.
+
+'index' times building a HouseholdIndex and getting every profile's family
+value from it, which is what process_profiles(profiles, HouseholdIndex(profiles))
+pays; 'warm' times getting them from an index that was already used.
+
+Usage:
+  python -m benchmarks.household_bench [profile counts...]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import gc
+import json
+import sys
+import time
+from typing import Callable, List
+
+from breeze_chms_api.profile_helper import HouseholdIndex, _FamilyExtractor
+from tests.synthetic import load_sample_profile_fields, make_profiles
+
+DEFAULT_PROFILE_COUNTS = (1000, 20000, 100000)
+REPEATS = 10
+
+
+def best_times(funcs: List[Callable[[], object]]) -> List[float]:
+    """
+    :param funcs: Functions to time. What each returns is kept until it's
+                  timed, as process_profiles() keeps its values. They take
+                  turns, so a busy moment on the machine doesn't favor one.
+    :return: Fastest of REPEATS runs of each, in seconds
+    """
+    best = [None] * len(funcs)
+    for _ in range(REPEATS):
+        for index, func in enumerate(funcs):
+            gc.collect()
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            del result
+            best[index] = elapsed if best[index] is None else min(best[index], elapsed)
+    return best
+
+
+def main(profile_counts: List[int]) -> None:
+    print(f'{"profiles":>9} {"extractor ms":>13} {"index ms":>9} {"speedup":>8} '
+          f'{"warm ms":>8} {"speedup":>8}')
+    profile_fields = load_sample_profile_fields()
+    for count in profile_counts:
+        # As list_people() returns them, with no objects shared between profiles
+        profiles = json.loads(json.dumps(make_profiles(profile_fields, count)))
+        extractor = _FamilyExtractor()
+        warm_index = HouseholdIndex(profiles)
+        for profile in profiles:
+            if warm_index.family_value(profile) != extractor.get_value(profile):
+                raise AssertionError(f'Results differ for {profile["id"]}')
+
+        def plain():
+            return [extractor.get_value(p) for p in profiles]
+
+        def indexed():
+            households = HouseholdIndex(profiles)
+            return [households.family_value(p) for p in profiles]
+
+        def warm():
+            return [warm_index.family_value(p) for p in profiles]
+
+        old, new, hot = best_times([plain, indexed, warm])
+        print(f'{count:>9} {old * 1e3:>13.1f} {new * 1e3:>9.1f} {old / new:>7.2f}x '
+              f'{hot * 1e3:>8.1f} {old / hot:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or list(DEFAULT_PROFILE_COUNTS))
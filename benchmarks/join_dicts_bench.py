@@ -0,0 +1,110 @@
+"""Benchmark profile_helper.join_dicts() against the original OrderedDict version.
+
+Usage:
+  python -m benchmarks.join_dicts_bench [sizes...]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import random
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from breeze_chms_api.profile_helper import join_dicts
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+REPEATS = 5
+
+
+def _pop_next(dct: OrderedDict) -> Tuple[object, object]:
+    try:
+        return dct.popitem(last=False)
+    except KeyError:
+        return None, None
+
+
+def legacy_join_dicts(values_right: dict, values_left: dict) -> dict:
+    """join_dicts() as it was before it was rewritten, for comparison."""
+    dat_left = OrderedDict(values_left if values_left else {})
+    dat_right = OrderedDict(values_right if values_right else {})
+    key_left, val_left = _pop_next(dat_left)
+    key_right, val_right = _pop_next(dat_right)
+    result = {}
+
+    while key_left or key_right:
+        if key_left == key_right:
+            result[key_right] = (val_right, val_left)
+            key_left, val_left = _pop_next(dat_left)
+            key_right, val_right = _pop_next(dat_right)
+        elif key_left in dat_right:
+            result[key_left] = (dat_right.pop(key_left), val_left)
+            key_left, val_left = _pop_next(dat_left)
+        elif key_right in dat_left:
+            dat_right[key_right] = val_right
+            key_right, val_right = _pop_next(dat_right)
+            result[key_left] = (None, val_left)
+            key_left, val_left = _pop_next(dat_left)
+        else:
+            if key_right:
+                result[key_right] = (val_right, None)
+                key_right, val_right = _pop_next(dat_right)
+            if key_left:
+                result[key_left] = (None, val_left)
+                key_left, val_left = _pop_next(dat_left)
+
+    return result
+
+
+def make_inputs(size: int, seed: int = 0) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Build two dicts that look like two snapshots of the same people:
+    mostly the same keys in mostly the same order, with a few removed,
+    added and moved.
+    :param size: Number of keys in each dict
+    :param seed: Random seed
+    :return: (reference, current)
+    """
+    rng = random.Random(seed)
+    keys = [str(10000000 + k) for k in range(size)]
+    current = list(keys)
+    changes = max(1, size // 20)
+    for index in sorted(rng.sample(range(size), changes), reverse=True):
+        del current[index]
+    current.extend(str(20000000 + k) for k in range(changes))
+    for _ in range(changes):
+        key = current.pop(rng.randrange(len(current)))
+        current.insert(rng.randrange(len(current)), key)
+    return ({k: f'ref {k}' for k in keys},
+            {k: f'cur {k}' for k in current})
+
+
+def best_time(func: Callable, *args) -> float:
+    """
+    :param func: Function to time
+    :return: Fastest of REPEATS calls, in seconds
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes: List[int]) -> None:
+    print(f'{"keys":>8} {"legacy ms":>10} {"new ms":>10} {"speedup":>8}')
+    for size in sizes:
+        right, left = make_inputs(size)
+        if list(join_dicts(right, left).items()) != \
+                list(legacy_join_dicts(right, left).items()):
+            raise AssertionError(f'Results differ at {size} keys')
+        old = best_time(legacy_join_dicts, right, left)
+        new = best_time(join_dicts, right, left)
+        print(f'{size:>8} {old * 1000:>10.2f} {new * 1000:>10.2f} {old / new:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or list(DEFAULT_SIZES))
@@ -0,0 +1,115 @@
+"""Measure the memory ProfileHelper's output takes per profile, and what
+the ProfileHelper itself takes.
+
+Profiles are parsed one at a time from JSON, as they would be when read
+from Breeze or a saved file, so extracted values don't share string
+objects unless ProfileHelper makes them. Compares:
+  - process_profiles() without interning
+  - process_profiles()
+  - process_profiles_columnar()
+
+Extractors' __slots__ don't change the output, since there's one extractor
+per field, not per profile. They're measured by building the ProfileHelper
+with extractor classes that keep their attributes in a __dict__, as before
+1.5.0.
+
+Usage:
+  python -m benchmarks.memory_bench [profile count]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Callable, Iterable, List
+
+from breeze_chms_api import profile_helper
+from breeze_chms_api.profile_helper import ProfileHelper
+from tests.synthetic import make_profile_fields, make_profiles
+
+DEFAULT_PROFILES = 50000
+FIELDS = 120
+
+
+def measure(build: Callable[[Iterable[dict]], object], lines: List[str]) -> int:
+    """
+    :param build: Function that processes profiles
+    :param lines: Profiles, each as a JSON string
+    :return: Bytes still allocated for build's result when it's done
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build(json.loads(line) for line in lines)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _without_slots(cls: type) -> type:
+    """
+    :param cls: An extractor class
+    :return: A class that works the same, but without __slots__
+    """
+    namespace = {}
+    for base in reversed(cls.__mro__[:-1]):
+        slots = vars(base).get('__slots__', ())
+        namespace.update((name, value) for name, value in vars(base).items()
+                         if name not in slots and name not in
+                         ('__slots__', '__dict__', '__weakref__'))
+    return type(cls.__name__, (object,), namespace)
+
+
+def helper_size(profile_fields: List[dict], slots: bool = True) -> int:
+    """
+    :param profile_fields: Profile fields to build a ProfileHelper for
+    :param slots: If False, use extractors without __slots__
+    :return: Bytes allocated for the ProfileHelper
+    """
+    saved = (profile_helper._extractors, profile_helper._NameExtractor,
+             profile_helper._FamilyExtractor)
+    if not slots:
+        profile_helper._extractors = {field_type: _without_slots(cls) for field_type, cls
+                                      in profile_helper._extractors.items()}
+        profile_helper._NameExtractor = _without_slots(profile_helper._NameExtractor)
+        profile_helper._FamilyExtractor = _without_slots(profile_helper._FamilyExtractor)
+    try:
+        return measure(lambda _: ProfileHelper(profile_fields), [])
+    finally:
+        (profile_helper._extractors, profile_helper._NameExtractor,
+         profile_helper._FamilyExtractor) = saved
+
+
+def main(count: int) -> None:
+    profile_fields = make_profile_fields(FIELDS)
+    helper = ProfileHelper(profile_fields)
+    lines = [json.dumps(p) for p in make_profiles(profile_fields, count)]
+
+    profile_helper.intern = lambda value: value
+    try:
+        before = measure(helper.process_profiles, lines)
+    finally:
+        profile_helper.intern = sys.intern
+    after = measure(helper.process_profiles, lines)
+    columnar = measure(helper.process_profiles_columnar, lines)
+
+    unslotted = helper_size(profile_fields, slots=False)
+    slotted = helper_size(profile_fields)
+
+    print(f'{count} profiles, {FIELDS} fields; bytes per profile:')
+    print(f'  {"process_profiles(), no interning":<36} {before / count:>8.0f}')
+    print(f'  {"process_profiles()":<36} {after / count:>8.0f}'
+          f'  ({after / before:.0%})')
+    print(f'  {"process_profiles_columnar()":<36} {columnar / count:>8.0f}'
+          f'  ({columnar / before:.0%})')
+    print('Bytes per ProfileHelper:')
+    print(f'  {"extractors without __slots__":<36} {unslotted:>8}')
+    print(f'  {"extractors with __slots__":<36} {slotted:>8}'
+          f'  ({slotted / unslotted:.0%})')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PROFILES)
@@ -0,0 +1,14 @@
+"""Run a mock Breeze server (tests.mock_breeze) for other programs to use.
+
+Usage:
+  python -m benchmarks.mock_server [people] [latency]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import sys
+
+from tests.mock_breeze import main
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+"""Benchmark ProfileHelper.process_member_profile() against the original
+field-by-field version, on synthetic schemas of realistic size.
+
+Usage:
+  python -m benchmarks.process_profiles_bench [field counts...]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import sys
+import time
+from typing import Callable, List
+
+from breeze_chms_api.profile_helper import ProfileHelper, _delist, _extract_name
+from tests.synthetic import make_profile_fields, make_profiles
+
+DEFAULT_FIELD_COUNTS = (50, 120, 250)
+PROFILES = 5000
+REPEATS = 3
+
+
+def legacy_process_member_profile(helper: ProfileHelper, profile: dict) -> dict:
+    """process_member_profile() as it was before the extraction plan."""
+    result = {'name': _extract_name(profile)}
+    for field_id, extractor in helper.id_to_field.items():
+        if extractor.in_details:
+            value = _delist(extractor._value_from_details(profile.get('details')))
+        else:
+            value = extractor.get_value(profile)
+        if value:
+            result[field_id] = value
+    return result
+
+
+def best_time(func: Callable, profiles: List[dict]) -> float:
+    """
+    :param func: Function to run on each profile
+    :param profiles: Profiles
+    :return: Fastest of REPEATS runs over all profiles, in seconds
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for profile in profiles:
+            func(profile)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(field_counts: List[int]) -> None:
+    print(f'{"fields":>7} {"legacy us":>10} {"new us":>10} {"speedup":>8}  (per profile)')
+    for field_count in field_counts:
+        profile_fields = make_profile_fields(field_count)
+        profiles = make_profiles(profile_fields, PROFILES)
+        helper = ProfileHelper(profile_fields)
+        for profile in profiles[:100]:
+            if list(helper.process_member_profile(profile).items()) != \
+                    list(legacy_process_member_profile(helper, profile).items()):
+                raise AssertionError(f'Results differ for {profile["id"]}')
+        old = best_time(lambda p: legacy_process_member_profile(helper, p), profiles)
+        new = best_time(helper.process_member_profile, profiles)
+        print(f'{field_count:>7} {old / PROFILES * 1e6:>10.1f} '
+              f'{new / PROFILES * 1e6:>10.1f} {old / new:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or list(DEFAULT_FIELD_COUNTS))
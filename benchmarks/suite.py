@@ -0,0 +1,226 @@
+"""Benchmark suite for the hot paths in breeze_chms_api.
+
+Times each case on synthetic accounts of several sizes, with profiles shaped
+like the sample account in tests/test_files/profiles.json, and reports
+throughput (items per second) and peak memory. Results can be saved as
+JSON and compared with an earlier run, e.g. from the previous release:
+
+  python -m benchmarks.suite --output before.json
+  (change something)
+  python -m benchmarks.suite --output after.json --compare before.json
+
+Usage:
+  python -m benchmarks.suite [--sizes 1000 10000 100000] [--cases ...]
+                             [--output FILE] [--compare FILE] [--no-memory]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple
+
+from breeze_chms_api import json_stream
+from breeze_chms_api.breeze import _transform_settings
+from breeze_chms_api.profile_helper import (ProfileHelper, compare_profiles, join_dicts,
+                                            profile_compare)
+from tests.synthetic import (load_sample_profile_fields, make_later_profiles,
+                             make_profiles)
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Total items timed per case and size; small sizes are repeated to reach it
+# (at least once, at most MAX_REPEATS times) and the fastest run is kept.
+TARGET_ITEMS = 100000
+MAX_REPEATS = 5
+# Chunk size for the streaming parse case, as BreezeApi uses
+STREAM_CHUNK = 64 * 1024
+
+
+class Account(object):
+    """Synthetic data for one size, shared by the cases."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.profile_fields = load_sample_profile_fields()
+        self.helper = ProfileHelper(self.profile_fields)
+        self.contact_helper = ProfileHelper(self.profile_fields, sections=['Communication'])
+        self.prev_people = make_profiles(self.profile_fields, size)
+        self.cur_people = make_later_profiles(self.profile_fields, self.prev_people)
+        self.prev_values = self.helper.process_profiles(self.prev_people)
+        self.cur_values = self.helper.process_profiles(self.cur_people)
+        self.diffs = join_dicts(self.prev_values, self.cur_values)
+        self.field_names = self.helper.get_field_id_to_name()
+        self.people_json = json.dumps(self.prev_people).encode('utf-8')
+        self.params = [{
+            'date': '2024-03-03',
+            'person_id': person['id'],
+            'amount': '50.00',
+            'method': 'Check',
+            'batch_name': 'Week 10',
+            'funds_json': [{'id': '500', 'amount': '40.00'},
+                           {'id': '501', 'amount': '10.00'}],
+            'fields_json': [{'field_id': '2114298714', 'field_type': 'single_line',
+                             'response': 'Usher'}],
+            'filter_json': {'2114298898': '1', 'tag_contains': 'y_900000'},
+            'limit': 500,
+        } for person in self.prev_people]
+
+
+def _stream_people(account: Account) -> None:
+    chunks = (account.people_json[i:i + STREAM_CHUNK]
+              for i in range(0, len(account.people_json), STREAM_CHUNK))
+    for _ in json_stream.iter_array(chunks):
+        pass
+
+
+def _transform(account: Account) -> None:
+    for params in account.params:
+        _transform_settings(params)
+
+
+class Case(NamedTuple):
+    name: str
+    # What the items counted for throughput are
+    unit: str
+    run: Callable[[Account], object]
+
+
+CASES = [
+    Case('transform_settings', 'calls', _transform),
+    Case('process_profiles', 'profiles',
+         lambda a: a.helper.process_profiles(a.prev_people)),
+    Case('process_profiles_section', 'profiles',
+         lambda a: a.contact_helper.process_profiles(a.prev_people)),
+    Case('process_profiles_columnar', 'profiles',
+         lambda a: a.helper.process_profiles_columnar(a.prev_people)),
+    Case('join_dicts', 'keys', lambda a: join_dicts(a.prev_values, a.cur_values)),
+    Case('profile_compare', 'profiles',
+         lambda a: profile_compare(a.diffs, a.field_names)),
+    Case('compare_profiles', 'profiles',
+         lambda a: compare_profiles(a.helper, a.helper, a.prev_people, a.cur_people)),
+    Case('stream_people', 'profiles', _stream_people),
+]
+
+
+def best_time(run: Callable[[], object], repeats: int) -> float:
+    """
+    :param run: Function to time
+    :param repeats: Number of runs
+    :return: Seconds taken by the fastest run
+    """
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(run: Callable[[], object]) -> int:
+    """
+    :param run: Function to measure
+    :return: Most memory allocated at once while it ran, in bytes, beyond
+             what was allocated before it started (including its result)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = run()
+        peak = tracemalloc.get_traced_memory()[1]
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def run_suite(sizes: List[int], cases: List[Case], memory: bool = True,
+              log: Callable[[str], None] = print) -> dict:
+    """
+    Run the benchmarks.
+    :param sizes: Numbers of people
+    :param cases: Cases to run
+    :param memory: If False, skip the (slow) peak memory measurements
+    :param log: Called with a line of text as each result is ready
+    :return: Results, ready to save as JSON
+    """
+    results = []
+    log(f'{"case":<26} {"size":>7} {"seconds":>9} {"per second":>12} {"peak MB":>8}')
+    for size in sizes:
+        account = Account(size)
+        repeats = max(1, min(MAX_REPEATS, TARGET_ITEMS // size))
+        for case in cases:
+            seconds = best_time(lambda: case.run(account), repeats)
+            peak = peak_memory(lambda: case.run(account)) if memory else None
+            result = {'case': case.name, 'size': size, 'unit': case.unit,
+                      'seconds': seconds,
+                      'per_second': size / seconds if seconds else None,
+                      'peak_bytes': peak}
+            results.append(result)
+            log(f'{case.name:<26} {size:>7} {seconds:>9.4f} '
+                f'{result["per_second"]:>12,.0f} '
+                f'{peak / 1e6 if peak is not None else float("nan"):>8.1f}')
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(before: dict, after: dict, log: Callable[[str], None] = print) -> None:
+    """
+    Report how throughput and memory changed between two runs.
+    :param before: Results of the earlier run
+    :param after: Results of the later run
+    :param log: Called with each line of the report
+    """
+    def ratio(new, old) -> str:
+        return f'{new / old:.2f}x' if new is not None and old else '-'
+
+    earlier = {(r['case'], r['size']): r for r in before['results']}
+    log(f'{"case":<26} {"size":>7} {"speed":>8} {"memory":>8}')
+    for result in after['results']:
+        old = earlier.get((result['case'], result['size']))
+        if old:
+            log(f'{result["case"]:<26} {result["size"]:>7} '
+                f'{ratio(old["seconds"], result["seconds"]):>8} '
+                f'{ratio(result["peak_bytes"], old["peak_bytes"]):>8}')
+    log('(speed: how many times faster than before; memory: peak now / peak before)')
+
+
+def main(args: List[str]) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite',
+                                     description='Benchmark breeze_chms_api hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Numbers of people to try')
+    parser.add_argument('--cases', nargs='+', choices=[c.name for c in CASES],
+                        help='Cases to run (default all)')
+    parser.add_argument('--output', help='Save results to this JSON file')
+    parser.add_argument('--compare', help='Compare with results saved earlier')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Don't measure peak memory")
+    options = parser.parse_args(args)
+
+    cases = [c for c in CASES if not options.cases or c.name in options.cases]
+    results = run_suite(options.sizes, cases, memory=not options.no_memory)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if options.compare:
+        with open(options.compare, 'r') as f:
+            before: Dict = json.load(f)
+        print()
+        compare(before, results)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,204 @@
+"""Asyncio wrapper for the Breeze ChMS API.
+
+AsyncBreezeApi exposes the same calls as BreezeApi, but as coroutines, so
+that many requests can be in flight at once. For example:
+
+  from breeze_chms_api import async_breeze
+
+  async def main():
+      async with async_breeze.async_breeze_api(concurrency=8) as api:
+          people = await api.list_people()
+          details = await api.gather_person_details([p['id'] for p in people])
+
+  asyncio.run(main())
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Union
+
+from .breeze import BreezeApi, breeze_api
+
+# Default maximum number of requests in flight at once.
+DEFAULT_CONCURRENCY = 8
+
+# BreezeApi methods that have an async equivalent in AsyncBreezeApi.
+_ASYNC_METHODS = (
+    'get_account_summary',
+    'list_people',
+    'refresh_profile_fields',
+    'get_profile_fields',
+    'get_field_spec_by_id',
+    'get_field_spec_by_name',
+    'get_person_details',
+    'field_value_from_name',
+    'add_person',
+    'update_person',
+    'list_calendars',
+    'list_events',
+    'list_event',
+    'add_event',
+    'event_check_in',
+    'event_check_out',
+    'delete_attendance',
+    'list_attendance',
+    'list_eligible_people',
+    'add_contribution',
+    'edit_contribution',
+    'delete_contribution',
+    'list_contributions',
+    'list_funds',
+    'list_campaigns',
+    'list_pledges',
+    'list_form_entries',
+    'remove_form_entry',
+    'list_form_fields',
+    'get_tags',
+    'get_tag_folders',
+    'assign_tag',
+    'unassign_tag',
+)
+
+# BreezeApi methods that make no requests. AsyncBreezeApi calls them
+# directly, so they don't wait behind requests for a worker thread.
+_DIRECT_METHODS = (
+    'add_request_hooks',
+    'stats',
+    'get_retry_counts',
+)
+
+# BreezeApi methods AsyncBreezeApi doesn't have. iter_people() is an
+# iterator (page through list_people() instead), and the bulk methods
+# already keep several requests in flight on threads of their own.
+_OMITTED_METHODS = (
+    'iter_people',
+    'bulk_assign_tag',
+    'bulk_unassign_tag',
+    'bulk_attendance',
+)
+
+
+class AsyncBreezeApi(object):
+    """Asyncio version of BreezeApi.
+
+    Each call is run on a bounded pool of worker threads using the
+    underlying BreezeApi, so the event loop is never blocked and up to
+    `concurrency` requests overlap their network latency.
+    """
+
+    def __init__(self, api: BreezeApi, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Wrap a BreezeApi for use from asyncio code.
+        :param api: BreezeApi instance that actually makes the requests
+        :param concurrency: Maximum number of requests in flight at once
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self.api = api
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency,
+                                            thread_name_prefix='breeze')
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        Run a blocking call on the worker pool.
+        :param func: Function to call
+        :return: Whatever func returns
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(func, *args, **kwargs))
+
+    async def gather_person_details(self,
+                                    person_ids: Iterable[Union[str, int]],
+                                    concurrency: int = None,
+                                    return_exceptions: bool = False) -> List[dict]:
+        """
+        Fetch details for many people at once.
+        :param person_ids: Ids of the people to fetch
+        :param concurrency: Maximum number of these requests in flight at once.
+                            Defaults to (and can't usefully exceed) the
+                            concurrency given when this was created.
+        :param return_exceptions: If True, a failed fetch puts its exception in
+                            the result instead of raising it.
+        :return: List of get_person_details() results, in the order of person_ids
+        """
+        limit = asyncio.Semaphore(concurrency if concurrency else self.concurrency)
+
+        async def fetch(person_id):
+            async with limit:
+                return await self.get_person_details(person_id)
+
+        return await asyncio.gather(*[fetch(p) for p in person_ids],
+                                    return_exceptions=return_exceptions)
+
+    def close(self) -> None:
+        """Release the worker threads. Pending requests are allowed to finish."""
+        self._executor.shutdown(wait=True)
+
+    async def aclose(self) -> None:
+        """
+        Like close(), but waits for pending requests in another thread,
+        so the event loop keeps running meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+def _make_async(name: str):
+    """
+    Build a coroutine method that runs the named BreezeApi method
+    on the worker pool.
+    :param name: Name of the BreezeApi method
+    :return: Coroutine function suitable as an AsyncBreezeApi method
+    """
+    method = getattr(BreezeApi, name)
+
+    async def call(self, *args, **kwargs):
+        return await self._run(method, self.api, *args, **kwargs)
+
+    return functools.wraps(method)(call)
+
+
+def _make_direct(name: str):
+    """
+    Build a method that calls the named BreezeApi method right away.
+    :param name: Name of the BreezeApi method
+    :return: Function suitable as an AsyncBreezeApi method
+    """
+    method = getattr(BreezeApi, name)
+
+    def call(self, *args, **kwargs):
+        return method(self.api, *args, **kwargs)
+
+    return functools.wraps(method)(call)
+
+
+for _name in _ASYNC_METHODS:
+    setattr(AsyncBreezeApi, _name, _make_async(_name))
+for _name in _DIRECT_METHODS:
+    setattr(AsyncBreezeApi, _name, _make_direct(_name))
+
+
+def async_breeze_api(concurrency: int = DEFAULT_CONCURRENCY,
+                     **kwargs) -> AsyncBreezeApi:
+    """
+    Create an AsyncBreezeApi.
+    :param concurrency: Maximum number of requests in flight at once
+    :param kwargs: Parameters passed to breeze.breeze_api() to build the
+                   underlying BreezeApi. Unless given, pool_size is set to
+                   concurrency so every worker thread can keep its own
+                   connection open.
+    :return: An AsyncBreezeApi instance
+    """
+    kwargs.setdefault('pool_size', concurrency)
+    return AsyncBreezeApi(breeze_api(**kwargs), concurrency=concurrency)
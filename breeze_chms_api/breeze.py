@@ -19,11 +19,26 @@ Usage:
 __author__ = 'daw30410@yahoo.com (David A. Willcox)'
 
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import combine_settings
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Union, List, Mapping, Sequence, Set, Dict
+from typing import (Union, List, Mapping, Sequence, Set, Dict, Iterator, Callable,
+                    Iterable, NamedTuple, Tuple)
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy, RetryCounts
+from .profile_cache import ProfileFieldCache, DEFAULT_PROFILE_CACHE_TTL
+from .response_cache import ResponseCache
+from .instrumentation import RequestInfo, RequestStats
+from . import json_stream
 
 
 class ENDPOINTS(Enum):
@@ -41,8 +56,54 @@ class ENDPOINTS(Enum):
 
 BREEZE_URL_KEY = 'breeze_url'
 BREEZE_API_KEY_KEY = 'api_key'
+POOL_SIZE_KEY = 'pool_size'
+KEEP_ALIVE_KEY = 'keep_alive'
+MAX_RETRIES_KEY = 'max_retries'
+RATE_LIMIT_KEY = 'rate_limit'
+RATE_BURST_KEY = 'rate_burst'
+PROFILE_CACHE_KEY = 'profile_cache'
+PROFILE_CACHE_TTL_KEY = 'profile_cache_ttl'
 HELPER_CONFIG_FILE = 'breeze_maker.yml'
 
+# Default maximum number of open connections to Breeze per BreezeApi
+DEFAULT_POOL_SIZE = 10
+
+# Default number of people fetched per request by iter_people()
+DEFAULT_PAGE_SIZE = 500
+
+# Default number of requests in flight at once for bulk operations
+DEFAULT_BULK_WORKERS = 8
+
+# Actions for bulk_attendance()
+CHECK_IN = 'in'
+CHECK_OUT = 'out'
+DELETE_ATTENDANCE = 'delete'
+_ATTENDANCE_ACTIONS = (CHECK_IN, CHECK_OUT, DELETE_ATTENDANCE)
+
+# HTTP status Breeze returns when requests come too fast
+_TOO_MANY_REQUESTS = 429
+# Seconds to wait after a 429 response that doesn't say how long
+_DEFAULT_RETRY_AFTER = 5.0
+# Maximum times a request is repeated after 429 responses
+_MAX_RATE_LIMITED_RETRIES = 5
+
+# Bytes read at a time when a response is streamed
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Commands that change data in Breeze. These aren't retried by default
+# since a failed try may still have taken effect.
+_MUTATING_COMMANDS = frozenset({
+    'add',
+    'update',
+    'edit',
+    'delete',
+    'assign',
+    'unassign',
+    'attendance/add',
+    'attendance/delete',
+    'remove_form_entry',
+})
+
 # Valid parameters for various calls
 _GET_PEOPLE_PARAMS = {'limit', 'offset', 'details', 'filter_json'}
 _ADD_PERSON_PARAMS = {'first', 'last', 'fields_json'}
@@ -87,6 +148,17 @@ class BreezeBadParameter(BreezeError):
     def __init__(self, *args):
         BreezeError.__init__(self, args)
 
+
+class AttendanceSummary(NamedTuple):
+    """What bulk_attendance() did. Entries are (person_id, instance_id, action)."""
+    # Entries sent to Breeze
+    changed: List[Tuple[str, str, str]]
+    # Entries not sent because the attendance was already that way
+    skipped: List[Tuple[str, str, str]]
+    # Entry -> the exception (usually a BreezeError), for entries that failed
+    # or weren't tried because an earlier one for the same person and event failed
+    failed: Dict[Tuple[str, str, str], Exception]
+
 def _transform_setting(key: str, val: Union[int, Mapping, Sequence, None]) -> \
         Union[str, None]:
     """
@@ -141,12 +213,211 @@ def _check_illegal_param(args: Mapping, valid_keys: Set) -> None:
         raise BreezeBadParameter(f'Unexpected parameter(s): {",".join(list(bad_keys))}')
 
 
+def _call_name(endpoint: ENDPOINTS, command: str) -> str:
+    """
+    Name a kind of call for reporting, e.g. 'giving/list'. Person ids
+    used as commands are all reported as 'people/person_id'.
+    :param endpoint: URL endpoint
+    :param command: Command for the endpoint
+    :return: Name of the call
+    """
+    if command.isdigit():
+        command = 'person_id'
+    return f'{endpoint.value}/{command}'
+
+
+def _retry_after(response: requests.Response) -> float:
+    """
+    How long Breeze asked us to wait before trying again.
+    :param response: A 429 (or 503) response
+    :return: Seconds from the Retry-After header, which may be either seconds
+             or an HTTP date. _DEFAULT_RETRY_AFTER if missing or unreadable.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return _DEFAULT_RETRY_AFTER
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return _DEFAULT_RETRY_AFTER
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _iter_pages(fetch_page: Callable[[int], List[dict]],
+                page_size: int) -> Iterator[List[dict]]:
+    """
+    Walk a paged list call.
+    :param fetch_page: Function that returns the page starting at the given offset
+    :param page_size: Number of entries in a full page
+    :return: Iterator over the pages. Stops after an empty or partial page.
+    """
+    offset = 0
+    while True:
+        page = fetch_page(offset)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+class _PageError(object):
+    """Carries an exception from the read-ahead thread to the caller."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END_OF_PAGES = object()
+
+
+def _read_ahead(pages: Iterator[List[dict]], depth: int) -> Iterator[List[dict]]:
+    """
+    Fetch pages on a background thread while the caller works on earlier ones.
+    :param pages: Iterator that fetches pages, as from _iter_pages()
+    :param depth: Maximum number of fetched pages waiting to be consumed
+    :return: Iterator over the same pages
+    """
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def fetch_all():
+        try:
+            for page in pages:
+                ready.put(page)
+                if stop.is_set():
+                    return
+            ready.put(_END_OF_PAGES)
+        except Exception as error:
+            ready.put(_PageError(error))
+
+    fetcher = threading.Thread(target=fetch_all, name='breeze-read-ahead',
+                               daemon=True)
+    fetcher.start()
+    try:
+        while True:
+            page = ready.get()
+            if page is _END_OF_PAGES:
+                return
+            if isinstance(page, _PageError):
+                raise page.error
+            yield page
+    finally:
+        # If the caller quit early, let the fetcher finish its current
+        # page and exit instead of blocking on a full queue.
+        stop.set()
+        while True:
+            try:
+                ready.get_nowait()
+            except queue.Empty:
+                break
+
+
+def _run_bulk(call: Callable[[object], object],
+              keys: Iterable,
+              workers: int,
+              progress: Callable[[int, int], None] = None) -> Dict[object, object]:
+    """
+    Make many independent calls on a pool of threads.
+    :param call: Function to call with each key
+    :param keys: Keys to call it with. Duplicates are only called once.
+    :param workers: Maximum number of calls running at once
+    :param progress: If given, called with (number done, total) after each call
+    :return: Map from each key, in the order given, to what the call returned,
+             or the exception it raised
+    :raises: BreezeBadParameter if workers isn't positive
+    """
+    if workers < 1:
+        raise BreezeBadParameter('workers must be at least 1')
+    results = dict.fromkeys(keys)
+    total = len(results)
+    if not total:
+        return results
+    with ThreadPoolExecutor(max_workers=min(workers, total),
+                            thread_name_prefix='breeze-bulk') as executor:
+        futures = {executor.submit(call, key): key for key in results}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as error:
+                    results[futures[future]] = error
+                if progress:
+                    progress(done, total)
+        except BaseException:
+            # Don't start calls nobody will see the results of.
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+def _attendance_state(record: Mapping) -> str:
+    """
+    :param record: A person's record from list_attendance()
+    :return: CHECK_OUT if they've been checked out, otherwise CHECK_IN
+    """
+    check_out = record.get('check_out')
+    if check_out and not str(check_out).startswith('0000'):
+        return CHECK_OUT
+    return CHECK_IN
+
+
+def _next_attendance_state(state: Union[str, None], action: str) -> Union[str, None]:
+    """
+    :param state: CHECK_IN or CHECK_OUT if the person has attendance, else None
+    :param action: What's being done
+    :return: The state after doing it
+    """
+    if action == CHECK_IN:
+        # Checking in someone already there (or gone) doesn't change anything.
+        return state or CHECK_IN
+    if action == CHECK_OUT:
+        return CHECK_OUT
+    return None
+
+
+def make_session(pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True,
+                 max_retries: int = 0) -> requests.Session:
+    """
+    Create an HTTP session for talking to Breeze.
+    :param pool_size: Maximum number of connections kept open for reuse.
+                      Should be at least the number of threads making
+                      requests at once.
+    :param keep_alive: If False, close each connection after its request
+    :param max_retries: Number of times the connection layer itself retries
+                      failed connection attempts (see also RetryPolicy)
+    :return: A new requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
 class BreezeApi(object):
     """A wrapper for the Breeze REST API."""
 
     def __init__(self, breeze_url, api_key,
                  dry_run=False,
-                 connection=requests.Session()):
+                 connection=None,
+                 rate_limit: float = None,
+                 rate_burst: int = 1,
+                 retry_policy: RetryPolicy = None,
+                 profile_cache: str = None,
+                 profile_cache_ttl: float = DEFAULT_PROFILE_CACHE_TTL,
+                 response_cache: ResponseCache = None):
         """
         Instantiates the BreezeApi with your Breeze account information.
         :param breeze_url: Fully qualified domain for your organization's Breeze service
@@ -156,13 +427,35 @@ class BreezeApi(object):
                         made. When combined with debug,, this allows debugging requests
                         without affecting data in your Breeze account
         :param connection: Internet connection session. By default BreezeAPI creates
-                        one, but this allows a mock connection for testing.
+                        its own with make_session(), but this allows a differently
+                        configured session, or a mock connection for testing.
+        :param rate_limit: If set, maximum sustained requests per second, shared
+                        by all threads using this instance.
+        :param rate_burst: Number of requests allowed back-to-back before
+                        rate_limit applies.
+        :param retry_policy: When and how to retry failed requests. If None,
+                        RetryPolicy() defaults are used.
+        :param profile_cache: If set, file to save profile fields in, so later
+                        instances can skip fetching them from Breeze.
+        :param profile_cache_ttl: Seconds a saved copy of the profile fields
+                        is used before fetching them again.
+        :param response_cache: If set, remember responses to calls that just
+                        read data, as configured in the ResponseCache.
         """
 
         self.breeze_url = breeze_url
         self.api_key = api_key
         self.dry_run = dry_run
-        self.connection = connection
+        self.connection = connection if connection is not None else make_session()
+        self.rate_limiter = RateLimiter(rate_limit, rate_burst)
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.retry_counts = RetryCounts()
+        self.profile_cache = ProfileFieldCache(profile_cache, profile_cache_ttl) \
+            if profile_cache else None
+        self.response_cache = response_cache
+        self.request_stats = RequestStats()
+        self._before_hooks: List[Callable[[str, str, int], None]] = []
+        self._after_hooks: List[Callable[[RequestInfo], None]] = [self.request_stats]
 
         # TODO(alex): use urlparse to check url format.
         if not (self.breeze_url and self.breeze_url.startswith('https://') and
@@ -199,7 +492,142 @@ class BreezeApi(object):
         :return: HTTP response
         :raises": BreezeError if connection or request fails
         """
+        url, keywords = self._prepare(endpoint, command, params, headers, timeout)
+
+        logging.debug('Making request to %s', url)
+        if self.dry_run:
+            return  # NOT TESTED
+
+        cache = self.response_cache
+        mutating = command in _MUTATING_COMMANDS
+        if cache is not None and not mutating:
+            response_json = cache.get(endpoint.value, command, keywords['params'])
+            if response_json is not None:
+                logging.debug('Cached response for %s', url)
+                return response_json
+            # A change made while this request is out makes its answer stale.
+            generation = cache.generation(endpoint.value)
+
+        param_bytes = self._before_request(endpoint, command, keywords['params'])
+        start = time.perf_counter()
+        response = None
+        failure = None
+        try:
+            try:
+                response = self._get_with_retries(endpoint, command, url, keywords)
+                if not response.ok:
+                    raise BreezeError(response)
+                response_json = response.json()
+            except (requests.ConnectionError,
+                    requests.exceptions.ConnectionError,
+                    requests.Timeout) as error:
+                raise BreezeError(error)
+            finally:
+                if cache is not None and mutating:
+                    # Even a failed change may have happened.
+                    cache.invalidate(endpoint.value)
+
+            if isinstance(response_json, dict):
+                if response_json.get('errors') or response_json.get('errorCode'):
+                    raise BreezeError(response)
+        except Exception as error:
+            failure = error
+            raise
+        finally:
+            self._after_request(endpoint, command, param_bytes, response,
+                                len(response.content or b'') if response is not None else 0,
+                                time.perf_counter() - start, failure)
+        logging.debug('JSON Response: %s', response_json)
+        if cache is not None and not mutating:
+            cache.put(endpoint.value, command, keywords['params'], response_json,
+                      generation)
+        return response_json
+
+    def _iter_request(self,
+                      endpoint: ENDPOINTS,
+                      command: str = '',
+                      params: Mapping[str, Union[str, int, float, Mapping, Sequence]] \
+                              = dict(),
+                      headers: dict = dict(),
+                      timeout: int = 60,
+                      ) -> Iterator:
+        """
+        Make an HTTP request for a list, and parse the list's items one at a
+        time as the response arrives, so the whole response is never held in
+        memory. The request isn't sent until the first item is asked for.
+        Streamed responses aren't cached.
+        :param endpoint: URL endpoint for the service. (contributions, people, etc.)
+        :param command: Command for the endpoint. (add, list, etc.)
+        :param params: Parameters for the command {name: value, ...}
+        :param headers: Extra HTTP headers if needed
+        :return: Iterator over the items in the response
+        :raises": BreezeError if connection or request fails, or the response
+                  isn't a list
+        """
+        url, keywords = self._prepare(endpoint, command, params, headers, timeout)
+        keywords['stream'] = True
 
+        logging.debug('Making streaming request to %s', url)
+        if self.dry_run:
+            return
+
+        param_bytes = self._before_request(endpoint, command, keywords['params'])
+        start = time.perf_counter()
+        try:
+            response = self._get_with_retries(endpoint, command, url, keywords)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            failure = BreezeError(error)
+            self._after_request(endpoint, command, param_bytes, None, 0,
+                                time.perf_counter() - start, failure)
+            raise failure
+        received = 0
+        failure = None
+        abandoned = False
+
+        def chunks():
+            nonlocal received
+            for chunk in response.iter_content(_STREAM_CHUNK_SIZE):
+                received += len(chunk)
+                yield chunk
+
+        try:
+            try:
+                if not response.ok:
+                    raise BreezeError(response)
+                yield from json_stream.iter_array(chunks())
+            except json_stream.NotAnArray as error:
+                value = error.value
+                if isinstance(value, dict) and (value.get('errors') or value.get('errorCode')):
+                    raise BreezeError(response)
+                raise BreezeError(f'Expected a list from {url}, got: {value}')
+            except (requests.ConnectionError,
+                    requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError,
+                    ValueError) as error:
+                raise BreezeError(error)
+        except Exception as error:
+            failure = error
+            raise
+        except BaseException:
+            # GeneratorExit (the caller stopped iterating) and KeyboardInterrupt
+            # aren't failures of the request, but it didn't finish either.
+            abandoned = True
+            raise
+        finally:
+            response.close()
+            self._after_request(endpoint, command, param_bytes, response, received,
+                                time.perf_counter() - start, failure, abandoned)
+
+    def _prepare(self,
+                 endpoint: ENDPOINTS,
+                 command: str,
+                 params: Mapping[str, Union[str, int, float, Mapping, Sequence]],
+                 headers: dict,
+                 timeout: int):
+        """
+        Build the url and other arguments for a request.
+        :return: Tuple of url and keyword arguments for the connection's get()
+        """
         http_headers = {
             'Content-Type': 'application/json',
             'Api-Key': self.api_key
@@ -211,25 +639,146 @@ class BreezeApi(object):
                         params=_transform_settings(params),
                         timeout=timeout)
         url = f"{self.breeze_url}/api/{endpoint.value}/{command}?"
+        return url, keywords
+
+    def add_request_hooks(self,
+                          before: Callable[[str, str, int], None] = None,
+                          after: Callable[[RequestInfo], None] = None) -> None:
+        """
+        Have functions called around each request sent to Breeze. (Responses
+        from the response cache aren't requests, so hooks aren't called.)
+        Requests can be made from several threads at once, so hooks may be too.
+        An exception from a hook is logged, and doesn't stop the request.
+        :param before: If given, called with the endpoint (e.g. 'people'),
+                       command (e.g. 'list') and size in bytes of the
+                       parameters just before each request is sent
+        :param after: If given, called with a RequestInfo after each request
+                      finishes, whether it worked or not
+        """
+        if before:
+            self._before_hooks.append(before)
+        if after:
+            self._after_hooks.append(after)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Report how many requests were made and how long they took.
+        :return: Map from call (endpoint/command, e.g. 'people/list') to a dict
+                 with 'calls', 'errors', 'abandoned' (streams the caller
+                 stopped reading early), 'seconds' (total), 'mean_seconds',
+                 'max_seconds', 'p50_seconds', 'p90_seconds', 'p99_seconds',
+                 'param_bytes' and 'response_bytes'
+        """
+        return self.request_stats.get()
+
+    def _before_request(self, endpoint: ENDPOINTS, command: str, params: dict) -> int:
+        """
+        Call the before hooks.
+        :param endpoint: URL endpoint of the request
+        :param command: Command for the endpoint
+        :param params: The request's parameters, as sent
+        :return: Size of the encoded parameters
+        """
+        param_bytes = len(urlencode(params, doseq=True))
+        for hook in tuple(self._before_hooks):
+            try:
+                hook(endpoint.value, command, param_bytes)
+            except Exception:
+                logging.exception('Request hook failed')
+        return param_bytes
+
+    def _after_request(self,
+                       endpoint: ENDPOINTS,
+                       command: str,
+                       param_bytes: int,
+                       response: Union[requests.Response, None],
+                       response_bytes: int,
+                       elapsed: float,
+                       error: Union[Exception, None],
+                       abandoned: bool = False) -> None:
+        """
+        Call the after hooks with a RequestInfo for a finished request.
+        :param response: The final response, or None if there wasn't one
+        :param abandoned: True if the caller stopped reading a streamed
+                          response before the end
+        """
+        info = RequestInfo(endpoint.value, command, _call_name(endpoint, command),
+                           param_bytes,
+                           response.status_code if response is not None else None,
+                           response_bytes, elapsed, error, abandoned)
+        for hook in tuple(self._after_hooks):
+            try:
+                hook(info)
+            except Exception:
+                logging.exception('Request hook failed')
+
+    def _get_with_retries(self,
+                          endpoint: ENDPOINTS,
+                          command: str,
+                          url: str,
+                          keywords: dict) -> requests.Response:
+        """
+        Send a request, repeating it as the retry policy allows.
+        :param endpoint: URL endpoint, for deciding whether to retry and counting
+        :param command: Command for the endpoint, ditto
+        :param url: Full url for the request
+        :param keywords: Other arguments for the connection's get()
+        :return: The final response, which may still be a failure
+        :raises: requests.ConnectionError or requests.Timeout if the last
+                 try couldn't get a response at all
+        """
+        policy = self.retry_policy
+        can_retry = policy.retry_mutating or command not in _MUTATING_COMMANDS
+        retries = 0
+        rate_limited = 0
+        waited = 0.0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.connection.get(url, verify=True, **keywords)
+                problem = None
+            except (requests.ConnectionError, requests.Timeout) as error:
+                response = None
+                problem = error
+            if response is not None and \
+                    response.status_code == _TOO_MANY_REQUESTS and \
+                    rate_limited < _MAX_RATE_LIMITED_RETRIES:
+                # Breeze refused the request, so it's safe to send it again.
+                rate_limited += 1
+                wait = _retry_after(response)
+                response.close()
+                logging.info('Rate limited by Breeze, waiting %.1f seconds', wait)
+                self.rate_limiter.pause(wait)
+                waited += wait
+                continue
+            if can_retry and retries + 1 < policy.max_attempts and \
+                    (problem or response.status_code in policy.retry_statuses):
+                retries += 1
+                wait = policy.backoff(retries)
+                if response is not None:
+                    response.close()
+                logging.info('Request to %s failed (%s), retry %d in %.1f seconds',
+                             url, problem if problem else response.status_code,
+                             retries, wait)
+                policy.sleep(wait)
+                waited += wait
+                continue
+            break
+        failed = problem is not None or not response.ok
+        self.retry_counts.record(_call_name(endpoint, command),
+                                 retries + rate_limited, waited, failed)
+        if problem:
+            raise problem
+        return response
 
-        logging.debug('Making request to %s', url)
-        if self.dry_run:
-            return  # NOT TESTED
-
-        try:
-            response = self.connection.get(url, verify=True, **keywords)
-            if not response.ok:
-                raise BreezeError(response)
-            response_json = response.json()
-        except (requests.ConnectionError,
-                requests.exceptions.ConnectionError) as error:
-            raise BreezeError(error)
-
-        if isinstance(response_json, dict):
-            if response_json.get('errors') or response_json.get('errorCode'):
-                raise BreezeError(response)
-        logging.debug('JSON Response: %s', response_json)
-        return response_json
+    def get_retry_counts(self) -> Dict[str, Dict[str, float]]:
+        """
+        Report how many requests were retried and how long that took.
+        :return: Map from call (endpoint/command, e.g. 'giving/list') to a dict
+                 with 'calls', 'retries', 'retry_seconds' (time spent
+                 waiting between tries) and 'failures'.
+        """
+        return self.retry_counts.get()
 
     # ------------------ ACCOUNT
 
@@ -264,9 +813,12 @@ class BreezeApi(object):
 
     # ------------------ People
 
-    def list_people(self, **kwargs) -> List[dict]:
+    def list_people(self, stream: bool = False, **kwargs) -> Union[List[dict], Iterator[dict]]:
         """
         List people from your database
+        :param stream: If True, return an iterator that parses people one at a
+                       time as they arrive from Breeze, instead of a list.
+                       Memory use then doesn't grow with the number of people.
         :param kwargs: Keyed parameters, all optional:
             limit: If set, number of people to return, If none, will return all people
             offset: Number of people to skip before beginning to return results.
@@ -295,8 +847,41 @@ class BreezeApi(object):
           """
         _check_illegal_param(kwargs, _GET_PEOPLE_PARAMS)
         # TODO Add test for filter_json.
+        if stream:
+            return self._iter_request(ENDPOINTS.PEOPLE, params=kwargs)
         return self._request(ENDPOINTS.PEOPLE, params=kwargs)
 
+    def iter_people(self,
+                    page_size: int = DEFAULT_PAGE_SIZE,
+                    details: bool = False,
+                    filter_json: Mapping = None,
+                    prefetch: int = 0) -> Iterator[dict]:
+        """
+        Iterate over people from your database, fetching them a page at a time
+        so only one page is held in memory at once.
+        :param page_size: Number of people to fetch with each request
+        :param details: Boolean, if True, return all information, Otherwise just names.
+        :param filter_json: Filter results based on criteria, as for list_people()
+        :param prefetch: If set, fetch up to this many pages ahead on a
+                         background thread while the caller processes the
+                         current page. Memory is then bounded by about
+                         prefetch + 2 pages.
+        :return: Iterator over the same entries list_people() would return
+        :raises: BreezeBadParameter if page_size isn't positive
+        """
+        if page_size < 1:
+            raise BreezeBadParameter('page_size must be at least 1')
+
+        def fetch_page(offset: int) -> List[dict]:
+            return self.list_people(limit=page_size, offset=offset,
+                                    details=details, filter_json=filter_json)
+
+        pages = _iter_pages(fetch_page, page_size)
+        if prefetch > 0:
+            pages = _read_ahead(pages, prefetch)
+        for page in pages:
+            yield from page
+
     def _build_profile_fields(self) -> List[dict]:
         """
         Build the list of profile fields.
@@ -304,23 +889,52 @@ class BreezeApi(object):
         But the individual fields have an added 'qualified_name' entry that
         includes section '{section name}:{field name}'
         """
-        # Profile fields by id
-        # self.profile_spec_by_id: Mapping[str, dict] = {}
-        # Profile field name to id
-        # self.profile_spec_by_name: Mapping[str, str] = {}
-        # All profile fields specs
-        # self.profile_specs: List[dict] = []
         if not self.profile_fields:
-            # First time. Get profile fields from Breeze
-            self.profile_fields = self._request(ENDPOINTS.PROFILE_FIELDS)
-            for section in self.profile_fields:
-                for field in section.get('fields'):
-                    field_name = field.get('name')
-                    field_id = field.get('field_id')
-                    field['section_spec'] = section
-                    self.profile_spec_by_id[field_id] = field
-                    self.profile_spec_by_name[field_name] = field
-                    self.profile_specs.append(field)
+            # First time. Get profile fields from the cache or Breeze
+            profile_fields = self.profile_cache.load(self.breeze_url) \
+                if self.profile_cache else None
+            if profile_fields is None:
+                profile_fields = self._fetch_profile_fields()
+            self._index_profile_fields(profile_fields)
+        return self.profile_fields
+
+    def _fetch_profile_fields(self) -> List[dict]:
+        """
+        Get profile fields from Breeze, and save them in the cache if there is one.
+        :return: Profile field list as returned by Breeze
+        """
+        profile_fields = self._request(ENDPOINTS.PROFILE_FIELDS)
+        if self.profile_cache and profile_fields:
+            # Save before _index_profile_fields() adds references back
+            # to the sections.
+            self.profile_cache.save(self.breeze_url, profile_fields)
+        return profile_fields
+
+    def _index_profile_fields(self, profile_fields: List[dict]) -> None:
+        """
+        Set profile_fields and the maps built from it.
+        :param profile_fields: Profile field list as returned by Breeze
+        """
+        self.profile_spec_by_id = {}
+        self.profile_spec_by_name = {}
+        self.profile_specs = []
+        self.profile_fields = profile_fields if profile_fields else []
+        for section in self.profile_fields:
+            for field in section.get('fields'):
+                field_name = field.get('name')
+                field_id = field.get('field_id')
+                field['section_spec'] = section
+                self.profile_spec_by_id[field_id] = field
+                self.profile_spec_by_name[field_name] = field
+                self.profile_specs.append(field)
+
+    def refresh_profile_fields(self) -> List[dict]:
+        """
+        Fetch profile fields from Breeze again, ignoring any cached copy.
+        Use this if the profile fields were changed in Breeze.
+        :return: Profile fields, as for get_profile_fields()
+        """
+        self._index_profile_fields(self._fetch_profile_fields())
         return self.profile_fields
 
     def get_profile_fields(self) -> List[dict]:
@@ -690,9 +1304,12 @@ class BreezeApi(object):
                                  params={'payment_id': payment_id})
         return response.get('success', False)
 
-    def list_contributions(self, **kwargs) -> List[Mapping]:
+    def list_contributions(self, stream: bool = False, **kwargs) \
+            -> Union[List[Mapping], Iterator[Mapping]]:
         """
         Retrieve a list of contributions.
+        :param stream: If True, return an iterator that parses contributions
+                       one at a time as they arrive from Breeze, instead of a list.
         :param kwargs: Set of keyed arguments
           start: Find contributions given on or after a specific date (YYYY-MM-DD)
           end: Find contributions given on or before a specific date
@@ -714,6 +1331,9 @@ class BreezeApi(object):
             raise BreezeError('include_family requires a person_id.')
 
         _check_illegal_param(kwargs, _LIST_CONTRIBUTION_PARAMS)
+        if stream:
+            return self._iter_request(ENDPOINTS.CONTRIBUTIONS, command='list',
+                                      params=kwargs)
         return self._request(ENDPOINTS.CONTRIBUTIONS, command='list', params=kwargs)
 
     def list_funds(self, include_totals: bool = False) -> List[dict]:
@@ -927,6 +1547,124 @@ class BreezeApi(object):
 
         return response
 
+    def bulk_assign_tag(self,
+                        person_ids: Iterable[str],
+                        tag_id: str,
+                        workers: int = DEFAULT_BULK_WORKERS,
+                        progress: Callable[[int, int], None] = None) -> \
+            Dict[str, Union[bool, Exception]]:
+        """
+        Assign a tag to many people, with several requests in flight at once.
+        Requests still go through this BreezeApi's rate limiter and retry policy.
+        :param person_ids: The people to get the tag
+        :param tag_id: ID of tag to assign
+        :param workers: Maximum number of requests in flight at once
+        :param progress: If given, called with (number done, total) as each
+                         person is finished
+        :return: Map from person id to assign_tag()'s result for them, or the
+                 exception (usually a BreezeError) it raised. One failure
+                 doesn't stop the others.
+        """
+        return _run_bulk(lambda person_id: self.assign_tag(person_id, tag_id),
+                         person_ids, workers, progress)
+
+    def bulk_unassign_tag(self,
+                          person_ids: Iterable[str],
+                          tag_id: str,
+                          workers: int = DEFAULT_BULK_WORKERS,
+                          progress: Callable[[int, int], None] = None) -> \
+            Dict[str, Union[bool, Exception]]:
+        """
+        Unassign a tag from many people, with several requests in flight at once.
+        :param person_ids: The people to lose the tag
+        :param tag_id: ID of tag to lose
+        :param workers: Maximum number of requests in flight at once
+        :param progress: If given, called with (number done, total) as each
+                         person is finished
+        :return: Map from person id to unassign_tag()'s result for them, or the
+                 exception it raised
+        """
+        return _run_bulk(lambda person_id: self.unassign_tag(person_id, tag_id),
+                         person_ids, workers, progress)
+
+    def bulk_attendance(self,
+                        entries: Iterable[Tuple[str, str, str]],
+                        workers: int = DEFAULT_BULK_WORKERS,
+                        progress: Callable[[int, int], None] = None) -> AttendanceSummary:
+        """
+        Record attendance for many people, with several requests in flight at once.
+        Attendance for each event is listed once, and entries that wouldn't
+        change anything are skipped.
+        :param entries: (person_id, instance_id, action) for each change, where
+                        action is CHECK_IN, CHECK_OUT, or DELETE_ATTENDANCE.
+                        Entries for the same person and event are done in order.
+        :param workers: Maximum number of requests in flight at once
+        :param progress: If given, called with (number done, total) as each
+                         person's changes for an event are finished
+        :return: AttendanceSummary of entries changed, skipped, and failed
+        :raises: BreezeBadParameter, before anything is sent, if an entry
+                 isn't valid or workers isn't positive
+        """
+        if workers < 1:
+            raise BreezeBadParameter('workers must be at least 1')
+        # (person_id, instance_id) -> entries for them, in order
+        groups = {}
+        for entry in entries:
+            entry = tuple(entry)
+            if len(entry) != 3 or entry[2] not in _ATTENDANCE_ACTIONS:
+                raise BreezeBadParameter(f'Bad attendance entry: {entry}')
+            groups.setdefault((str(entry[0]), str(entry[1])), []).append(entry)
+
+        listed = _run_bulk(self.list_attendance,
+                           [instance_id for _, instance_id in groups], workers)
+        states = {}
+        for instance_id, records in listed.items():
+            if not isinstance(records, Exception):
+                for record in records or []:
+                    states[(str(record.get('person_id')), instance_id)] = \
+                        _attendance_state(record)
+
+        skipped = []
+        failed = {}
+        # (person_id, instance_id) -> entries that need sending
+        todo = {}
+        for key, group in groups.items():
+            error = listed[key[1]]
+            if isinstance(error, Exception):
+                failed.update((entry, error) for entry in group)
+                continue
+            state = states.get(key)
+            for entry in group:
+                new_state = _next_attendance_state(state, entry[2])
+                if new_state == state:
+                    skipped.append(entry)
+                else:
+                    todo.setdefault(key, []).append(entry)
+                    state = new_state
+
+        calls = {CHECK_IN: self.event_check_in,
+                 CHECK_OUT: self.event_check_out,
+                 DELETE_ATTENDANCE: self.delete_attendance}
+
+        def send(key):
+            """
+            :return: Number of the person's entries done, and the error that
+                     stopped the rest, if any
+            """
+            for done, (person_id, instance_id, action) in enumerate(todo[key]):
+                try:
+                    if not calls[action](person_id, instance_id):
+                        raise BreezeError(f'{action} failed for {person_id}')
+                except Exception as error:
+                    return done, error
+            return len(todo[key]), None
+
+        changed = []
+        for key, (done, error) in _run_bulk(send, todo, workers, progress).items():
+            changed.extend(todo[key][:done])
+            failed.update((entry, error) for entry in todo[key][done:])
+        return AttendanceSummary(changed, skipped, failed)
+
 
 # ------------ Volunteers
 
@@ -947,8 +1685,17 @@ class BreezeApi(object):
 def breeze_api(breeze_url: str = None,
                api_key: str = None,
                dry_run: bool = False,
-               connection: requests.Session = requests.Session(),
+               connection: requests.Session = None,
                config_name: str = HELPER_CONFIG_FILE,
+               rate_limit: float = None,
+               rate_burst: int = None,
+               retry_policy: RetryPolicy = None,
+               pool_size: int = None,
+               keep_alive: bool = None,
+               max_retries: int = None,
+               profile_cache: str = None,
+               profile_cache_ttl: float = None,
+               response_cache: ResponseCache = None,
                **kwargs,
                ) -> BreezeApi:
     """
@@ -959,22 +1706,63 @@ def breeze_api(breeze_url: str = None,
     :param api_key: Explicitly given API key for the Breeze API.
                 (load_config() key 'api_key')
     :param dry_run: Just for testing, causes breeze_api to skip all net interactions.
-    :param connection: Session if other than default (mostly for testing)
+    :param connection: Session if other than default (mostly for testing).
+                If given, pool_size, keep_alive and max_retries are ignored.
+    :param rate_limit: If set, maximum sustained requests per second
+                (load_config() key 'rate_limit')
+    :param rate_burst: Number of requests allowed back-to-back before
+                rate_limit applies (load_config() key 'rate_burst')
+    :param retry_policy: When and how to retry failed requests
+    :param pool_size: Maximum number of connections kept open to Breeze
+                (load_config() key 'pool_size', default DEFAULT_POOL_SIZE)
+    :param keep_alive: If False, don't reuse connections
+                (load_config() key 'keep_alive', default True)
+    :param max_retries: Connection-level retries of failed connection attempts
+                (load_config() key 'max_retries', default 0)
+    :param profile_cache: File to save profile fields in between runs
+                (load_config() key 'profile_cache', default None: don't save)
+    :param profile_cache_ttl: Seconds saved profile fields are used
+                (load_config() key 'profile_cache_ttl',
+                default DEFAULT_PROFILE_CACHE_TTL)
+    :param response_cache: If set, remember responses to calls that just read data
     :param config_name: Alternate load_config() file name.
     :param kwargs: Other parameters used by load_config()
     :return: A BreezeAPI instance
     """
 
-    # First check if we have an explicit url and API key
-    if not breeze_url or not api_key:
-        # url and api key not explicitly given, so load from configuration files
+    config = {}
+    # Only skip the configuration files if every setting they could hold was given.
+    settings = [rate_limit, rate_burst, profile_cache, profile_cache_ttl]
+    if connection is None:
+        settings += [pool_size, keep_alive, max_retries]
+    if not breeze_url or not api_key or any(value is None for value in settings):
         config = combine_settings.load_config(config_name, **kwargs)
-        breeze_url = breeze_url if breeze_url else config.get('breeze_url')
-        api_key = api_key if api_key else config.get('api_key')
-        if not breeze_url or not api_key:
-            raise BreezeError("Both breeze_url and api_key are required")
-
-    return BreezeApi(breeze_url, api_key, dry_run=dry_run, connection=connection)
+        breeze_url = breeze_url if breeze_url else config.get(BREEZE_URL_KEY)
+        api_key = api_key if api_key else config.get(BREEZE_API_KEY_KEY)
+    if not breeze_url or not api_key:
+        raise BreezeError("Both breeze_url and api_key are required")
+
+    def setting(value, key: str, default):
+        # Explicit argument, then configuration file, then default
+        if value is not None:
+            return value
+        value = config.get(key)
+        return default if value is None else value
+
+    if connection is None:
+        connection = make_session(
+            pool_size=setting(pool_size, POOL_SIZE_KEY, DEFAULT_POOL_SIZE),
+            keep_alive=setting(keep_alive, KEEP_ALIVE_KEY, True),
+            max_retries=setting(max_retries, MAX_RETRIES_KEY, 0))
+
+    return BreezeApi(breeze_url, api_key, dry_run=dry_run, connection=connection,
+                     rate_limit=setting(rate_limit, RATE_LIMIT_KEY, None),
+                     rate_burst=setting(rate_burst, RATE_BURST_KEY, 1),
+                     retry_policy=retry_policy,
+                     profile_cache=setting(profile_cache, PROFILE_CACHE_KEY, None),
+                     profile_cache_ttl=setting(profile_cache_ttl, PROFILE_CACHE_TTL_KEY,
+                                               DEFAULT_PROFILE_CACHE_TTL),
+                     response_cache=response_cache)
 
 def config_file_list(config_name: str = HELPER_CONFIG_FILE,
                      **kwargs) -> List[str]:
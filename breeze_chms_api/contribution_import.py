@@ -0,0 +1,301 @@
+"""Import contributions into Breeze from a CSV file.
+
+Each row of the file is one contribution. Columns are add_contribution()
+parameters (date, person_id, amount, method, batch_number, ...), plus
+ways to say which funds the gift goes to:
+  - fund (and optionally fund_id): the whole amount goes to that fund
+  - fund:<fund name>: one column per fund, each with the amount for that
+    fund, for gifts split between funds
+  - funds_json: the funds_json parameter itself, as JSON
+
+The whole file is checked before anything is sent, then rows are sent
+several at a time. Each payment id Breeze returns is written to a
+checkpoint file as soon as it arrives, so if an import fails part way,
+running it again with the same checkpoint only sends the rows that
+weren't imported.
+
+  summary = import_contributions(api, 'giving.csv', 'giving.checkpoint',
+                                 defaults={'batch_name': 'Week 12'})
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import csv
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Tuple
+
+from .breeze import (BreezeApi, BreezeBadParameter, DEFAULT_BULK_WORKERS,
+                     _ADD_CONTRIBUTION_PARAMS, _transform_setting)
+
+# Column prefix for the amount given to one fund
+FUND_PREFIX = 'fund:'
+
+# Columns allowed besides add_contribution() parameters
+_FUND_COLUMNS = {'fund', 'fund_id'}
+
+
+class ImportValidationError(BreezeBadParameter):
+    """Problems found in an import file. Nothing was imported."""
+
+    def __init__(self, problems: List[Tuple[int, str]]):
+        """
+        :param problems: (line number, description) for each problem
+        """
+        BreezeBadParameter.__init__(self, f'{len(problems)} problem(s) in import file')
+        self.problems = problems
+
+
+class ImportSummary(NamedTuple):
+    """What import_contributions() did."""
+    # Line number of each row imported this time -> its payment id
+    posted: Dict[int, str]
+    # Line number of each row that failed -> the error, usually a BreezeError
+    failed: Dict[int, Exception]
+    # Number of rows skipped because the checkpoint says they were imported
+    skipped: int
+
+
+def _amount(text: str) -> Decimal:
+    """
+    :param text: Amount, like '100' or '1,250.00'
+    :return: The amount
+    :raises: ValueError if it isn't a positive amount of money in dollars and cents
+    """
+    try:
+        amount = Decimal(text.replace(',', '').replace('$', ''))
+    except InvalidOperation:
+        raise ValueError(f'bad amount {text!r}')
+    if not amount.is_finite() or amount <= 0 or amount.as_tuple().exponent < -2:
+        raise ValueError(f'bad amount {text!r}')
+    return amount
+
+
+def _contribution_params(row: Mapping[str, str]) -> dict:
+    """
+    Check a row and turn it into add_contribution() parameters.
+    :param row: Non-empty cells of the row, by column name, with defaults added
+    :return: Parameters for add_contribution()
+    :raises: ValueError describing the first problem found
+    """
+    params = {k: v for k, v in row.items()
+              if k not in _FUND_COLUMNS and not k.startswith(FUND_PREFIX)}
+
+    date = params.get('date')
+    if not date:
+        raise ValueError('missing date')
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'date {date!r} is not YYYY-MM-DD')
+    if not params.get('person_id') and not params.get('uid'):
+        raise ValueError('need person_id or uid')
+
+    split = {k[len(FUND_PREFIX):]: _amount(v) for k, v in row.items()
+             if k.startswith(FUND_PREFIX)}
+    amount = _amount(params['amount']) if params.get('amount') else None
+    if params.get('funds_json'):
+        if split or row.get('fund') or row.get('fund_id'):
+            raise ValueError('funds_json can\'t be used with other fund columns')
+        try:
+            funds = json.loads(params['funds_json'])
+            total = sum(_amount(str(f['amount'])) for f in funds)
+        except (ValueError, TypeError, KeyError):
+            raise ValueError('funds_json must be a list of funds with amounts')
+    elif split:
+        if row.get('fund') or row.get('fund_id'):
+            raise ValueError(f'fund can\'t be used with {FUND_PREFIX} columns')
+        funds = [{'name': name, 'amount': f'{value:.2f}'}
+                 for name, value in split.items()]
+        total = sum(split.values())
+    elif row.get('fund') or row.get('fund_id'):
+        if amount is None:
+            raise ValueError('missing amount')
+        fund = {'amount': f'{amount:.2f}'}
+        if row.get('fund_id'):
+            fund['id'] = row['fund_id']
+        if row.get('fund'):
+            fund['name'] = row['fund']
+        funds = [fund]
+        total = amount
+    else:
+        raise ValueError('no fund given')
+
+    if amount is not None and amount != total:
+        raise ValueError(f'amount {amount} doesn\'t match fund total {total}')
+    params['amount'] = f'{total:.2f}'
+    params['funds_json'] = _transform_setting('funds_json', funds)
+    return params
+
+
+def _read_rows(csv_path: str, defaults: Mapping[str, str]) -> \
+        Iterator[Tuple[int, str, Mapping[str, str]]]:
+    """
+    Read an import file a row at a time.
+    :param csv_path: The file
+    :param defaults: Values for cells that are empty or missing
+    :return: Iterator over (line number, row key, row) for each row that isn't
+             blank. The key identifies the row for the checkpoint: a hash of
+             its cells, and which repeat of identical cells it is. (Defaults
+             aren't included, so changing them doesn't make rows look new.)
+    :raises: BreezeBadParameter if there are unknown columns
+    """
+    seen = {}
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = set(reader.fieldnames or []) | set(defaults)
+        bad = {c for c in columns
+               if c not in _ADD_CONTRIBUTION_PARAMS and c not in _FUND_COLUMNS
+               and not c.startswith(FUND_PREFIX)}
+        if bad:
+            raise BreezeBadParameter(f'Unexpected column(s): {",".join(sorted(bad))}')
+        for row in reader:
+            cells = {k: v.strip() for k, v in row.items()
+                     if k is not None and v and v.strip()}
+            if not cells:
+                continue
+            values = dict(defaults)
+            values.update(cells)
+            digest = hashlib.sha256(json.dumps(cells, sort_keys=True).encode('utf-8'))
+            digest = digest.hexdigest()
+            seen[digest] = seen.get(digest, 0) + 1
+            yield reader.line_num, f'{digest}#{seen[digest]}', values
+
+
+class _Checkpoint(object):
+    """File recording the rows already imported, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def load(self) -> Dict[str, str]:
+        """
+        :return: Map from row key to payment id for rows already imported
+        """
+        done = {}
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        done[entry['key']] = entry['payment_id']
+                    except (ValueError, KeyError, TypeError):
+                        # Probably a line cut short by a crash
+                        logging.warning('Ignoring bad checkpoint line in %s', self.path)
+        except FileNotFoundError:
+            pass
+        return done
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.close()
+
+    def record(self, key: str, line: int, payment_id: str) -> None:
+        """
+        Add a row, making sure it's on disk before going on.
+        :param key: The row's key
+        :param line: Its line number, for people reading the checkpoint
+        :param payment_id: What Breeze returned for it
+        """
+        self._file.write(json.dumps({'key': key, 'line': line,
+                                     'payment_id': payment_id}) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def import_contributions(api: BreezeApi,
+                         csv_path: str,
+                         checkpoint_path: str,
+                         defaults: Mapping[str, str] = None,
+                         workers: int = DEFAULT_BULK_WORKERS,
+                         progress: Callable[[int, int], None] = None) -> ImportSummary:
+    """
+    Import contributions from a CSV file.
+    :param api: BreezeApi to import with
+    :param csv_path: The CSV file. The first line names the columns.
+    :param checkpoint_path: File recording the rows imported so far. Use the
+                            same one to resume an import that didn't finish.
+    :param defaults: Values for every row that doesn't have its own, e.g.
+                     {'batch_name': 'Week 12', 'method': 'Check'}
+    :param workers: Maximum number of contributions sent at once
+    :param progress: If given, called with (number done, total) as each
+                     contribution is finished
+    :return: ImportSummary of the rows imported, failed, and skipped
+    :raises: ImportValidationError, before anything is sent, if any row has a problem
+    :raises: BreezeBadParameter if there are unknown columns or workers isn't positive
+    """
+    if workers < 1:
+        raise BreezeBadParameter('workers must be at least 1')
+    defaults = {k: str(v) for k, v in (defaults or {}).items() if v}
+    checkpoint = _Checkpoint(checkpoint_path)
+    done = checkpoint.load()
+
+    # Check everything first, so a bad row can't leave a half-done import.
+    problems = []
+    total = 0
+    for line, key, row in _read_rows(csv_path, defaults):
+        try:
+            _contribution_params(row)
+        except ValueError as error:
+            problems.append((line, str(error)))
+        if key not in done:
+            total += 1
+    if problems:
+        raise ImportValidationError(problems)
+
+    posted = {}
+    failed = {}
+    skipped = 0
+    # Future -> (line, key), for contributions being sent
+    pending = {}
+
+    def finish(futures, report: bool = True):
+        for future in futures:
+            line, key = pending.pop(future)
+            try:
+                payment_id = future.result()
+            except Exception as error:
+                # Not just BreezeError: a surprising response (say, one
+                # without a payment id) fails this row, not the import.
+                logging.warning('Line %d of %s not imported: %s', line, csv_path, error)
+                failed[line] = error
+            else:
+                checkpoint.record(key, line, payment_id)
+                posted[line] = payment_id
+            if progress and report:
+                progress(len(posted) + len(failed), total)
+
+    with checkpoint, ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix='breeze-import') as executor:
+        try:
+            for line, key, row in _read_rows(csv_path, defaults):
+                if key in done:
+                    skipped += 1
+                    continue
+                # Only read ahead a little, however long the file is.
+                while len(pending) >= 2 * workers:
+                    finish(wait(pending, return_when=FIRST_COMPLETED).done)
+                pending[executor.submit(api.add_contribution,
+                                        **_contribution_params(row))] = (line, key)
+            while pending:
+                finish(wait(pending, return_when=FIRST_COMPLETED).done)
+        except BaseException:
+            # Don't send any more, but record what did get through, so
+            # a rerun doesn't send it again.
+            for future in list(pending):
+                if future.cancel():
+                    del pending[future]
+            # No progress reports, which could raise again before
+            # everything is recorded.
+            finish(wait(pending).done, report=False)
+            raise
+    return ImportSummary(posted, failed, skipped)
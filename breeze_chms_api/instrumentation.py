@@ -0,0 +1,165 @@
+"""Measuring Breeze API requests.
+
+BreezeApi calls hooks before and after each request it sends. A before
+hook gets the endpoint, command and size of the parameters; an after hook
+gets a RequestInfo with those plus the status, response size and time taken.
+
+RequestStats is an after hook that keeps, for each kind of call, how many
+were made, how many failed, how many streams were abandoned part way, the
+bytes sent and received, and a histogram of how long they took, from which
+it reports latency percentiles. Every BreezeApi has one, reported by
+BreezeApi.stats().
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import math
+import threading
+from typing import Dict, List, NamedTuple, Union
+
+# Histogram buckets get this much wider with each step, so a reported
+# percentile is within about 9% of the true value.
+_BUCKET_GROWTH = 2 ** (1 / 8)
+# Upper bound of the first bucket, in seconds. Anything faster goes there.
+_SMALLEST_BUCKET = 0.001
+
+# Percentiles reported by RequestStats.get()
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class RequestInfo(NamedTuple):
+    """What happened to one request, as passed to after hooks."""
+    # Endpoint, e.g. 'people'
+    endpoint: str
+    # Command for the endpoint, e.g. 'list'
+    command: str
+    # Name of the kind of call, e.g. 'people/list', as used in reports
+    call: str
+    # Size of the encoded parameters
+    param_bytes: int
+    # HTTP status of the final response, or None if there wasn't one
+    status: Union[int, None]
+    # Size of the response body received
+    response_bytes: int
+    # Seconds from sending the request to having the whole response,
+    # including any retries
+    elapsed: float
+    # The BreezeError the request failed with, or None
+    error: Union[Exception, None]
+    # True if the caller stopped reading a streamed response before the
+    # end. That isn't a failure, so error is None.
+    abandoned: bool = False
+
+
+def _bucket(seconds: float) -> int:
+    """
+    :param seconds: A latency
+    :return: Index of the histogram bucket it falls in
+    """
+    if seconds <= _SMALLEST_BUCKET:
+        return 0
+    return math.ceil(math.log(seconds / _SMALLEST_BUCKET, _BUCKET_GROWTH))
+
+
+def _bucket_limit(index: int) -> float:
+    """
+    :param index: Histogram bucket index
+    :return: The longest latency in that bucket
+    """
+    return _SMALLEST_BUCKET * _BUCKET_GROWTH ** index
+
+
+class _CallStats(object):
+    """Running totals for one kind of call."""
+    __slots__ = ('calls', 'errors', 'abandoned', 'seconds', 'max_seconds',
+                 'param_bytes', 'response_bytes', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.abandoned = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.param_bytes = 0
+        self.response_bytes = 0
+        # Bucket index -> number of calls
+        self.histogram: Dict[int, int] = {}
+
+    def percentile(self, percent: float) -> float:
+        """
+        :param percent: Which percentile, 0 to 100
+        :return: Latency that percent of the calls took no longer than
+        """
+        wanted = max(1, math.ceil(self.calls * percent / 100))
+        seen = 0
+        for index in sorted(self.histogram):
+            seen += self.histogram[index]
+            if seen >= wanted:
+                # The bucket's limit may be more than anything seen.
+                return min(_bucket_limit(index), self.max_seconds)
+        return self.max_seconds
+
+
+class RequestStats(object):
+    """Thread-safe latency and size statistics for each kind of call."""
+
+    def __init__(self, percentiles: List[float] = DEFAULT_PERCENTILES):
+        """
+        Create a RequestStats.
+        :param percentiles: Latency percentiles to report
+        """
+        self.percentiles = tuple(percentiles)
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _CallStats] = {}
+
+    def __call__(self, info: RequestInfo) -> None:
+        """
+        Add a request. (This makes a RequestStats usable as an after hook.)
+        :param info: What happened to the request
+        """
+        with self._lock:
+            stats = self._calls.get(info.call)
+            if stats is None:
+                stats = self._calls[info.call] = _CallStats()
+            stats.calls += 1
+            if info.error is not None:
+                stats.errors += 1
+            if info.abandoned:
+                stats.abandoned += 1
+            stats.seconds += info.elapsed
+            stats.max_seconds = max(stats.max_seconds, info.elapsed)
+            stats.param_bytes += info.param_bytes
+            stats.response_bytes += info.response_bytes
+            index = _bucket(info.elapsed)
+            stats.histogram[index] = stats.histogram.get(index, 0) + 1
+
+    def get(self) -> Dict[str, Dict[str, float]]:
+        """
+        Report the statistics so far.
+        :return: Map from call (e.g. 'people/list') to a dict with 'calls',
+                 'errors', 'abandoned', 'seconds' (total), 'mean_seconds',
+                 'max_seconds', 'p50_seconds' etc. for each percentile,
+                 'param_bytes' and 'response_bytes'
+        """
+        report = {}
+        with self._lock:
+            for call, stats in self._calls.items():
+                entry = {
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'abandoned': stats.abandoned,
+                    'seconds': stats.seconds,
+                    'mean_seconds': stats.seconds / stats.calls,
+                    'max_seconds': stats.max_seconds,
+                }
+                for percent in self.percentiles:
+                    entry[f'p{percent:g}_seconds'] = stats.percentile(percent)
+                entry['param_bytes'] = stats.param_bytes
+                entry['response_bytes'] = stats.response_bytes
+                report[call] = entry
+        return report
+
+    def reset(self) -> None:
+        """Start counting over."""
+        with self._lock:
+            self._calls = {}
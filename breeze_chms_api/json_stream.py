@@ -0,0 +1,121 @@
+"""Incremental parsing of a JSON array.
+
+Breeze returns lists (of people, contributions, ...) as one JSON array.
+iter_array() parses the items one at a time as the response body arrives,
+so only the item being parsed and one chunk of text are held in memory,
+however long the list is.
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, Union
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Characters that can follow an item in an array
+_AFTER_ITEM = frozenset(' \t\n\r,]')
+
+
+class NotAnArray(ValueError):
+    """The JSON wasn't an array. The whole value is in the value attribute."""
+
+    def __init__(self, value):
+        ValueError.__init__(self, 'JSON value is not an array')
+        self.value = value
+
+
+class _Buffer(object):
+    """Text read so far from a series of chunks, and a position in it."""
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """
+        Add the next chunk to the text, dropping what's already been parsed.
+        :return: False if there was nothing more to read
+        """
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self.decoder.decode(b'', final=True)
+        elif isinstance(chunk, bytes):
+            text = self.decoder.decode(chunk)
+        else:
+            text = chunk
+        self.text = self.text[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        """
+        Skip whitespace.
+        :return: The next character (not consumed), or '' at the end
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read_more():
+                return ''
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.text, self.pos)
+
+
+def iter_array(chunks: Iterable[Union[bytes, str]],
+               decoder: json.JSONDecoder = None) -> Iterator:
+    """
+    Parse a JSON array a piece at a time.
+    :param chunks: The JSON text in pieces of any size, as UTF-8 bytes or str,
+                   for example requests.Response.iter_content()
+    :param decoder: JSONDecoder for the items
+    :return: Iterator over the items in the array
+    :raises: NotAnArray if the JSON is some other value
+    :raises: json.JSONDecodeError if the JSON is malformed or incomplete
+    """
+    decoder = decoder if decoder else json.JSONDecoder()
+    buffer = _Buffer(chunks)
+    first = buffer.next_char()
+    if first != '[':
+        if not first:
+            raise buffer.error('Expecting value')
+        while buffer.read_more():
+            pass
+        raise NotAnArray(decoder.decode(buffer.text[buffer.pos:]))
+    buffer.pos += 1
+
+    if buffer.next_char() == ']':
+        return
+    while True:
+        if not buffer.next_char():
+            raise buffer.error('Expecting value')
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer.text, buffer.pos)
+                # A number cut off by the end of a chunk (like "1." or "12")
+                # still parses, so make sure the item really ended.
+                if buffer.eof or (end < len(buffer.text) and
+                                  buffer.text[end] in _AFTER_ITEM):
+                    break
+            except json.JSONDecodeError:
+                if buffer.eof:
+                    raise
+            buffer.read_more()
+        buffer.pos = end
+        yield item
+
+        separator = buffer.next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise buffer.error("Expecting ',' delimiter")
+        buffer.pos += 1
@@ -0,0 +1,270 @@
+"""Incremental copy of a Breeze account's people.
+
+PeopleSync keeps a local SQLite copy of everyone's profile. Each sync gets
+the cheap summary list from Breeze, compares it with the saved copy, and
+only fetches full profiles for people who are new or whose summary changed.
+It reports who was added, removed, or changed along the way.
+
+Breeze doesn't say when a profile was last modified, and the summary only
+holds names and the photo path, so a change to some other field isn't
+noticed until that person's profile is fetched again. sync() can refresh
+the profiles that were fetched longest ago a few at a time (refresh_oldest),
+and sync(full=True) fetches everyone.
+
+  store = PeopleSnapshotStore('people.sqlite')
+  syncer = PeopleSync(api, store)
+  stats = syncer.sync(on_event=print, refresh_oldest=100)
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple, Union
+
+from .breeze import BreezeApi, BreezeError, DEFAULT_PAGE_SIZE
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+class SyncEvent(NamedTuple):
+    """A change found by PeopleSync.sync()"""
+    # ADDED, REMOVED, or CHANGED
+    kind: str
+    person_id: str
+    # Saved profile before the sync (None if added)
+    previous: Union[dict, None]
+    # Profile from Breeze (None if removed)
+    current: Union[dict, None]
+
+
+def _hash(value) -> str:
+    """
+    Hash of a JSON-able value that doesn't depend on key order.
+    :param value: Value to hash
+    :return: Hex digest
+    """
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PeopleSnapshotStore(object):
+    """SQLite file holding the last synced summary and profile for each person."""
+
+    def __init__(self, path: str):
+        """
+        Open (creating if needed) a snapshot store.
+        :param path: SQLite database file, or ':memory:'
+        """
+        self.db = sqlite3.connect(path)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS people (
+                               id TEXT PRIMARY KEY,
+                               summary_hash TEXT NOT NULL,
+                               details_hash TEXT,
+                               details TEXT,
+                               fetched_at REAL)''')
+        self.db.execute('''CREATE INDEX IF NOT EXISTS people_fetched_at
+                           ON people (fetched_at)''')
+        self.db.commit()
+
+    def summary_hashes(self) -> Dict[str, str]:
+        """
+        :return: Map from person id to hash of their saved summary
+        """
+        return dict(self.db.execute('SELECT id, summary_hash FROM people'))
+
+    def get(self, person_id: str) -> Union[dict, None]:
+        """
+        :param person_id: Person's id
+        :return: Saved profile, or None if unknown
+        """
+        row = self.db.execute('SELECT details FROM people WHERE id = ?',
+                              (person_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def details_hash(self, person_id: str) -> Union[str, None]:
+        """
+        :param person_id: Person's id
+        :return: Hash of the saved profile, or None if unknown
+        """
+        row = self.db.execute('SELECT details_hash FROM people WHERE id = ?',
+                              (person_id,)).fetchone()
+        return row[0] if row else None
+
+    def oldest(self, count: int) -> List[str]:
+        """
+        :param count: Number of ids wanted
+        :return: Ids of the people whose profiles were fetched longest ago
+        """
+        return [row[0] for row in self.db.execute(
+            'SELECT id FROM people ORDER BY fetched_at LIMIT ?', (count,))]
+
+    def put(self, person_id: str, summary_hash: str, details: dict,
+            fetched_at: float) -> None:
+        """
+        Save (or replace) a person.
+        :param person_id: Person's id
+        :param summary_hash: Hash of their summary row
+        :param details: Their full profile
+        :param fetched_at: When the profile was fetched
+        """
+        self.db.execute('''INSERT OR REPLACE INTO people
+                           (id, summary_hash, details_hash, details, fetched_at)
+                           VALUES (?, ?, ?, ?, ?)''',
+                        (person_id, summary_hash, _hash(details),
+                         json.dumps(details), fetched_at))
+
+    def delete(self, person_id: str) -> None:
+        """
+        Forget a person.
+        :param person_id: Person's id
+        """
+        self.db.execute('DELETE FROM people WHERE id = ?', (person_id,))
+
+    def iter_people(self) -> Iterator[dict]:
+        """
+        :return: Iterator over every saved profile, like BreezeApi.iter_people(details=True)
+        """
+        for row in self.db.execute('SELECT details FROM people ORDER BY id'):
+            if row[0]:
+                yield json.loads(row[0])
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def rollback(self) -> None:
+        self.db.rollback()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM people').fetchone()[0]
+
+
+class PeopleSync(object):
+    """Brings a PeopleSnapshotStore up to date with Breeze."""
+
+    def __init__(self,
+                 api: BreezeApi,
+                 store: PeopleSnapshotStore,
+                 bulk_threshold: int = DEFAULT_PAGE_SIZE,
+                 clock: Callable[[], float] = time.time):
+        """
+        Create a PeopleSync.
+        :param api: BreezeApi for the account
+        :param store: Where the local copy is kept
+        :param bulk_threshold: If more than this many profiles need fetching,
+                               get everyone's with iter_people(details=True)
+                               instead of one get_person_details() call each.
+        :param clock: Source of the current time (for testing)
+        """
+        self.api = api
+        self.store = store
+        self.bulk_threshold = bulk_threshold
+        self._clock = clock
+        # Map from person id to the error fetching their profile in the
+        # last sync().
+        self.failures = {}
+
+    def sync(self,
+             full: bool = False,
+             refresh_oldest: int = 0,
+             on_event: Callable[[SyncEvent], None] = None) -> Dict[str, int]:
+        """
+        Update the local copy.
+        :param full: If True, fetch every profile, not just new and changed ones
+        :param refresh_oldest: Also fetch this many of the profiles that were
+                               fetched longest ago, so other changes are
+                               eventually noticed.
+        :param on_event: Called with a SyncEvent for each added, removed, or
+                         changed person. The local copy is only saved once
+                         sync() finishes, so if it fails, the next sync
+                         reports the same changes again.
+        :return: Counts of 'added', 'removed', 'changed' people, 'fetched'
+                 profiles, and profiles that 'failed' to fetch. The errors
+                 are in self.failures. Those people's saved copies are left
+                 alone, so they're fetched again next sync.
+        """
+        stats = {ADDED: 0, REMOVED: 0, CHANGED: 0, 'fetched': 0, 'failed': 0}
+        self.failures = {}
+
+        def emit(kind: str, person_id: str, previous, current):
+            stats[kind] += 1
+            if on_event:
+                on_event(SyncEvent(kind, person_id, previous, current))
+
+        saved = self.store.summary_hashes()
+        summaries = {}
+        for row in self.api.iter_people():
+            summaries[str(row.get('id'))] = _hash(row)
+
+        if full:
+            wanted = set(summaries)
+        else:
+            wanted = {pid for pid, summary_hash in summaries.items()
+                      if saved.get(pid) != summary_hash}
+            if refresh_oldest > 0:
+                wanted.update(pid for pid in self.store.oldest(refresh_oldest)
+                              if pid in summaries)
+
+        try:
+            for person_id, person in self._fetch(wanted):
+                stats['fetched'] += 1
+                previous_hash = self.store.details_hash(person_id)
+                if previous_hash is None:
+                    emit(ADDED, person_id, None, person)
+                elif previous_hash != _hash(person):
+                    emit(CHANGED, person_id, self.store.get(person_id), person)
+                self.store.put(person_id, summaries[person_id], person, self._clock())
+            stats['failed'] = len(self.failures)
+
+            for person_id in saved:
+                if person_id not in summaries:
+                    emit(REMOVED, person_id, self.store.get(person_id), None)
+                    self.store.delete(person_id)
+        except BaseException:
+            self.store.rollback()
+            raise
+        self.store.commit()
+        return stats
+
+    def _fetch(self, person_ids: set) -> Iterator[Tuple[str, dict]]:
+        """
+        Get full profiles. If a get_person_details() call fails, the error
+        is saved in self.failures and that person is skipped. So is anyone
+        iter_people(details=True) doesn't return, with its error if it
+        fails part way.
+        :param person_ids: Ids of the people wanted
+        :return: Iterator over (person id, profile) for each of them
+        """
+        if len(person_ids) > self.bulk_threshold:
+            missing = set(person_ids)
+            try:
+                for person in self.api.iter_people(details=True):
+                    person_id = str(person.get('id'))
+                    # Skips anyone added since we got the summaries.
+                    # The next sync will catch them.
+                    if person_id in missing:
+                        missing.remove(person_id)
+                        yield person_id, person
+            except Exception as error:
+                for person_id in missing:
+                    self.failures[person_id] = error
+            else:
+                # Removed since we got the summaries, most likely.
+                for person_id in missing:
+                    self.failures[person_id] = BreezeError(
+                        f'Person {person_id} not in list_people(details=True)')
+        else:
+            for person_id in sorted(person_ids):
+                try:
+                    person = self.api.get_person_details(person_id)
+                except Exception as error:
+                    self.failures[person_id] = error
+                    continue
+                yield person_id, person
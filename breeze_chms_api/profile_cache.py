@@ -0,0 +1,110 @@
+"""On-disk cache of a Breeze account's profile field definitions.
+
+Profile fields rarely change, but every new BreezeApi instance used to fetch
+them from Breeze. ProfileFieldCache saves them to a file so short-lived
+programs can skip that request while the saved copy is fresh.
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, List, Union
+
+# Default seconds a cached copy of the profile fields stays fresh
+DEFAULT_PROFILE_CACHE_TTL = 24 * 60 * 60
+
+
+def _fields_hash(profile_fields: List[dict]) -> str:
+    """
+    Hash of profile fields, to detect a damaged cache file.
+    :param profile_fields: Profile fields as returned by Breeze
+    :return: Hex digest
+    """
+    encoded = json.dumps(profile_fields, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ProfileFieldCache(object):
+    """Saves and loads raw profile fields for one Breeze account."""
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = DEFAULT_PROFILE_CACHE_TTL,
+                 clock: Callable[[], float] = time.time):
+        """
+        Create a ProfileFieldCache.
+        :param path: File to keep the profile fields in
+        :param ttl: Seconds a saved copy is good for
+        :param clock: Source of the current time (for testing)
+        """
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self._clock = clock
+
+    def load(self, breeze_url: str) -> Union[List[dict], None]:
+        """
+        Get the saved profile fields if they're usable.
+        :param breeze_url: Account the fields must be for
+        :return: Profile fields as returned by Breeze, or None if there's no
+                 saved copy, or it's for another account, expired, or damaged.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            logging.warning('Ignoring unreadable profile cache %s: %s', self.path, error)
+            return None
+
+        if not isinstance(saved, dict) or saved.get('breeze_url') != breeze_url:
+            return None
+        age = self._clock() - saved.get('saved_at', 0)
+        if age < 0 or age > self.ttl:
+            return None
+        profile_fields = saved.get('profile_fields')
+        if not isinstance(profile_fields, list) or \
+                saved.get('sha256') != _fields_hash(profile_fields):
+            logging.warning('Ignoring damaged profile cache %s', self.path)
+            return None
+        return profile_fields
+
+    def save(self, breeze_url: str, profile_fields: List[dict]) -> None:
+        """
+        Save profile fields. The file is replaced all at once, so other
+        processes never see a partly written cache.
+        :param breeze_url: Account the fields are for
+        :param profile_fields: Profile fields as returned by Breeze
+        """
+        saved = {
+            'breeze_url': breeze_url,
+            'saved_at': self._clock(),
+            'sha256': _fields_hash(profile_fields),
+            'profile_fields': profile_fields,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(saved, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as error:
+            # Not being able to cache isn't fatal.
+            logging.warning('Unable to write profile cache %s: %s', self.path, error)
+
+    def clear(self) -> None:
+        """Remove the saved copy, if any."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,6 +1,12 @@
+import csv
 from abc import abstractmethod
-from typing import Union, List, Type, Mapping, Dict, Tuple
-from collections import OrderedDict
+from array import array
+from sys import intern
+from typing import (Union, List, Type, Mapping, Dict, Tuple, Iterable, Callable,
+                    Iterator, TextIO, NamedTuple)
+from collections import Counter, deque
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 
 
 def _extract_name(profile: dict) -> str:
@@ -35,6 +41,21 @@ def _extract_name(profile: dict) -> str:
         name = f'No name, id {id}'
     return name
 
+def _family_label(name: str, role: Union[str, None]) -> str:
+    """
+    :param name: A family member's name
+    :param role: Their role in the family, e.g. 'Spouse', or None
+    :return: How the family field shows them
+    """
+    return f'{name} ({role})' if role else name
+
+def _intern(value):
+    """
+    Intern a string, so repeated values share one copy. Breeze sometimes
+    sends other things, like numbers, which are returned unchanged.
+    """
+    return intern(value) if type(value) is str else value
+
 def _delist(val: Union[List[str], None]) -> Union[List[str], str, None]:
     """
     Turn a list of only one element into just that element
@@ -48,6 +69,12 @@ def _delist(val: Union[List[str], None]) -> Union[List[str], str, None]:
 
 
 class _BaseExtractor:
+    # There's one extractor per field, but no need for a __dict__ in each.
+    __slots__ = ('field_id', 'field_name')
+    # True if the value comes from the profile's 'details' and can be
+    # produced by convert()
+    in_details = False
+
     def __init__(self, name: str, field_id: str):
         """
         Construct extractor
@@ -67,6 +94,9 @@ class _BaseExtractor:
 
 class _Extractor(_BaseExtractor):
     """Simple case, value extractor"""
+    __slots__ = ()
+    in_details = True
+
     def __init__(self, name: str, field_id: str):
         _BaseExtractor.__init__(self, name, field_id)
 
@@ -76,9 +106,17 @@ class _Extractor(_BaseExtractor):
         :param profile: A user's profile
         :return: A single value list with the value, or None if no value
         """
-        details = profile.get('details')
-        return _delist(self._value_from_details(details))
-        # return self._value_from_details(details) if details else None
+        value = profile.get('details').get(self.field_id)
+        return self.convert(value) if value else None
+
+    def convert(self, value: Union[dict, List, str]) -> Union[List[str], str, None]:
+        """
+        Turn the field's raw value from a profile's details into what
+        ProfileHelper reports.
+        :param value: Non-empty value from details
+        :return: A single value, list of values, or None if no value
+        """
+        return _delist(self._process_field_value(value))
 
     def _value_from_details(self, details: dict) -> Union[List[str], None]:
         value = details.get(self.field_id)
@@ -90,6 +128,8 @@ class _Extractor(_BaseExtractor):
         pass
 
 class _NameExtractor(_BaseExtractor):
+    __slots__ = ()
+
     def __init__(self):
         _BaseExtractor.__init__(self, 'Name', 'name')
 
@@ -102,11 +142,15 @@ class _SimpleExtractor(_Extractor):
     The profile is just a single value, eg:
             "2114298802": "Wilder",
     """
+    __slots__ = ()
 
     def _process_field_value(self, value: Union[dict, List, str]) -> \
             Union[List[str], None]:
         return [value]
 
+    def convert(self, value: Union[dict, List, str]) -> Union[List[str], str, None]:
+        return value
+
 class _SingleValueExtractor(_Extractor):
     """
     The field can have exactly one value from a selection of possibilities, e.g.:
@@ -116,12 +160,18 @@ class _SingleValueExtractor(_Extractor):
         }
         "value" is an internal key for which value out of the universe of
         possibilities. "name" is the human-visible version.
+        Names are interned, since the same few are repeated across everyone.
     """
+    __slots__ = ()
 
     def _process_field_value(self, values: Union[dict, List, str]) ->\
             Union[List[str], None]:
         value = values.get('name')
-        return [value] if value else None
+        return [_intern(value)] if value else None
+
+    def convert(self, value: Union[dict, List, str]) -> Union[List[str], str, None]:
+        name = value.get('name')
+        return _intern(name) if name else None
 
 class _MultiValueExtractor(_Extractor):
     """
@@ -141,7 +191,9 @@ class _MultiValueExtractor(_Extractor):
           }
         ]
         Note that there always seems to be one empty entry.
+        Names are interned, since the same few are repeated across everyone.
     """
+    __slots__ = ()
 
     def _process_field_value(self, values: List[dict]) -> Union[List[str], None]:
         """
@@ -160,9 +212,11 @@ class _MultiValueExtractor(_Extractor):
 
     def _extract_entry(self, entry: dict) -> List[str]:
         value = entry.get('name')
-        return [value] if value else []
+        return [_intern(value)] if value else []
 
 class _EmailExtractor(_MultiValueExtractor):
+    __slots__ = ()
+
     def _extract_entry(self, entry: dict) -> List[str]:
         email = entry.get('address')
         if not email:
@@ -182,6 +236,8 @@ class _PhoneExtractor(_MultiValueExtractor):
     """
     Handle a phone field (can have multiple values)
     """
+    __slots__ = ()
+
     def _extract_entry(self, entry: dict) -> List[str]:
         phone = entry.get('phone_number')
         pt = entry.get('phone_type')
@@ -197,6 +253,9 @@ class _PhoneExtractor(_MultiValueExtractor):
             return []
 
 class _FamilyExtractor(_MultiValueExtractor):
+    __slots__ = ()
+    in_details = False
+
     def __init__(self):
         _MultiValueExtractor.__init__(self, "family", "family")
 
@@ -210,11 +269,7 @@ class _FamilyExtractor(_MultiValueExtractor):
         return _delist(self._value_from_details(profile))
 
     def _extract_entry(self, entry: dict) -> List[str]:
-        name = _extract_name(entry.get('details'))
-        role = entry.get('role_name')
-        if role:
-            name += f' ({role})'
-        return [name]
+        return [_family_label(_extract_name(entry.get('details')), entry.get('role_name'))]
 
 
 class _AddressExtractor(_MultiValueExtractor):
@@ -223,6 +278,8 @@ class _AddressExtractor(_MultiValueExtractor):
     but Breeze currently only supports one. This should still work if they
     start supporting extra addresses.
     """
+    __slots__ = ()
+
     def _extract_entry(self, entry: dict) -> List[str]:
         if not entry:
             return []
@@ -262,28 +319,290 @@ _extractors: Mapping[str, Type[_BaseExtractor]] = {
     'address': _AddressExtractor,
 }
 
+class HouseholdMember(NamedTuple):
+    """One person in a HouseholdIndex household."""
+    person_id: str
+    # Formatted as for the 'name' field, from the family entry
+    name: str
+    # e.g. 'Spouse' or 'Child', or None
+    role: Union[str, None]
+
+
+# Gets the person's id from a family entry
+_person_id = itemgetter('person_id')
+
+
+class HouseholdIndex(object):
+    """
+    Households (Breeze families) from profiles, as returned by
+    BreezeAPI.list_people(details=True). How each person is shown in family
+    values is formatted once, however many family lists they appear in, and
+    then looked up by their id. A family value is put together once for
+    each household and shared by everyone in it. The tables of households
+    and their members are only built if they're asked for.
+    An index describes one snapshot of an account. It can be brought up to
+    date with a later snapshot by adding that snapshot's profiles: people
+    who changed household are moved, and a person's name is formatted
+    again when their own profile is added.
+    """
+
+    def __init__(self, profile_list: Iterable[dict] = ()):
+        """
+        Create a HouseholdIndex.
+        :param profile_list: Profiles from one snapshot of an account. (Profiles
+                             from later snapshots can be added with add().)
+        """
+        # family id -> members, in the order first seen
+        self._households: Dict[str, List[HouseholdMember]] = {}
+        # person id -> family id, for people in a household
+        self._person_to_household: Dict[str, str] = {}
+        # person id -> their entry in _households
+        self._members: Dict[str, HouseholdMember] = {}
+        # person id -> formatted name, for people in _households
+        self._names: Dict[str, str] = {}
+        # person id -> how the family field shows them
+        self._labels: Dict[str, str] = {}
+        # Ids in a family list, in order -> its family value
+        self._values: Dict[tuple, Union[List[str], str]] = {}
+        # Family lists not yet put into _households. Family values are all
+        # most callers want, so that's only done when asked for.
+        self._unplaced: List[List[dict]] = []
+        for profile in profile_list:
+            family = profile.get('family')
+            if family:
+                self._unplaced.append(family)
+
+    def _read(self, family: List[dict]) -> Union[List[str], str]:
+        """
+        Put together a family value, formatting the names of anyone not
+        seen before.
+        :param family: A profile's non-empty 'family' list
+        :return: Its family value, shared with the rest of the household
+        """
+        try:
+            ids = tuple(map(_person_id, family))
+        except KeyError:
+            ids = None
+        labels = self._labels
+        row = []
+        for entry in family:
+            person_id = entry.get('person_id')
+            label = labels.get(person_id)
+            if label is None:
+                label = _family_label(_extract_name(entry.get('details')),
+                                      entry.get('role_name'))
+                if person_id is not None:
+                    labels[person_id] = label
+            row.append(label)
+        value = _delist(row)
+        if ids is not None and None not in ids:
+            self._values[ids] = value
+            self._unplaced.append(family)
+        return value
+
+    def _place_unplaced(self) -> None:
+        """Put everyone in the family lists read so far into _households."""
+        if not self._unplaced:
+            return
+        unplaced = self._unplaced
+        self._unplaced = []
+        for family in unplaced:
+            for entry in family:
+                person_id = entry.get('person_id')
+                if person_id is not None and person_id not in self._person_to_household:
+                    name = self._names.get(person_id)
+                    if name is None:
+                        name = self._names[person_id] = _extract_name(entry.get('details'))
+                    member = HouseholdMember(person_id, name, entry.get('role_name'))
+                    self._members[person_id] = member
+                    self._join(person_id, entry.get('family_id'), member)
+
+    def _join(self, person_id: str, family_id: str, member: HouseholdMember) -> None:
+        """Add someone to the end of a household."""
+        self._person_to_household[person_id] = family_id
+        self._households.setdefault(family_id, []).append(member)
+
+    @property
+    def households(self) -> Dict[str, List[HouseholdMember]]:
+        """family id -> members, in the order first seen"""
+        self._place_unplaced()
+        return self._households
+
+    @property
+    def person_to_household(self) -> Dict[str, str]:
+        """person id -> family id, for people in a household"""
+        self._place_unplaced()
+        return self._person_to_household
+
+    def add(self, profile: dict) -> None:
+        """
+        Add the household in a profile's family list. (Adding several
+        people from the same household does no harm.)
+        :param profile: A profile
+        """
+        family = profile.get('family')
+        if not family:
+            return
+        self._place_unplaced()
+        owner = profile.get('id')
+        for entry in family:
+            person_id = entry.get('person_id')
+            # Someone already in the index is only updated from their own
+            # profile. Other people's family lists may be from an older
+            # snapshot.
+            if person_id is not None and (person_id == owner or
+                                          person_id not in self._person_to_household):
+                self._place(person_id, entry)
+
+    def _place(self, person_id: str, entry: dict) -> None:
+        """
+        Put a person in the household given by their family entry, with
+        their name formatted from it.
+        :param person_id: Their id
+        :param entry: An entry from a profile's 'family' list
+        """
+        role = entry.get('role_name')
+        family_id = entry.get('family_id')
+        name = _extract_name(entry.get('details'))
+        old = self._members.get(person_id)
+        old_family_id = self._person_to_household.get(person_id)
+        if old is not None and old.name == name and old.role == role \
+                and old_family_id == family_id:
+            return
+        member = HouseholdMember(person_id, name, role)
+        self._members[person_id] = member
+        self._names[person_id] = name
+        self._labels[person_id] = _family_label(name, role)
+        # Family values with their old label are out of date.
+        self._values.clear()
+        if old_family_id is not None:
+            members = self._households[old_family_id]
+            position = next(i for i, m in enumerate(members)
+                            if m.person_id == person_id)
+            if old_family_id == family_id:
+                # Already here. Just keep up with name or role changes.
+                members[position] = member
+                return
+            # Moved to another household
+            del members[position]
+            if not members:
+                del self._households[old_family_id]
+        self._join(person_id, family_id, member)
+
+    def __len__(self):
+        return len(self.households)
+
+    def household_of(self, person_id: str) -> Union[str, None]:
+        """
+        :param person_id: A person's id
+        :return: The id of their household, or None if they aren't in one
+        """
+        return self.person_to_household.get(person_id)
+
+    def members(self, family_id: str) -> List[HouseholdMember]:
+        """
+        :param family_id: A household's id
+        :return: The people in it (empty if there's no such household)
+        """
+        return self.households.get(family_id, [])
+
+    def name(self, person_id: str) -> Union[str, None]:
+        """
+        :param person_id: A person's id
+        :return: Their name, as shown in family lists, or None if they
+                 aren't in a household that was added
+        """
+        self._place_unplaced()
+        return self._names.get(person_id)
+
+    def family_value(self, profile: dict) -> Union[List[str], str, None]:
+        """
+        Get the 'family' field of a profile, as ProfileHelper reports it,
+        from the names already formatted. If the profile's household hasn't
+        been added, it's read first.
+        :param profile: A profile
+        :return: A single value, list of values, or None if no family
+        """
+        family = profile.get('family')
+        if not family:
+            return None
+        try:
+            value = self._values.get(tuple(map(_person_id, family)))
+        except KeyError:
+            value = None
+        if value is None:
+            value = self._read(family)
+        # Everyone in the household gets their own list.
+        return value.copy() if type(value) is list else value
+
+
 class ProfileHelper:
-    def __init__(self, profile_fields):
+    def __init__(self, profile_fields,
+                 fields: Iterable[str] = None,
+                 sections: Iterable[str] = None):
         """
         Create a ProfileHelper.
         :param profile_fields: Profile fields as returned by
                                BreezeAPI.get_profile_fields()
+        :param fields: If given, only extract these fields. Each is a field id
+                       or a qualified name as in get_field_id_to_name(), e.g.
+                       'Communication:Email' or 'family'.
+        :param sections: If given, also extract every field in these sections
+        Notes: The person's name is always extracted. Names that don't match
+               any field are ignored, so the same lists can be used for an
+               account's older and newer profile fields.
         """
+        wanted = None
+        if fields is not None or sections is not None:
+            wanted = set(fields) if fields is not None else set()
+            wanted.add('name')
+        sections = set(sections) if sections is not None else set()
+
+        def keep(field_id: str, field_name: str, section_name: str = None) -> bool:
+            return wanted is None or field_id in wanted or field_name in wanted \
+                or section_name in sections
+
         self.id_to_field = {
             'name': _NameExtractor(),
         }
 
+        # Family isn't in 'details', but it has a field in the account's
+        # definitions, which can be asked for like any other.
+        family = keep('family', 'family')
         for section in profile_fields:
             section_name = section.get('name')
             for field_def in section.get('fields'):
                 field_type = field_def.get('field_type')
+                field_id = field_def.get('field_id')
+                field_name = f"{section_name}:{field_def.get('name')}"
                 extractor = _extractors.get(field_type)
                 if extractor:
-                    field_id = field_def.get('field_id')
-                    field_name = f"{section_name}:{field_def.get('name')}"
-                    self.id_to_field[field_id] = extractor(field_name, field_id)
-        self.id_to_field['family'] = _FamilyExtractor()
+                    if keep(field_id, field_name, section_name):
+                        self.id_to_field[field_id] = extractor(field_name, field_id)
+                elif field_type == 'family' and keep(field_id, field_name, section_name):
+                    family = True
+        if family:
+            self.id_to_field['family'] = _FamilyExtractor()
         self.id_to_name = {field_id: e.name for field_id, e in self.id_to_field.items()}
+        self._compile()
+
+    def _compile(self):
+        """
+        Build the extraction plan from id_to_field. Most fields are empty for
+        most people, so rather than ask every extractor for its value, each
+        profile's details are scanned once and only the non-empty values that
+        belong to a known field are converted. Position (in id_to_field) keeps
+        the output in the same order as the fields.
+        """
+        # field id -> (position, converter) for values found in 'details'
+        self._details_plan: Dict[str, Tuple[int, Callable]] = {}
+        # (position, field id, get_value) for values found elsewhere in the profile
+        self._profile_plan: List[Tuple[int, str, Callable]] = []
+        for position, (field_id, extractor) in enumerate(self.id_to_field.items()):
+            if extractor.in_details:
+                self._details_plan[field_id] = (position, extractor.convert)
+            else:
+                self._profile_plan.append((position, field_id, extractor.get_value))
 
     def process_member_profile(self, profile: dict) -> \
             Dict[str, Union[str, List[str]]]:
@@ -296,25 +615,125 @@ class ProfileHelper:
         Notes: The name of the field can be determined by the field_to_name map.
                The person's name is in the 'name' element in the returned dict.
         """
-        result = {'name': _extract_name(profile)}
-        for field_id, extractor in self.id_to_field.items():
+        return self._member_values(profile, self._profile_plan)
+
+    def _member_values(self, profile: dict,
+                       profile_plan: List[Tuple[int, str, Callable]]) -> \
+            Dict[str, Union[str, List[str]]]:
+        found = self._extract(profile, profile_plan)
+        found.sort()
+        return {field_id: value for _, field_id, value in found if value}
+
+    def _plan_with(self, households: HouseholdIndex) -> List[Tuple[int, str, Callable]]:
+        """
+        :param households: Index to get family values from
+        :return: _profile_plan, but getting the family field from households
+        """
+        return [(position, field_id,
+                 households.family_value if field_id == 'family' else get_value)
+                for position, field_id, get_value in self._profile_plan]
+
+    def _extract(self, profile: dict,
+                 profile_plan: List[Tuple[int, str, Callable]] = None) -> \
+            List[Tuple[int, str, Union[str, List[str], None]]]:
+        """
+        Run the extraction plan on a profile.
+        :param profile: A profile
+        :param profile_plan: Plan for values that aren't in 'details',
+                             if not _profile_plan
+        :return: (position, field id, value) for each field that might have a
+                 value, in no particular order. Values can still be empty.
+        """
+        plan = self._profile_plan if profile_plan is None else profile_plan
+        found = [(position, field_id, get_value(profile))
+                 for position, field_id, get_value in plan]
+        details = profile.get('details')
+        if details:
+            plan = self._details_plan
+            for field_id, value in details.items():
+                if value:
+                    step = plan.get(field_id)
+                    if step:
+                        found.append((step[0], field_id, step[1](value)))
+        return found
+
+    def _field_value(self, profile: dict, field_id: str) -> \
+            Union[str, List[str], None]:
+        """
+        Extract just one field from a profile.
+        :param profile: A profile
+        :param field_id: Field id
+        :return: The value, as process_member_profile() would give it, or
+                 None if there isn't one (or no such field)
+        """
+        extractor = self.id_to_field.get(field_id)
+        if extractor is None:
+            return None
+        if extractor.in_details:
+            details = profile.get('details')
+            value = details.get(field_id) if details else None
+            value = extractor.convert(value) if value else None
+        else:
             value = extractor.get_value(profile)
-            if value:
-                result[field_id] = value
-        return result
+        return value if value else None
 
-    def process_profiles(self, profile_list: List[dict]) -> \
+    def lazy_profile(self, profile: dict) -> 'LazyProfile':
+        """
+        Wrap a member's profile so fields are only extracted when asked for.
+        For reports that use a few fields this is much cheaper than
+        process_member_profile(), which extracts every field.
+        :param profile: A profile
+        :return: A LazyProfile for it
+        """
+        return LazyProfile(self, profile)
+
+    def lazy_profiles(self, profile_list: Iterable[dict]) -> Iterator['LazyProfile']:
+        """
+        :param profile_list: The profiles from a
+                         BreezeAPI.get_people(details=True) call, or an iterator
+                         over them such as BreezeAPI.iter_people(details=True)
+        :return: Iterator over a LazyProfile for each profile
+        """
+        for profile in profile_list:
+            yield LazyProfile(self, profile)
+
+    def process_profiles(self, profile_list: Iterable[dict],
+                         households: HouseholdIndex = None) -> \
             Dict[str, Dict[str, Union[str, List[str]]]]:
         """
         Return all nonempty values from a list of profiles
         :param profile_list: The profiles from a
-                         BreezeAPI.get_people(details=True) call
+                         BreezeAPI.get_people(details=True) call, or an iterator
+                         over them such as BreezeAPI.iter_people(details=True)
+        :param households: HouseholdIndex to reuse family members' names from,
+                           for example one built from the same profiles for
+                           a household report
         :return: dict from unique member id to the value returned by
                  self.process_member_profile() for each profile.
         """
-        return {profile.get('id'): self.process_member_profile(profile)
+        plan = self._profile_plan if households is None else self._plan_with(households)
+        return {profile.get('id'): self._member_values(profile, plan)
                 for profile in profile_list}
 
+    def process_profiles_columnar(self, profile_list: Iterable[dict],
+                                  households: HouseholdIndex = None) -> 'ProfileTable':
+        """
+        Like process_profiles(), but store the values by field rather than
+        by person, which takes much less memory for large accounts.
+        :param profile_list: The profiles from a
+                         BreezeAPI.get_people(details=True) call, or an iterator
+                         over them such as BreezeAPI.iter_people(details=True)
+        :param households: As for process_profiles()
+        :return: A ProfileTable with a row for each profile and a column for
+                 each field
+        """
+        plan = self._profile_plan if households is None else self._plan_with(households)
+        table = ProfileTable(self.id_to_name)
+        for profile in profile_list:
+            table._add_row(profile.get('id'), self._extract(profile, plan))
+        table._finish()
+        return table
+
     def get_field_id_to_name(self) -> Dict[str, str]:
         """
         Return map from field id to qualified field name, which includes
@@ -322,17 +741,216 @@ class ProfileHelper:
         """
         return self.id_to_name.copy()
 
-def _pop_next(dct: OrderedDict) -> Tuple[object, object]:
+# Marks a field a LazyProfile hasn't extracted yet
+_NOT_EXTRACTED = object()
+
+
+class LazyProfile(object):
     """
-    Do a popitem(last=False) on an OrderedDict, but catch
-    IndexError and return None, None instead
-    :param dct: OrderedDict
-    :return: Key and value from first item in the OrderedDict, or None, None if empty
+    A member's profile whose field values are extracted the first time
+    they're asked for, then remembered. Values are the same as
+    ProfileHelper.process_member_profile() gives.
     """
-    try:
-        return dct.popitem(last=False)
-    except KeyError:
-        return None, None
+    __slots__ = ('profile', '_helper', '_values')
+
+    def __init__(self, helper: ProfileHelper, profile: dict):
+        """
+        Create a LazyProfile. Use ProfileHelper.lazy_profile().
+        :param helper: ProfileHelper for the profile's account
+        :param profile: The raw profile
+        """
+        self.profile = profile
+        self._helper = helper
+        # field id -> value (or None), for fields extracted so far
+        self._values: Dict[str, Union[str, List[str], None]] = {}
+
+    @property
+    def id(self) -> str:
+        """The person's id"""
+        return self.profile.get('id')
+
+    def get(self, field_id: str, default=None) -> Union[str, List[str], None]:
+        """
+        :param field_id: Field id, e.g. 'name', 'family' or one from
+                         get_field_id_to_name()
+        :param default: What to return if the person has no value
+        :return: The field's value
+        """
+        value = self._values.get(field_id, _NOT_EXTRACTED)
+        if value is _NOT_EXTRACTED:
+            value = self._values[field_id] = \
+                self._helper._field_value(self.profile, field_id)
+        return default if value is None else value
+
+    def __getitem__(self, field_id: str) -> Union[str, List[str]]:
+        value = self.get(field_id)
+        if value is None:
+            raise KeyError(field_id)
+        return value
+
+    def __contains__(self, field_id) -> bool:
+        return self.get(field_id) is not None
+
+    def to_dict(self) -> Dict[str, Union[str, List[str]]]:
+        """
+        :return: Every field with a value, exactly as process_member_profile()
+                 gives them
+        """
+        values = {}
+        for field_id in self._helper.id_to_field:
+            value = self.get(field_id)
+            if value is not None:
+                values[field_id] = value
+        return values
+
+
+# Code in a ProfileTable column for a person with no value
+_NO_VALUE = -1
+
+
+class ProfileTable(object):
+    """
+    Profile values for many people, stored by column. Row i is the person
+    whose id is person_ids[i]. Each column is an array of codes, one per row,
+    for a field. A code is an index into values, the pool of distinct values
+    (each a string, or a tuple of strings for fields with several values),
+    or -1 if the person has no value for the field.
+    """
+
+    def __init__(self, field_names: Dict[str, str]):
+        """
+        Create an empty ProfileTable. Use ProfileHelper.process_profiles_columnar().
+        :param field_names: Map from field id to name, in column order
+        """
+        self.field_names: Dict[str, str] = dict(field_names)
+        self.person_ids: List[str] = []
+        self.columns: Dict[str, array] = {field_id: array('i')
+                                          for field_id in field_names}
+        self.values: List[Union[str, Tuple[str, ...]]] = []
+        self._codes: Dict[Union[str, Tuple[str, ...]], int] = {}
+        self._row_index: Union[Dict[str, int], None] = None
+
+    def _code(self, value: Union[str, List[str]]) -> int:
+        """
+        :param value: A field value
+        :return: Its code, adding it to the pool if it's new
+        """
+        if isinstance(value, list):
+            value = tuple(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def _add_row(self, person_id: str,
+                 found: List[Tuple[int, str, Union[str, List[str], None]]]) -> None:
+        """
+        Add a person.
+        :param person_id: Their id
+        :param found: Their values, from ProfileHelper._extract()
+        """
+        row = len(self.person_ids)
+        self.person_ids.append(person_id)
+        for _, field_id, value in found:
+            if value:
+                column = self.columns[field_id]
+                if len(column) < row:
+                    # Catch up on people without a value
+                    column.extend(array('i', [_NO_VALUE]) * (row - len(column)))
+                column.append(self._code(value))
+
+    def _finish(self) -> None:
+        """Fill out the columns after the last row is added."""
+        rows = len(self.person_ids)
+        for column in self.columns.values():
+            if len(column) < rows:
+                column.extend(array('i', [_NO_VALUE]) * (rows - len(column)))
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def row_of(self, person_id: str) -> Union[int, None]:
+        """
+        :param person_id: A person's id
+        :return: Their row, or None if they aren't in the table
+        """
+        if self._row_index is None:
+            self._row_index = {p: row for row, p in enumerate(self.person_ids)}
+        return self._row_index.get(person_id)
+
+    def _decode(self, code: int) -> Union[str, List[str], None]:
+        if code == _NO_VALUE:
+            return None
+        value = self.values[code]
+        return list(value) if isinstance(value, tuple) else value
+
+    def get(self, row: int, field_id: str) -> Union[str, List[str], None]:
+        """
+        :param row: Row number
+        :param field_id: Field id
+        :return: The value, as process_member_profile() would give it,
+                 or None if there isn't one.
+        """
+        return self._decode(self.columns[field_id][row])
+
+    def column(self, field_id: str) -> Iterator[Union[str, List[str], None]]:
+        """
+        :param field_id: Field id
+        :return: Iterator over the field's value (or None) for each row
+        """
+        return map(self._decode, self.columns[field_id])
+
+    def row(self, row: int) -> Dict[str, Union[str, List[str]]]:
+        """
+        :param row: Row number
+        :return: The person's values, exactly as process_member_profile() gives them
+        """
+        result = {}
+        for field_id, column in self.columns.items():
+            code = column[row]
+            if code != _NO_VALUE:
+                result[field_id] = self._decode(code)
+        return result
+
+    def value_counts(self, field_id: str) -> Dict[str, int]:
+        """
+        Count how many people have each value of a field. For fields with
+        several values, each of a person's values is counted.
+        :param field_id: Field id
+        :return: Map from value to number of people, most common first
+        """
+        counts = {}
+        for code, count in Counter(self.columns[field_id]).most_common():
+            if code == _NO_VALUE:
+                continue
+            value = self.values[code]
+            for v in (value if isinstance(value, tuple) else (value,)):
+                counts[v] = counts.get(v, 0) + count
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def write_csv(self, file: TextIO, field_ids: List[str] = None,
+                  separator: str = '; ') -> None:
+        """
+        Write the table as CSV, one line per person, without building
+        a dict for each person.
+        :param file: Open text file (opened with newline='')
+        :param field_ids: Fields to include, in order. Defaults to all.
+        :param separator: Put between the values of fields with several values
+        """
+        field_ids = list(self.columns) if field_ids is None else field_ids
+        columns = [self.columns[field_id] for field_id in field_ids]
+        cells = [v if isinstance(v, str) else separator.join(v) for v in self.values]
+        writer = csv.writer(file)
+        writer.writerow(['id'] + [self.field_names.get(f, f) for f in field_ids])
+        for row, person_id in enumerate(self.person_ids):
+            writer.writerow([person_id] +
+                            [cells[c[row]] if c[row] != _NO_VALUE else '' for c in columns])
+
+
+# Marks the end of keys in join_dicts()
+_NO_KEY = object()
+
 
 def join_dicts(values_right: Dict[str, Union[str, List[str], dict]],
                values_left: Dict[str, Union[str, List[str], dict]]) ->  \
@@ -348,42 +966,73 @@ def join_dicts(values_right: Dict[str, Union[str, List[str], dict]],
              a non-None value in at least one of the two inputs are in the output.
     """
 
-    dat_left = OrderedDict(values_left if values_left else {})
-    dat_right = OrderedDict(values_right if values_right else {})
-    key_left, val_left = _pop_next(dat_left)
-    key_right, val_right = _pop_next(dat_right)
+    right = values_right if values_right else {}
+    left = values_left if values_left else {}
     result = {}
+    # Keys leave the left side strictly in order, but can be taken from the
+    # middle of the right side. Rather than delete them there, skip any right
+    # key that's already in result. Right keys that are waiting for their turn
+    # on the left go to the back of the line (deferred). Every step uses up a
+    # left key or a right key, so this is linear in the size of the inputs.
+    left_keys = iter(left)
+    right_keys = iter(right)
+    deferred = deque()
+
+    def next_right():
+        for key in right_keys:
+            if key not in result:
+                return key
+        while deferred:
+            key = deferred.popleft()
+            if key not in result:
+                return key
+        return _NO_KEY
+
+    key_left = next(left_keys, _NO_KEY)
+    key_right = next_right()
 
-    while key_left or key_right:
+    while key_left is not _NO_KEY or key_right is not _NO_KEY:
         if key_left == key_right:
             # key exists in both, in order
-            result[key_right] = (val_right, val_left)
-            key_left, val_left = _pop_next(dat_left)
-            key_right, val_right = _pop_next(dat_right)
-        elif key_left in dat_right:
-            # Current value is later in reference in so pull it out and emit the pair
-            result[key_left] = (dat_right.pop(key_left), val_left)
-            key_left, val_left = _pop_next(dat_left)
-        elif key_right in dat_left:
+            result[key_right] = (right[key_right], left[key_left])
+            key_left = next(left_keys, _NO_KEY)
+            key_right = next_right()
+        elif key_left is not _NO_KEY and key_left in right and key_left not in result:
+            # Current value is later in reference so pull it out and emit the pair
+            result[key_left] = (right[key_left], left[key_left])
+            key_left = next(left_keys, _NO_KEY)
+        elif key_right is not _NO_KEY and key_right in left and key_right not in result:
             # Reference value appears later in current, so move it to the end
             # catch it later
-            dat_right[key_right] = val_right
-            key_right, val_right = _pop_next(dat_right)
+            deferred.append(key_right)
+            key_right = next_right()
             # But since we know current isn't in reference, also emit it
-            result[key_left] = (None, val_left)
-            key_left, val_left = _pop_next(dat_left)
+            result[key_left] = (None, left[key_left])
+            key_left = next(left_keys, _NO_KEY)
         else:
             # At this point, we know neither value is in the other, so
             # just emit them both.
-            if key_right:
-                result[key_right] = (val_right, None)
-                key_right, val_right = _pop_next(dat_right)
-            if key_left:
-                result[key_left] = (None, val_left)
-                key_left, val_left = _pop_next(dat_left)
+            if key_right is not _NO_KEY:
+                result[key_right] = (right[key_right], None)
+                key_right = next_right()
+            if key_left is not _NO_KEY:
+                result[key_left] = (None, left[key_left])
+                key_left = next(left_keys, _NO_KEY)
 
     return result
 
+def _value_set(value: Union[str, List[str], None]) -> Dict[str, None]:
+    """
+    Turn a field value into a set of values that keeps their order, so
+    reports come out the same every time (and in every process).
+    :param value: A single value, list of values, or None
+    :return: dict whose keys are the distinct values
+    """
+    if not value:
+        return {}
+    return dict.fromkeys(value if isinstance(value, list) else [value])
+
+
 def profile_compare(diffs: Dict[str, Dict[str, Dict[str, Tuple[List, List]]]],
                     field_map: Dict[str, str] = None) \
         -> List[Tuple[str, List[Tuple[str, List[str], List[str]]]]]:
@@ -412,25 +1061,48 @@ def profile_compare(diffs: Dict[str, Dict[str, Dict[str, Tuple[List, List]]]],
             val_r, val_c = vals
             # print(f'{field_id} {val_r} {val_c}')
             if val_r != val_c:
-                set_r = set(val_r if isinstance(val_r, list) else [val_r]) \
-                    if val_r else set()
-                set_c = set(val_c if isinstance(val_c, list) else [val_c]) \
-                    if val_c else set()
-                if set_r != set_c:
+                set_r = _value_set(val_r)
+                set_c = _value_set(val_c)
+                if set_r.keys() != set_c.keys():
                     field_name = field_map.get(field_id, field_id)
                     person_result.append((field_name,
-                                          list(set_r - set_c),
-                                          list(set_c - set_r)))
+                                          [v for v in set_r if v not in set_c],
+                                          [v for v in set_c if v not in set_r]))
         if person_result:
             person_name = (fields_r if fields_r else fields_c).get('name')
             result.append((person_name, person_result))
     return result
 
 
+def _compare_partition(prev_helper: ProfileHelper,
+                       cur_helper: ProfileHelper,
+                       prev_people: List[dict],
+                       cur_people: List[dict],
+                       person_ids: List[str],
+                       field_names: Dict[str, str]) -> \
+        List[Tuple[str, List[Tuple[str, List[str], List[str]]]]]:
+    """
+    Compare some of the people for compare_profiles(). This runs in a worker process.
+    :param prev_helper: ProfileHelper for the reference profiles
+    :param cur_helper: ProfileHelper for the current profiles
+    :param prev_people: Reference profiles of the people in this partition
+    :param cur_people: Current profiles of the people in this partition
+    :param person_ids: Ids of the people in this partition, in report order
+    :param field_names: Map from field id to name
+    :return: See profile_compare()
+    """
+    cur_values = cur_helper.process_profiles(cur_people)
+    ref_values = prev_helper.process_profiles(prev_people)
+    diffs = {person_id: (ref_values.get(person_id), cur_values.get(person_id))
+             for person_id in person_ids}
+    return profile_compare(diffs, field_names)
+
+
 def compare_profiles(prev_helper: ProfileHelper,
                      cur_helper: ProfileHelper,
                      prev_people: List[dict],
-                     cur_people: List[dict]) -> \
+                     cur_people: List[dict],
+                     workers: int = None) -> \
         List[Tuple[str, List[Tuple[str, List[str], List[str]]]]]:
     """
     Create a report of differences between two instances of a Breeze account.
@@ -440,6 +1112,10 @@ def compare_profiles(prev_helper: ProfileHelper,
     :param prev_people: Profile entries for the reference version
     as returned by BreezeAPI.list_people()
     :param cur_people: A list of profile entries for the current version, same format.
+    :param workers: If more than 1, split the people between this many
+    processes. The result is the same either way.
+    Only the fields the helpers extract are compared, so helpers created
+    with the same fields and sections limit the work to those fields.
     :return: A list of profiles that had changed values. Each element is a tuple
     with the profile name and a list of changed fields. Each entry in the
     fields list has the field name, a list of values from the previous
@@ -448,11 +1124,40 @@ def compare_profiles(prev_helper: ProfileHelper,
     """
     field_names = prev_helper.get_field_id_to_name()
     field_names.update(cur_helper.get_field_id_to_name())
-    cur_values = cur_helper.process_profiles(cur_people)
-    ref_values = prev_helper.process_profiles(prev_people)
-    merged_values = join_dicts(ref_values, cur_values)
+    if not workers or workers <= 1:
+        cur_values = cur_helper.process_profiles(cur_people)
+        ref_values = prev_helper.process_profiles(prev_people)
+        merged_values = join_dicts(ref_values, cur_values)
+        return profile_compare(merged_values, field_names)
 
-    return profile_compare(merged_values, field_names)
+    # Work out the report order from the ids alone, then give each worker
+    # a contiguous run of it, so joining the workers' reports in order
+    # gives exactly what the serial version would.
+    prev_people = list(prev_people)
+    cur_people = list(cur_people)
+    person_ids = list(join_dicts(dict.fromkeys(p.get('id') for p in prev_people),
+                                 dict.fromkeys(p.get('id') for p in cur_people)))
+    workers = min(workers, max(1, len(person_ids)))
+    chunk = -(-len(person_ids) // workers)
+    partition_of = {person_id: index // chunk
+                    for index, person_id in enumerate(person_ids)}
+    prev_parts = [[] for _ in range(workers)]
+    cur_parts = [[] for _ in range(workers)]
+    for profile in prev_people:
+        prev_parts[partition_of[profile.get('id')]].append(profile)
+    for profile in cur_people:
+        cur_parts[partition_of[profile.get('id')]].append(profile)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_compare_partition, prev_helper, cur_helper,
+                                   prev_parts[index], cur_parts[index],
+                                   person_ids[index * chunk:(index + 1) * chunk],
+                                   field_names)
+                   for index in range(workers)]
+        result = []
+        for future in futures:
+            result.extend(future.result())
+    return result
 
 if __name__ == '__main__':
     pass
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Token bucket rate limiter for Breeze API requests.
+
+A RateLimiter is shared by every thread making requests through the same
+BreezeApi instance, so the combined request rate stays within what Breeze
+allows.
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import threading
+import time
+from typing import Callable
+
+
+class RateLimiter(object):
+    """
+    Token bucket. Tokens are added at `rate` per second, up to `burst`, and
+    each request takes one. Requests can also be paused for everyone,
+    as when Breeze says to come back later.
+    """
+
+    def __init__(self,
+                 rate: float = None,
+                 burst: int = 1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Create a RateLimiter.
+        :param rate: Sustained requests per second. If None, requests are
+                     only limited by pause().
+        :param burst: Number of requests that can be made back-to-back
+                      after a quiet period.
+        :param clock: Source of the current time in seconds (for testing)
+        :param sleep: Function to wait some seconds (for testing)
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._resume_at = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Add tokens earned since the last update. Caller holds the lock."""
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self) -> float:
+        """
+        Wait until a request may be made.
+        :return: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._resume_at - now
+                if wait <= 0:
+                    if not self.rate:
+                        return waited
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold off all requests for a while, e.g. after Breeze returns 429.
+        :param seconds: How long to wait before the next request
+        """
+        with self._lock:
+            now = self._clock()
+            resume_at = now + max(seconds, 0)
+            if resume_at > self._resume_at:
+                self._resume_at = resume_at
+            # Don't let tokens earned during the pause turn into a burst
+            # as soon as it ends.
+            self._tokens = 0.0
+            self._updated = max(self._updated, self._resume_at)
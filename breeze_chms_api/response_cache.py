@@ -0,0 +1,172 @@
+"""Cache of responses to Breeze API calls that just read data.
+
+Things like funds, calendars and tags rarely change, but programs tend to ask
+for them over and over. A ResponseCache given to BreezeApi remembers those
+answers for a while, so repeated calls don't go back to Breeze.
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Mapping, Tuple, Union
+
+# Default seconds to keep responses. Keys are either an endpoint
+# ('funds') or an endpoint and command ('events/calendars/list'), the latter
+# taking precedence. Calls that match neither aren't cached.
+DEFAULT_TTLS = {
+    'funds': 60 * 60,
+    'tags': 60 * 60,
+    'pledges/list_campaigns': 60 * 60,
+    'events/calendars/list': 60 * 60,
+}
+
+# Endpoints whose responses depend on another endpoint's data, e.g. fund
+# and pledge campaign totals include contributions (endpoint 'giving').
+# A change to the key endpoint forgets responses for these too.
+DEFAULT_DEPENDENTS = {
+    'giving': ('funds', 'pledges'),
+}
+
+# Default maximum number of responses kept
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResponseCache(object):
+    """
+    Least-recently-used cache of API responses, each kept for a time that
+    depends on the call. Thread-safe.
+    """
+
+    def __init__(self,
+                 ttls: Mapping[str, float] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic,
+                 dependents: Mapping[str, Iterable[str]] = None):
+        """
+        Create a ResponseCache.
+        :param ttls: Map from endpoint, or endpoint/command, to seconds to
+                     keep responses. Defaults to DEFAULT_TTLS.
+        :param max_entries: Most responses to keep. When full, the one
+                     used least recently is dropped.
+        :param clock: Source of the current time in seconds (for testing)
+        :param dependents: Map from endpoint to other endpoints whose saved
+                     responses are forgotten when it changes. Defaults to
+                     DEFAULT_DEPENDENTS.
+        """
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.dependents = {endpoint: tuple(others) for endpoint, others in
+                           (DEFAULT_DEPENDENTS if dependents is None else dependents).items()}
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expiration time, response)
+        self._entries: 'OrderedDict[Hashable, Tuple[float, object]]' = OrderedDict()
+        # endpoint -> number of times it's been invalidated, and the number of
+        # times everything has been cleared, so put() can tell if a response
+        # was fetched before its endpoint changed
+        self._generations: Dict[str, int] = {}
+        self._clears = 0
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, endpoint: str, command: str) -> Union[float, None]:
+        """
+        How long to keep responses to a call.
+        :param endpoint: Endpoint name, e.g. 'events'
+        :param command: Command, e.g. 'calendars/list'
+        :return: Seconds, or None if this call isn't cached
+        """
+        ttl = self.ttls.get(f'{endpoint}/{command}')
+        return ttl if ttl is not None else self.ttls.get(endpoint)
+
+    @staticmethod
+    def _key(endpoint: str, command: str, params: Mapping[str, str]) -> Hashable:
+        return endpoint, command, tuple(sorted(params.items())) if params else ()
+
+    def get(self, endpoint: str, command: str, params: Mapping[str, str]):
+        """
+        Look up a saved response.
+        :param endpoint: Endpoint name
+        :param command: Command
+        :param params: Request parameters, as sent to Breeze
+        :return: A copy of the saved response, or None if there isn't a fresh one
+        """
+        if self.ttl_for(endpoint, command) is None:
+            return None
+        key = self._key(endpoint, command, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            response = entry[1]
+        # Callers are free to change what they get back.
+        return copy.deepcopy(response)
+
+    def generation(self, endpoint: str) -> Hashable:
+        """
+        Get a value that changes whenever an endpoint's saved responses are
+        forgotten. Get it before sending a request, and pass it to put().
+        :param endpoint: Endpoint name
+        :return: The endpoint's current generation
+        """
+        with self._lock:
+            return self._clears, self._generations.get(endpoint, 0)
+
+    def put(self, endpoint: str, command: str, params: Mapping[str, str],
+            response, generation: Hashable = None) -> None:
+        """
+        Save a response, if this call is cached.
+        :param endpoint: Endpoint name
+        :param command: Command
+        :param params: Request parameters, as sent to Breeze
+        :param response: Decoded response from Breeze
+        :param generation: generation(endpoint) from before the request was
+                     sent. If the endpoint was invalidated since, the
+                     response may be out of date, so it isn't saved.
+        """
+        ttl = self.ttl_for(endpoint, command)
+        if ttl is None or response is None:
+            return
+        key = self._key(endpoint, command, params)
+        saved = copy.deepcopy(response)
+        with self._lock:
+            if generation is not None and \
+                    generation != (self._clears, self._generations.get(endpoint, 0)):
+                return
+            self._entries[key] = (self._clock() + ttl, saved)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint: str) -> None:
+        """
+        Forget all saved responses for an endpoint, as after a change to its
+        data, and for the endpoints that depend on it.
+        :param endpoint: Endpoint name
+        """
+        endpoints = {endpoint, *self.dependents.get(endpoint, ())}
+        with self._lock:
+            for name in endpoints:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [k for k in self._entries if k[0] in endpoints]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Forget everything."""
+        with self._lock:
+            self._clears += 1
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
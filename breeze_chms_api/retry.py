@@ -0,0 +1,105 @@
+"""Retry policy for failed Breeze API requests.
+
+A RetryPolicy says which failures are worth trying again and how long to
+wait between tries. RetryCounts keeps track of how often that happened.
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable
+
+# Server errors that are usually temporary
+DEFAULT_RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+
+class RetryPolicy(object):
+    """
+    When and how to retry a failed request. Waits grow exponentially:
+    backoff_base, 2 * backoff_base, 4 * backoff_base... up to backoff_cap.
+    With jitter, each wait is instead a random time up to that value, so
+    many clients that failed together don't all retry together.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_cap: float = 30.0,
+                 jitter: bool = True,
+                 retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+                 retry_mutating: bool = False,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Create a RetryPolicy.
+        :param max_attempts: Total tries for a request, including the first.
+                             1 means never retry.
+        :param backoff_base: Seconds to wait before the first retry
+        :param backoff_cap: Longest wait between tries, in seconds
+        :param jitter: If True, randomize each wait between 0 and its nominal value
+        :param retry_statuses: HTTP status codes that are worth retrying
+        :param retry_mutating: If True, also retry commands that change data
+                               (add, update, delete...). Off by default since
+                               a request that timed out may still have been done.
+        :param sleep: Function to wait some seconds (for testing)
+        """
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_mutating = retry_mutating
+        self.sleep = sleep
+
+    def backoff(self, retry: int) -> float:
+        """
+        How long to wait before a retry.
+        :param retry: Which retry this is, starting with 1
+        :return: Seconds to wait
+        """
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** (retry - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class RetryCounts(object):
+    """Thread-safe tally of requests and retries for each kind of call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, float]] = {}
+
+    def record(self, call: str, retries: int, retry_seconds: float, failed: bool) -> None:
+        """
+        Add one request to the tally.
+        :param call: Which call, e.g. 'people/list'
+        :param retries: Number of times the request was repeated
+        :param retry_seconds: Total time spent waiting between tries
+        :param failed: True if the request failed in the end
+        """
+        with self._lock:
+            counts = self._counts.get(call)
+            if counts is None:
+                counts = {'calls': 0, 'retries': 0, 'retry_seconds': 0.0, 'failures': 0}
+                self._counts[call] = counts
+            counts['calls'] += 1
+            counts['retries'] += retries
+            counts['retry_seconds'] += retry_seconds
+            if failed:
+                counts['failures'] += 1
+
+    def get(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return a copy of the counts.
+        :return: Map from call to a dict with 'calls', 'retries',
+                 'retry_seconds' and 'failures'
+        """
+        with self._lock:
+            return {call: dict(counts) for call, counts in self._counts.items()}
+
+    def reset(self) -> None:
+        """Start counting over."""
+        with self._lock:
+            self._counts = {}
@@ -0,0 +1,297 @@
+"""Compact snapshot files of a Breeze account's profiles.
+
+A snapshot holds the profile fields and everyone's profile, as returned by
+get_profile_fields() and list_people(details=True), so they can be compared
+with a later snapshot by compare_profiles(). Profiles are stored as lines of
+JSON in separately compressed blocks, with an index from person id to block
+at the end of the file, so one person (or a few) can be read without
+decompressing or parsing the rest.
+
+  save_snapshot(api, 'people-2024-03-03.bzs')
+  ...
+  prev_fields, prev_people = load_snapshot('people-2024-03-03.bzs')
+  with SnapshotReader('people-2024-03-03.bzs') as snapshot:
+      person = snapshot.get('13701083')
+
+File layout:
+  MAGIC
+  compressed blocks: the profile fields, then people, one JSON per line
+  compressed index (JSON): where each block is, and the ids of the people in it
+  index offset and length (8 bytes each, big-endian), MAGIC
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from .breeze import BreezeApi, DEFAULT_PAGE_SIZE
+
+MAGIC = b'BREEZESNAP1\n'
+# Default number of people in each compressed block. Bigger blocks compress
+# better; smaller ones make reading one person faster.
+DEFAULT_BLOCK_SIZE = 200
+# zlib compression level
+_COMPRESSION = 6
+_TRAILER = struct.Struct('>QQ')
+
+
+class BadSnapshot(ValueError):
+    """The file isn't a snapshot, or is damaged."""
+
+
+class Snapshot(NamedTuple):
+    """What load_snapshot() returns."""
+    # As returned by BreezeApi.get_profile_fields()
+    profile_fields: List[dict]
+    # As returned by BreezeApi.list_people(details=True)
+    people: List[dict]
+
+
+class _BlockWriter(object):
+    """Writes compressed blocks and keeps track of where they went."""
+
+    def __init__(self, f):
+        self.f = f
+        # (offset, length) of each block
+        self.blocks: List[Tuple[int, int]] = []
+        # Ids of the people in each block, in order
+        self.block_ids: List[List[str]] = []
+
+    def write(self, lines: List[bytes], ids: List[str] = ()) -> int:
+        """
+        :param lines: Lines for the block, without newlines
+        :param ids: Ids of the people on the lines
+        :return: The block's number
+        """
+        data = zlib.compress(b'\n'.join(lines), _COMPRESSION)
+        self.blocks.append((self.f.tell(), len(data)))
+        self.block_ids.append(list(ids))
+        self.f.write(data)
+        return len(self.blocks) - 1
+
+
+def _plain_fields(profile_fields: List[dict]) -> List[dict]:
+    """
+    :param profile_fields: As returned by BreezeApi.get_profile_fields()
+    :return: A copy without the 'section_spec' references BreezeApi adds
+             from each field back to its section, which can't be saved as JSON
+    """
+    return [dict(section, fields=[{k: v for k, v in field.items() if k != 'section_spec'}
+                                  for field in section.get('fields') or []])
+            for section in profile_fields]
+
+
+def write_snapshot(path: str,
+                   profile_fields: List[dict],
+                   people: Iterable[dict],
+                   block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """
+    Write a snapshot file. People are written as they come, so they don't
+    all need to be in memory. The file is replaced all at once, so readers
+    never see a partly written snapshot.
+    :param path: File to write
+    :param profile_fields: As returned by BreezeApi.get_profile_fields()
+    :param people: Profiles as returned by BreezeApi.list_people(details=True)
+    :param block_size: Number of people in each compressed block
+    :return: Number of people written
+    :raises: ValueError if block_size isn't positive
+    """
+    if block_size < 1:
+        raise ValueError('block_size must be at least 1')
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            writer = _BlockWriter(f)
+            fields_block = writer.write(
+                [json.dumps(_plain_fields(profile_fields)).encode('utf-8')])
+            count = 0
+            lines = []
+            ids = []
+            for person in people:
+                ids.append(str(person.get('id')))
+                lines.append(json.dumps(person, separators=(',', ':')).encode('utf-8'))
+                if len(lines) >= block_size:
+                    writer.write(lines, ids)
+                    count += len(lines)
+                    lines = []
+                    ids = []
+            if lines:
+                writer.write(lines, ids)
+                count += len(lines)
+
+            index = zlib.compress(json.dumps({
+                'created': time.time(),
+                'fields_block': fields_block,
+                'blocks': writer.blocks,
+                'block_ids': writer.block_ids,
+            }, separators=(',', ':')).encode('utf-8'), _COMPRESSION)
+            index_offset = f.tell()
+            f.write(index)
+            f.write(_TRAILER.pack(index_offset, len(index)))
+            f.write(MAGIC)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return count
+
+
+def save_snapshot(api: BreezeApi,
+                  path: str,
+                  block_size: int = DEFAULT_BLOCK_SIZE,
+                  page_size: int = DEFAULT_PAGE_SIZE) -> int:
+    """
+    Save an account's profile fields and everyone's profile in a snapshot file.
+    :param api: BreezeApi for the account
+    :param path: File to write
+    :param block_size: Number of people in each compressed block
+    :param page_size: Number of people fetched per request
+    :return: Number of people saved
+    """
+    return write_snapshot(path, api.get_profile_fields(),
+                          api.iter_people(page_size=page_size, details=True),
+                          block_size)
+
+
+class SnapshotReader(object):
+    """Reads a snapshot file, decompressing only the blocks needed."""
+
+    def __init__(self, path: str):
+        """
+        Open a snapshot and read its index.
+        :param path: Snapshot file
+        :raises: BadSnapshot if it isn't a snapshot or is damaged
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._read_index()
+        except BaseException:
+            self._file.close()
+            raise
+        self._fields = None
+
+    def _read_index(self) -> None:
+        f = self._file
+        if f.read(len(MAGIC)) != MAGIC:
+            raise BadSnapshot(f'{self.path} is not a snapshot')
+        tail = len(MAGIC) + _TRAILER.size
+        f.seek(0, os.SEEK_END)
+        if f.tell() < len(MAGIC) + tail:
+            raise BadSnapshot(f'{self.path} is incomplete')
+        f.seek(-tail, os.SEEK_END)
+        trailer = f.read(tail)
+        if trailer[_TRAILER.size:] != MAGIC:
+            raise BadSnapshot(f'{self.path} is incomplete')
+        index_offset, index_length = _TRAILER.unpack(trailer[:_TRAILER.size])
+        try:
+            index = json.loads(self._read(index_offset, index_length))
+            self._blocks: List[Tuple[int, int]] = index['blocks']
+            self._fields_block: int = index['fields_block']
+            self.created: float = index['created']
+            # person id -> (block, line)
+            self._people: Dict[str, Tuple[int, int]] = {
+                person_id: (number, line)
+                for number, ids in enumerate(index['block_ids'])
+                for line, person_id in enumerate(ids)}
+        except (ValueError, KeyError, TypeError) as error:
+            raise BadSnapshot(f'{self.path} has a damaged index: {error}')
+
+    def _read(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        data = self._file.read(length)
+        try:
+            return zlib.decompress(data)
+        except zlib.error as error:
+            raise BadSnapshot(f'{self.path} is damaged: {error}')
+
+    def _block(self, number: int) -> List[bytes]:
+        """
+        :param number: Block number
+        :return: The block's lines
+        """
+        return self._read(*self._blocks[number]).split(b'\n')
+
+    @property
+    def profile_fields(self) -> List[dict]:
+        """The profile fields, as returned by BreezeApi.get_profile_fields()"""
+        if self._fields is None:
+            self._fields = json.loads(self._block(self._fields_block)[0])
+        return self._fields
+
+    def person_ids(self) -> List[str]:
+        """
+        :return: Ids of everyone in the snapshot, in the order they were saved
+        """
+        return list(self._people)
+
+    def __len__(self):
+        return len(self._people)
+
+    def __contains__(self, person_id):
+        return str(person_id) in self._people
+
+    def get(self, person_id: Union[str, int]) -> Union[dict, None]:
+        """
+        :param person_id: A person's id
+        :return: Their profile, or None if they aren't in the snapshot
+        """
+        where = self._people.get(str(person_id))
+        if where is None:
+            return None
+        return json.loads(self._block(where[0])[where[1]])
+
+    def iter_people(self, person_ids: Iterable[Union[str, int]] = None) -> Iterator[dict]:
+        """
+        Read profiles, one block at a time.
+        :param person_ids: If given, only these people (ids that aren't in
+                           the snapshot are ignored)
+        :return: Iterator over the profiles, in the order they were saved
+        """
+        if person_ids is None:
+            # Every line of every block is wanted, so parse each block as
+            # one JSON array. (JSON text never has raw newlines in it.)
+            for number in range(len(self._blocks)):
+                if number != self._fields_block:
+                    data = self._read(*self._blocks[number])
+                    yield from json.loads(b'[' + data.replace(b'\n', b',') + b']')
+            return
+        # block -> lines wanted from it
+        wanted: Dict[int, List[int]] = {}
+        for person_id in person_ids:
+            where = self._people.get(str(person_id))
+            if where is not None:
+                wanted.setdefault(where[0], []).append(where[1])
+        for number in sorted(wanted):
+            lines = self._block(number)
+            for line in sorted(set(wanted[number])):
+                yield json.loads(lines[line])
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def load_snapshot(path: str, person_ids: Iterable[Union[str, int]] = None) -> Snapshot:
+    """
+    Load a snapshot.
+    :param path: Snapshot file
+    :param person_ids: If given, only load these people
+    :return: Snapshot with the profile fields and people
+    :raises: BadSnapshot if it isn't a snapshot or is damaged
+    """
+    with SnapshotReader(path) as reader:
+        return Snapshot(reader.profile_fields, list(reader.iter_people(person_ids)))
@@ -2,10 +2,34 @@ import unittest
 
 from .breeze_test import BreezeApiTestCase
 from .profile_helper_test import HelperTests, DiffTests
+from .async_breeze_test import AsyncBreezeApiTestCase
+from .rate_limiter_test import RateLimiterTests
+from .retry_test import RetryTests
+from .profile_cache_test import ProfileCacheTests
+from .response_cache_test import ResponseCacheTests
+from .people_sync_test import PeopleSyncTests
+from .json_stream_test import JsonStreamTests
+from .contribution_import_test import ContributionImportTests
+from .instrumentation_test import InstrumentationTests
+from .mock_breeze_test import MockServerTests
+from .benchmark_suite_test import BenchmarkSuiteTests
+from .snapshot_test import SnapshotTests
 
 def all_tests():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(BreezeApiTestCase))
     suite.addTest(unittest.makeSuite(HelperTests))
     suite.addTest(unittest.makeSuite(DiffTests))
+    suite.addTest(unittest.makeSuite(AsyncBreezeApiTestCase))
+    suite.addTest(unittest.makeSuite(RateLimiterTests))
+    suite.addTest(unittest.makeSuite(RetryTests))
+    suite.addTest(unittest.makeSuite(ProfileCacheTests))
+    suite.addTest(unittest.makeSuite(ResponseCacheTests))
+    suite.addTest(unittest.makeSuite(PeopleSyncTests))
+    suite.addTest(unittest.makeSuite(JsonStreamTests))
+    suite.addTest(unittest.makeSuite(ContributionImportTests))
+    suite.addTest(unittest.makeSuite(InstrumentationTests))
+    suite.addTest(unittest.makeSuite(MockServerTests))
+    suite.addTest(unittest.makeSuite(BenchmarkSuiteTests))
+    suite.addTest(unittest.makeSuite(SnapshotTests))
     return suite
\ No newline at end of file
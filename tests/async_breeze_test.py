@@ -0,0 +1,130 @@
+"""Unittests for async_breeze.py
+
+Usage:
+  python -m unittest tests.async_breeze_test
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from breeze_chms_api import breeze
+from breeze_chms_api.async_breeze import (AsyncBreezeApi, _ASYNC_METHODS,
+                                          _DIRECT_METHODS, _OMITTED_METHODS)
+from breeze_chms_api.breeze import ENDPOINTS
+from .breeze_test import (MockConnection, MockResponse,
+                          FAKE_API_KEY, FAKE_SUBDOMAIN)
+
+
+class SlowConnection(MockConnection):
+    """Mock connection that takes a while to respond, tracking overlap."""
+
+    def __init__(self, response, delay=0.05):
+        MockConnection.__init__(self, response)
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, verify, params, headers, timeout):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return MockConnection.get(self, url, verify, params, headers, timeout)
+
+
+class AsyncBreezeApiTestCase(unittest.TestCase):
+
+    def make_api(self, result, concurrency=4, delay=0.0):
+        self.connection = SlowConnection(MockResponse(200, result), delay=delay)
+        api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN,
+                               api_key=FAKE_API_KEY,
+                               connection=self.connection)
+        self.async_api = AsyncBreezeApi(api, concurrency=concurrency)
+        self.addCleanup(self.async_api.close)
+
+    def test_list_people(self):
+        expect = [{'id': '1', 'first_name': 'Alex'}]
+        self.make_api(expect)
+        result = asyncio.run(self.async_api.list_people(limit=1))
+        self.assertEqual(expect, result)
+        self.assertTrue(self.connection.url[0].startswith(
+            f'{FAKE_SUBDOMAIN}/api/{ENDPOINTS.PEOPLE.value}/'))
+        self.assertEqual({'limit': '1'}, self.connection.params[0])
+
+    def test_errors_propagate(self):
+        self.make_api({'errors': 'Some Errors'})
+        self.assertRaises(breeze.BreezeError,
+                          lambda: asyncio.run(self.async_api.list_funds()))
+
+    def test_gather_person_details(self):
+        self.make_api({'id': 'x'}, concurrency=4, delay=0.05)
+        ids = [str(i) for i in range(12)]
+        result = asyncio.run(self.async_api.gather_person_details(ids))
+        self.assertEqual(len(ids), len(result))
+        self.assertEqual(sorted(f'{FAKE_SUBDOMAIN}/api/people/{i}?' for i in ids),
+                         sorted(self.connection.url))
+        self.assertGreater(self.connection.max_active, 1)
+        self.assertLessEqual(self.connection.max_active, 4)
+
+    def test_gather_concurrency_limit(self):
+        self.make_api({'id': 'x'}, concurrency=4, delay=0.02)
+        asyncio.run(self.async_api.gather_person_details(range(6), concurrency=2))
+        self.assertLessEqual(self.connection.max_active, 2)
+
+    def test_exit_does_not_block_loop(self):
+        self.make_api({'id': 'x'}, delay=0.3)
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            ticker = asyncio.create_task(tick())
+            async with self.async_api as api:
+                request = asyncio.ensure_future(api.get_person_details('1'))
+                await asyncio.sleep(0.05)
+                started = len(ticks)
+            # Leaving waited for the request, but the ticker kept going.
+            self.assertTrue(request.done())
+            self.assertGreater(len(ticks) - started, 5)
+            ticker.cancel()
+            return await request
+
+        self.assertEqual({'id': 'x'}, asyncio.run(run()))
+
+    def test_methods_match(self):
+        # Every public BreezeApi method is wrapped, or left out on purpose.
+        public = {name for name in dir(breeze.BreezeApi)
+                  if not name.startswith('_') and callable(getattr(breeze.BreezeApi, name))}
+        listed = _ASYNC_METHODS + _DIRECT_METHODS + _OMITTED_METHODS
+        self.assertEqual(len(listed), len(set(listed)))
+        self.assertEqual(public, set(listed))
+        for name in _ASYNC_METHODS:
+            self.assertTrue(asyncio.iscoroutinefunction(getattr(AsyncBreezeApi, name)), name)
+
+    def test_direct_methods(self):
+        self.make_api([{'id': '1', 'fields': []}])
+        asyncio.run(self.async_api.list_funds())
+        self.assertEqual(1, self.async_api.stats()['funds/list']['calls'])
+        self.assertEqual(self.async_api.api.get_retry_counts(),
+                         self.async_api.get_retry_counts())
+        infos = []
+        self.async_api.add_request_hooks(after=infos.append)
+        asyncio.run(self.async_api.refresh_profile_fields())
+        self.assertEqual(1, len(infos))
+
+    def test_bad_concurrency(self):
+        api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                               connection=MockConnection(None))
+        self.assertRaises(ValueError, lambda: AsyncBreezeApi(api, concurrency=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
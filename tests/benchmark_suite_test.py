@@ -0,0 +1,44 @@
+"""Unittests for benchmarks/suite.py
+
+Usage:
+  python -m unittest tests.benchmark_suite_test
+"""
+
+import unittest
+
+from benchmarks import suite
+from .synthetic import (load_sample_profile_fields, make_later_profiles,
+                        make_profiles)
+
+
+class BenchmarkSuiteTests(unittest.TestCase):
+
+    def test_later_profiles(self):
+        fields = load_sample_profile_fields()
+        people = make_profiles(fields, 100)
+        later = make_later_profiles(fields, people, change=0.1)
+        ids = {p['id'] for p in people}
+        later_ids = {p['id'] for p in later}
+        self.assertEqual(90, len(ids & later_ids))
+        self.assertEqual(10, len(later_ids - ids))
+        changed = [p for p in later if p['id'] in ids and p not in people]
+        self.assertTrue(changed)
+        # The originals aren't touched.
+        self.assertEqual(people, make_profiles(fields, 100))
+
+    def test_run_and_compare(self):
+        lines = []
+        results = suite.run_suite([20], suite.CASES, log=lines.append)
+        self.assertEqual([c.name for c in suite.CASES],
+                         [r['case'] for r in results['results']])
+        for result in results['results']:
+            self.assertEqual(20, result['size'])
+            self.assertGreater(result['seconds'], 0)
+            self.assertIsNotNone(result['peak_bytes'])
+        lines = []
+        suite.compare(results, results, log=lines.append)
+        self.assertIn('1.00x', lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
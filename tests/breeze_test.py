@@ -5,6 +5,9 @@ Usage:
 """
 
 import json
+import tempfile
+import threading
+import time
 import unittest
 
 import combine_settings
@@ -13,7 +16,9 @@ import os
 
 from breeze_chms_api import breeze
 from breeze_chms_api.breeze import ENDPOINTS
-from typing import List
+from breeze_chms_api.retry import RetryPolicy
+from breeze_chms_api.response_cache import ResponseCache
+from typing import Dict, List
 
 TEST_FILES_DIR = os.path.join(os.path.split(__file__)[0], 'test_files')
 
@@ -28,6 +33,7 @@ class MockConnection(object):
         self._response = response
         self._timeout = None
         self._verify = None
+        self._stream = None
 
     def post(self, url, params, headers, timeout):
         self._url.append(url)
@@ -36,9 +42,10 @@ class MockConnection(object):
         self._timeout = timeout
         return self._response
 
-    def get(self, url, verify, params, headers, timeout):
+    def get(self, url, verify, params, headers, timeout, stream=False):
         self._url.append(url)
         self._verify = verify
+        self._stream = stream
         self._params.append(params)
         self._headers = headers
         self._timeout = timeout
@@ -57,6 +64,106 @@ class MockConnection(object):
         return self._params
 
 
+class PagedConnection(MockConnection):
+    """Mock connection that serves list_people() pages out of a list."""
+
+    def __init__(self, people: List[dict]):
+        MockConnection.__init__(self, None)
+        self.people = people
+
+    def get(self, url, verify, params, headers, timeout, stream=False):
+        MockConnection.get(self, url, verify, params, headers, timeout, stream)
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', len(self.people)))
+        return MockResponse(200, json.dumps(self.people[offset:offset + limit]))
+
+
+class SequenceConnection(MockConnection):
+    """Mock connection that returns a series of responses, one per request."""
+
+    def __init__(self, responses: list):
+        MockConnection.__init__(self, None)
+        self.responses = list(responses)
+
+    def get(self, url, verify, params, headers, timeout, stream=False):
+        MockConnection.get(self, url, verify, params, headers, timeout, stream)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class PerPersonConnection(MockConnection):
+    """
+    Mock connection that can be used from several threads at once. Fails
+    requests for person_id 'bad', answers person_id 'garbled' with a body
+    that isn't JSON, and records how many requests overlapped.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        MockConnection.__init__(self, None)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get(self, url, verify, params, headers, timeout, stream=False):
+        with self.lock:
+            MockConnection.get(self, url, verify, params, headers, timeout, stream)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if params.get('person_id') == 'bad':
+            return MockResponse(200, {'errors': 'No such person'})
+        if params.get('person_id') == 'garbled':
+            return MockResponse(200, '<html>Bad gateway')
+        return MockResponse(200, 'true')
+
+
+class AttendanceConnection(MockConnection):
+    """
+    Mock connection keeping attendance for events, usable from several
+    threads at once. Listing instance 'broken' and changes for person
+    'bad' fail. Listing instance 'garbled' and changes for person 'garbled'
+    get a body that isn't JSON.
+    """
+
+    def __init__(self, attendance: Dict[str, Dict[str, str]]):
+        """
+        :param attendance: instance_id -> person_id -> check_out time
+        """
+        MockConnection.__init__(self, None)
+        self.attendance = attendance
+        self.lock = threading.Lock()
+
+    def get(self, url, verify, params, headers, timeout, stream=False):
+        with self.lock:
+            MockConnection.get(self, url, verify, params, headers, timeout, stream)
+            command = url.split('/api/events/')[1].rstrip('?')
+            instance = self.attendance.setdefault(params['instance_id'], {})
+            if command == 'attendance/list':
+                if params['instance_id'] == 'broken':
+                    return MockResponse(200, {'errors': 'No such event'})
+                if params['instance_id'] == 'garbled':
+                    return MockResponse(200, '<html>Bad gateway')
+                return MockResponse(200, [{'person_id': p, 'instance_id': params['instance_id'],
+                                           'check_out': out}
+                                          for p, out in instance.items()])
+            if params['person_id'] == 'bad':
+                return MockResponse(200, {'errors': 'No such person'})
+            if params['person_id'] == 'garbled':
+                return MockResponse(200, '<html>Bad gateway')
+            if command == 'attendance/delete':
+                instance.pop(params['person_id'], None)
+            elif params['direction'] == 'in':
+                instance.setdefault(params['person_id'], '0000-00-00 00:00:00')
+            else:
+                instance[params['person_id']] = '2024-03-03 12:00:00'
+            return MockResponse(200, 'true')
+
+
 class MockResponse(requests.Response):
     """ Mock requests HTTP response."""
 
@@ -64,10 +171,14 @@ class MockResponse(requests.Response):
         requests.Response.__init__(self)
         self.status_code = status_code
         self.encoding = 'utf-8'
+        # There's no raw connection; everything is in _content.
+        self._content_consumed = True
         if content:
             if not isinstance(content, str):
                 content = json.dumps(content)
             self._content = bytes(content, self.encoding)
+        else:
+            self._content = b''
         self.exception = exception
 
     def json(self, **kwargs):
@@ -139,6 +250,246 @@ class BreezeApiTestCase(unittest.TestCase):
             # Missing arguments
             self.fail(f'Missing arguments in {url}: {eparams}')
 
+    def make_sequence_api(self, responses: list, **kwargs):
+        self.connection = SequenceConnection(responses)
+        self.breeze_api = breeze.BreezeApi(
+            breeze_url=FAKE_SUBDOMAIN,
+            api_key=FAKE_API_KEY,
+            connection=self.connection,
+            **kwargs)
+
+    def test_rate_limited_response(self):
+        limited = MockResponse(429, 'Too many requests')
+        limited.headers['Retry-After'] = '0'
+        expect = [{'id': '1'}]
+        self.make_sequence_api([limited, limited, MockResponse(200, expect)])
+        self.assertEqual(expect, self.breeze_api.list_funds())
+        self.assertEqual(3, len(self.connection.url))
+
+    def test_rate_limited_gives_up(self):
+        limited = MockResponse(429, 'Too many requests')
+        limited.headers['Retry-After'] = '0'
+        self.make_sequence_api([limited] * (breeze._MAX_RATE_LIMITED_RETRIES + 1))
+        self.assertRaises(breeze.BreezeError, lambda: self.breeze_api.list_funds())
+
+    def test_retry_after(self):
+        response = MockResponse(429, None)
+        self.assertEqual(breeze._DEFAULT_RETRY_AFTER, breeze._retry_after(response))
+        response.headers['Retry-After'] = '12'
+        self.assertEqual(12, breeze._retry_after(response))
+        response.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.assertEqual(0, breeze._retry_after(response))
+        response.headers['Retry-After'] = 'whenever'
+        self.assertEqual(breeze._DEFAULT_RETRY_AFTER, breeze._retry_after(response))
+
+    def _retry_policy(self, **kwargs) -> RetryPolicy:
+        self.slept = []
+        return RetryPolicy(sleep=self.slept.append, **kwargs)
+
+    def test_retry_server_error(self):
+        expect = [{'id': '1'}]
+        self.make_sequence_api([MockResponse(503, 'busy'),
+                                requests.exceptions.ConnectionError('blip'),
+                                MockResponse(200, expect)],
+                               retry_policy=self._retry_policy(jitter=False))
+        self.assertEqual(expect, self.breeze_api.list_funds())
+        self.assertEqual([0.5, 1.0], self.slept)
+        counts = self.breeze_api.get_retry_counts()['funds/list']
+        self.assertEqual({'calls': 1, 'retries': 2, 'retry_seconds': 1.5,
+                          'failures': 0}, counts)
+
+    def test_retry_timeout(self):
+        expect = {'id': '1'}
+        self.make_sequence_api([requests.exceptions.ReadTimeout('slow'),
+                                MockResponse(200, expect)],
+                               retry_policy=self._retry_policy())
+        self.assertEqual(expect, self.breeze_api.get_person_details('123'))
+        self.assertEqual(1, self.breeze_api.get_retry_counts()
+                         ['people/person_id']['retries'])
+
+    def test_retry_gives_up(self):
+        self.make_sequence_api([MockResponse(500, 'oops')] * 2,
+                               retry_policy=self._retry_policy(max_attempts=2))
+        self.assertRaises(breeze.BreezeError, lambda: self.breeze_api.list_funds())
+        self.assertEqual(1, len(self.slept))
+        self.assertEqual(1, self.breeze_api.get_retry_counts()['funds/list']['failures'])
+
+    def test_retry_connection_gives_up(self):
+        self.make_sequence_api([requests.exceptions.ConnectionError('down')] * 3,
+                               retry_policy=self._retry_policy())
+        self.assertRaises(breeze.BreezeError, lambda: self.breeze_api.list_funds())
+        self.assertEqual(2, len(self.slept))
+
+    def test_no_retry_client_error(self):
+        self.make_sequence_api([MockResponse(404, 'nope')],
+                               retry_policy=self._retry_policy())
+        self.assertRaises(breeze.BreezeError, lambda: self.breeze_api.list_funds())
+        self.assertEqual([], self.slept)
+
+    def test_no_retry_mutating(self):
+        self.make_sequence_api([MockResponse(503, 'busy')],
+                               retry_policy=self._retry_policy())
+        self.assertRaises(breeze.BreezeError,
+                          lambda: self.breeze_api.assign_tag('1', '2'))
+        self.assertEqual([], self.slept)
+
+    def test_retry_mutating(self):
+        self.make_sequence_api([MockResponse(503, 'busy'),
+                                MockResponse(200, {'success': True})],
+                               retry_policy=self._retry_policy(retry_mutating=True))
+        self.assertTrue(self.breeze_api.assign_tag('1', '2'))
+        self.assertEqual(1, len(self.slept))
+
+    def test_response_cache(self):
+        funds = [{'id': '1', 'name': 'General'}]
+        tags = [{'id': '2', 'name': 'Choir'}]
+        self.make_sequence_api([MockResponse(200, funds),
+                                MockResponse(200, tags),
+                                MockResponse(200, {'success': True}),
+                                MockResponse(200, tags)],
+                               response_cache=ResponseCache())
+        self.assertEqual(funds, self.breeze_api.list_funds())
+        self.assertEqual(funds, self.breeze_api.list_funds())
+        self.assertEqual(tags, self.breeze_api.get_tags())
+        self.assertEqual(tags, self.breeze_api.get_tags())
+        self.assertEqual(2, len(self.connection.url))
+        # Changing a tag assignment forgets saved tag responses...
+        self.breeze_api.assign_tag('1', '2')
+        self.assertEqual(tags, self.breeze_api.get_tags())
+        self.assertEqual(4, len(self.connection.url))
+        # ...but not others.
+        self.assertEqual(funds, self.breeze_api.list_funds())
+        self.assertEqual(4, len(self.connection.url))
+
+    def test_response_cache_fund_totals(self):
+        before = [{'id': '1', 'name': 'General', 'total': '100.00'}]
+        after = [{'id': '1', 'name': 'General', 'total': '150.00'}]
+        self.make_sequence_api([MockResponse(200, before),
+                                MockResponse(200, {'success': True, 'payment_id': '55'}),
+                                MockResponse(200, after)],
+                               response_cache=ResponseCache())
+        self.assertEqual(before, self.breeze_api.list_funds(include_totals=True))
+        self.breeze_api.add_contribution(date='2024-03-03', person_id='1',
+                                         amount='50.00')
+        # Posting a contribution changes fund totals.
+        self.assertEqual(after, self.breeze_api.list_funds(include_totals=True))
+        self.assertEqual(3, len(self.connection.url))
+
+    def test_response_cache_change_during_request(self):
+        before = [{'id': '1', 'name': 'General', 'total': '100.00'}]
+        after = [{'id': '1', 'name': 'General', 'total': '150.00'}]
+        cache = ResponseCache()
+        self.make_sequence_api([MockResponse(200, before), MockResponse(200, after)],
+                               response_cache=cache)
+        get = self.connection.get
+
+        def get_during_change(*args, **kwargs):
+            # A contribution is posted (by another thread) while the
+            # request is out.
+            cache.invalidate('giving')
+            return get(*args, **kwargs)
+
+        self.connection.get = get_during_change
+        self.assertEqual(before, self.breeze_api.list_funds(include_totals=True))
+        self.connection.get = get
+        self.assertEqual(after, self.breeze_api.list_funds(include_totals=True))
+        self.assertEqual(2, len(self.connection.url))
+
+    def test_response_cache_skips_uncached(self):
+        people = [{'id': '1'}]
+        self.make_sequence_api([MockResponse(200, people)] * 2,
+                               response_cache=ResponseCache())
+        self.breeze_api.list_people()
+        self.breeze_api.list_people()
+        self.assertEqual(2, len(self.connection.url))
+
+    def test_request_hooks(self):
+        funds = [{'id': '1', 'name': 'General'}]
+        self.make_sequence_api([MockResponse(200, funds),
+                                MockResponse(200, {'errors': 'No such tag'}),
+                                MockResponse(500, ''),
+                                MockResponse(200, funds)],
+                               retry_policy=RetryPolicy(max_attempts=1),
+                               response_cache=ResponseCache())
+        before = []
+        after = []
+
+        def broken(info):
+            raise ValueError('oops')
+
+        self.breeze_api.add_request_hooks(
+            before=lambda *args: before.append(args), after=after.append)
+        self.breeze_api.add_request_hooks(after=broken)
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(funds, self.breeze_api.list_funds())
+        # Cached, so not a request
+        self.assertEqual(funds, self.breeze_api.list_funds())
+        self.assertRaises(breeze.BreezeError,
+                          lambda: self.breeze_api.assign_tag('1', '2'))
+        self.assertRaises(breeze.BreezeError,
+                          lambda: self.breeze_api.list_people(limit=3))
+
+        self.assertEqual([('funds', 'list', 0),
+                          ('tags', 'assign', len('person_id=1&tag_id=2')),
+                          ('people', '', len('limit=3'))], before)
+        self.assertEqual(['funds/list', 'tags/assign', 'people/'],
+                         [info.call for info in after])
+        self.assertEqual([200, 200, 500], [info.status for info in after])
+        self.assertEqual(len(json.dumps(funds)), after[0].response_bytes)
+        self.assertIsNone(after[0].error)
+        self.assertIsInstance(after[1].error, breeze.BreezeError)
+        self.assertIsInstance(after[2].error, breeze.BreezeError)
+        self.assertTrue(all(info.elapsed >= 0 for info in after))
+
+        stats = self.breeze_api.stats()
+        self.assertEqual(['funds/list', 'tags/assign', 'people/'], list(stats))
+        self.assertEqual(1, stats['funds/list']['calls'])
+        self.assertEqual(0, stats['funds/list']['errors'])
+        self.assertEqual(1, stats['tags/assign']['errors'])
+        self.assertEqual(len(json.dumps(funds)), stats['funds/list']['response_bytes'])
+
+    def test_request_hooks_stream(self):
+        people = [{'id': str(i)} for i in range(5)]
+        self.make_api(people)
+        after = []
+        self.breeze_api.add_request_hooks(after=after.append)
+        self.assertEqual(people, list(self.breeze_api.list_people(stream=True)))
+        self.assertEqual(1, len(after))
+        self.assertEqual(len(json.dumps(people)), after[0].response_bytes)
+        self.assertIsNone(after[0].error)
+
+        self.make_sequence_api([requests.exceptions.ConnectionError('down')],
+                               retry_policy=RetryPolicy(max_attempts=1))
+        self.breeze_api.add_request_hooks(after=after.append)
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.list_people(stream=True)))
+        self.assertIsNone(after[1].status)
+        self.assertIsInstance(after[1].error, breeze.BreezeError)
+        self.assertEqual(1, self.breeze_api.stats()['people/']['errors'])
+
+    def test_request_hooks_stream_abandoned(self):
+        people = [{'id': str(i)} for i in range(5)]
+        self.make_api(people)
+        closed = []
+        self.response.close = lambda: closed.append(True)
+        after = []
+        self.breeze_api.add_request_hooks(after=after.append)
+        for person in self.breeze_api.list_people(stream=True):
+            break
+        self.assertEqual([True], closed)
+        self.assertEqual(1, len(after))
+        self.assertIsNone(after[0].error)
+        self.assertTrue(after[0].abandoned)
+        self.assertEqual(200, after[0].status)
+        stats = self.breeze_api.stats()['people/']
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(1, stats['abandoned'])
+
+    def test_rate_limit_setting(self):
+        self.make_sequence_api([], rate_limit=3, rate_burst=2)
+        self.assertEqual(3, self.breeze_api.rate_limiter.rate)
+        self.assertEqual(2, self.breeze_api.rate_limiter.burst)
+
     def test_request_header_override(self):
         self.make_api({'name': 'Some Data.'})
 
@@ -185,6 +536,111 @@ class BreezeApiTestCase(unittest.TestCase):
         self.validate_url(ENDPOINTS.PEOPLE, expect_params=args)
         self.assertEqual(expect, result)
 
+    def test_list_people_stream(self):
+        people = [{'id': str(i), 'first_name': f'First{i}'} for i in range(5)]
+        self.make_api(people)
+        args = {'limit': 5, 'details': True}
+        result = self.breeze_api.list_people(stream=True, **args)
+        # Nothing is sent until the first person is wanted.
+        self.assertEqual(0, len(self.connection.url))
+        self.assertEqual(people, list(result))
+        self.validate_url(ENDPOINTS.PEOPLE, expect_params=args)
+        self.assertTrue(self.connection._stream)
+
+    def test_list_contributions_stream(self):
+        gifts = [{'id': '1', 'amount': '10.00'}, {'id': '2', 'amount': '1e3'}]
+        self.make_api(json.dumps(gifts))
+        args = {'start': '2020-01-01', 'end': '2024-12-31'}
+        result = list(self.breeze_api.list_contributions(stream=True, **args))
+        self.assertEqual(gifts, result)
+        self.validate_url(ENDPOINTS.CONTRIBUTIONS, command='list', expect_params=args)
+
+    def test_stream_errors(self):
+        self.make_api({'errors': 'Some Errors'})
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.list_people(stream=True)))
+        self.make_api({'id': '1'})
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.list_people(stream=True)))
+        self.make_api('[{"id": "1"}, {"id": ')
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.list_people(stream=True)))
+        self.make_api([], status=500)
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.list_people(stream=True)))
+        self.make_sequence_api([requests.exceptions.ConnectionError('down')],
+                               retry_policy=RetryPolicy(max_attempts=1))
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.list_people(stream=True)))
+
+    def _make_paged_api(self, count: int) -> List[dict]:
+        people = [{'id': str(i), 'first_name': f'First{i}'} for i in range(count)]
+        self.connection = PagedConnection(people)
+        self.breeze_api = breeze.BreezeApi(
+            breeze_url=FAKE_SUBDOMAIN,
+            api_key=FAKE_API_KEY,
+            connection=self.connection)
+        return people
+
+    def test_iter_people(self):
+        people = self._make_paged_api(25)
+        filter_json = {'name': 'muerte'}
+        result = list(self.breeze_api.iter_people(page_size=10, details=True,
+                                                  filter_json=filter_json))
+        self.assertEqual(people, result)
+        self.assertEqual(3, len(self.connection.url))
+        self.validate_url(ENDPOINTS.PEOPLE,
+                          expect_params={'limit': 10, 'details': True,
+                                         'filter_json': filter_json})
+        self.validate_url(ENDPOINTS.PEOPLE,
+                          expect_params={'limit': 10, 'offset': 20, 'details': True,
+                                         'filter_json': filter_json},
+                          select_query=2)
+
+    def test_iter_people_exact_pages(self):
+        people = self._make_paged_api(20)
+        result = list(self.breeze_api.iter_people(page_size=10))
+        self.assertEqual(people, result)
+        # The last, empty, page tells us we're done.
+        self.assertEqual(3, len(self.connection.url))
+
+    def test_iter_people_lazy(self):
+        self._make_paged_api(25)
+        people = self.breeze_api.iter_people(page_size=10)
+        self.assertEqual(0, len(self.connection.url))
+        next(people)
+        self.assertEqual(1, len(self.connection.url))
+
+    def test_iter_people_prefetch(self):
+        people = self._make_paged_api(95)
+        result = list(self.breeze_api.iter_people(page_size=10, prefetch=3))
+        self.assertEqual(people, result)
+        self.assertEqual(10, len(self.connection.url))
+
+    def test_iter_people_prefetch_reads_ahead(self):
+        self._make_paged_api(95)
+        people = self.breeze_api.iter_people(page_size=10, prefetch=2)
+        next(people)
+        # The background fetcher fills the queue without waiting for us.
+        for _ in range(100):
+            if len(self.connection.url) >= 3:
+                break
+            time.sleep(0.01)
+        self.assertGreaterEqual(len(self.connection.url), 3)
+        # ...but stops when the queue is full.
+        self.assertLessEqual(len(self.connection.url), 4)
+        people.close()
+
+    def test_iter_people_prefetch_error(self):
+        self.make_api({'errors': 'Some Errors'})
+        self.assertRaises(breeze.BreezeError,
+                          lambda: list(self.breeze_api.iter_people(prefetch=2)))
+
+    def test_iter_people_bad_page_size(self):
+        self._make_paged_api(5)
+        self.assertRaises(breeze.BreezeBadParameter,
+                          lambda: list(self.breeze_api.iter_people(page_size=0)))
+
     def _make_profile_field_api(self) -> str:
         with open(os.path.join(TEST_FILES_DIR, 'profiles.json'), 'r') as f:
             json_str = f.read()
@@ -213,6 +669,38 @@ class BreezeApiTestCase(unittest.TestCase):
         bad_field = self.breeze_api.field_value_from_name('badfield', profile)
         self.assertFalse(bad_field)
 
+    def test_profile_cache(self):
+        json_str = self._make_profile_field_api()
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = os.path.join(tmp, 'profile.json')
+            api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                   connection=self.connection, profile_cache=cache)
+            self.assertEqual(json.loads(json_str)[3].get('name'),
+                             api.get_profile_fields()[3].get('name'))
+            self.assertEqual(1, len(self.connection.url))
+
+            # A new instance uses the saved copy without asking Breeze.
+            connection = SequenceConnection([])
+            api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                   connection=connection, profile_cache=cache)
+            field = api.get_field_spec_by_id('2114298972')
+            self.assertEqual('Member Number', field.get('name'))
+            self.assertEqual(0, len(connection.url))
+
+            # ...unless asked to refresh
+            new_fields = [{'name': 'Main', 'fields': [{'field_id': '1', 'name': 'New'}]}]
+            connection.responses.append(MockResponse(200, new_fields))
+            self.assertEqual('Main', api.refresh_profile_fields()[0].get('name'))
+            self.assertIsNone(api.get_field_spec_by_id('2114298972'))
+            self.assertEqual('New', api.get_field_spec_by_id('1').get('name'))
+            self.assertEqual(1, len(connection.url))
+
+            # and the refreshed copy is what's saved.
+            api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                   connection=connection, profile_cache=cache)
+            self.assertEqual('New', api.get_field_spec_by_id('1').get('name'))
+            self.assertEqual(1, len(connection.url))
+
     def test_get_field_spec_by_id(self):
         self._make_profile_field_api()
         field = self.breeze_api.get_field_spec_by_id('2114298972')
@@ -656,6 +1144,129 @@ class BreezeApiTestCase(unittest.TestCase):
         self.assertEqual(ret, result)
         self.validate_url(ENDPOINTS.TAGS, command='unassign', expect_params=args)
 
+    def test_bulk_attendance(self):
+        self.connection = AttendanceConnection({
+            '1': {'10': '0000-00-00 00:00:00', '11': '2024-03-03 11:00:00'},
+            '2': {'10': '0000-00-00 00:00:00'}})
+        self.breeze_api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN,
+                                           api_key=FAKE_API_KEY,
+                                           connection=self.connection)
+        progress = []
+        entries = [('10', '1', breeze.CHECK_IN),        # already in
+                   ('11', '1', breeze.CHECK_OUT),       # already out
+                   ('12', '1', breeze.CHECK_IN),
+                   ('12', '1', breeze.CHECK_OUT),
+                   ('12', '1', breeze.CHECK_IN),        # still out
+                   (10, 2, breeze.DELETE_ATTENDANCE),
+                   ('13', '2', breeze.DELETE_ATTENDANCE),  # not there
+                   ('bad', '2', breeze.CHECK_IN),
+                   ('bad', '2', breeze.CHECK_OUT),
+                   ('10', 'broken', breeze.CHECK_IN)]
+        summary = self.breeze_api.bulk_attendance(
+            entries, workers=3,
+            progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual([('12', '1', 'in'), ('12', '1', 'out'), (10, 2, 'delete')],
+                         summary.changed)
+        self.assertEqual([entries[i] for i in (0, 1, 4, 6)], summary.skipped)
+        self.assertEqual({entries[i] for i in (7, 8, 9)}, set(summary.failed))
+        for error in summary.failed.values():
+            self.assertIsInstance(error, breeze.BreezeError)
+        self.assertEqual([(1, 3), (2, 3), (3, 3)], progress)
+
+        self.assertEqual({'10': '0000-00-00 00:00:00', '11': '2024-03-03 11:00:00',
+                          '12': '2024-03-03 12:00:00'}, self.connection.attendance['1'])
+        self.assertEqual({}, self.connection.attendance['2'])
+        # One list per event, then three changes and the failed check-in.
+        lists = [u for u in self.connection.url if 'attendance/list' in u]
+        self.assertEqual(3, len(lists))
+        self.assertEqual(7, len(self.connection.url))
+
+    def test_bulk_attendance_malformed_response(self):
+        self.connection = AttendanceConnection({'1': {'11': '0000-00-00 00:00:00'}})
+        self.breeze_api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN,
+                                           api_key=FAKE_API_KEY,
+                                           connection=self.connection)
+        entries = [('10', '1', breeze.CHECK_IN),
+                   ('garbled', '1', breeze.CHECK_IN),
+                   ('garbled', '1', breeze.CHECK_OUT),
+                   ('10', 'garbled', breeze.CHECK_IN)]
+        summary = self.breeze_api.bulk_attendance(entries, workers=2)
+
+        self.assertEqual([entries[0]], summary.changed)
+        self.assertEqual([], summary.skipped)
+        self.assertEqual(set(entries[1:]), set(summary.failed))
+        for error in summary.failed.values():
+            self.assertIsInstance(error, ValueError)
+        self.assertIn('10', self.connection.attendance['1'])
+
+    def test_bulk_attendance_bad_entry(self):
+        self.connection = AttendanceConnection({})
+        self.breeze_api = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN,
+                                           api_key=FAKE_API_KEY,
+                                           connection=self.connection)
+        with self.assertRaises(breeze.BreezeBadParameter):
+            self.breeze_api.bulk_attendance([('1', '2', 'in'), ('1', '2', 'sideways')])
+        with self.assertRaises(breeze.BreezeBadParameter):
+            self.breeze_api.bulk_attendance([('1', '2')])
+        with self.assertRaises(breeze.BreezeBadParameter):
+            self.breeze_api.bulk_attendance([('1', '2', 'in')], workers=0)
+        self.assertEqual([], self.connection.url)
+        self.assertEqual(([], [], {}), tuple(self.breeze_api.bulk_attendance([])))
+
+    def _make_per_person_api(self, delay: float = 0.0):
+        self.connection = PerPersonConnection(delay)
+        self.breeze_api = breeze.BreezeApi(
+            breeze_url=FAKE_SUBDOMAIN,
+            api_key=FAKE_API_KEY,
+            connection=self.connection)
+
+    def test_bulk_assign_tag(self):
+        self._make_per_person_api()
+        progress = []
+        result = self.breeze_api.bulk_assign_tag(
+            ['1', '2', 'bad', '2'], '77', workers=2,
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(['1', '2', 'bad'], list(result))
+        self.assertIs(True, result['1'])
+        self.assertIs(True, result['2'])
+        self.assertIsInstance(result['bad'], breeze.BreezeError)
+        self.assertEqual([(1, 3), (2, 3), (3, 3)], progress)
+        self.assertEqual(3, len(self.connection.url))
+        for url in self.connection.url:
+            self.assertTrue(url.startswith(f'{FAKE_SUBDOMAIN}/api/tags/assign'))
+        self.assertEqual({'1', '2', 'bad'},
+                         {p['person_id'] for p in self.connection.params})
+        self.assertEqual({'77'}, {p['tag_id'] for p in self.connection.params})
+
+    def test_bulk_assign_tag_malformed_response(self):
+        self._make_per_person_api()
+        result = self.breeze_api.bulk_assign_tag(['1', 'garbled', '2'], '77')
+        self.assertEqual(['1', 'garbled', '2'], list(result))
+        self.assertIs(True, result['1'])
+        self.assertIs(True, result['2'])
+        self.assertIsInstance(result['garbled'], ValueError)
+        self.assertEqual(3, len(self.connection.url))
+
+    def test_bulk_unassign_tag(self):
+        self._make_per_person_api()
+        result = self.breeze_api.bulk_unassign_tag(['3', '4'], '77')
+        self.assertEqual({'3': True, '4': True}, result)
+        for url in self.connection.url:
+            self.assertTrue(url.startswith(f'{FAKE_SUBDOMAIN}/api/tags/unassign'))
+        self.assertEqual({}, self.breeze_api.bulk_unassign_tag([], '77'))
+
+    def test_bulk_tag_concurrency(self):
+        self._make_per_person_api(delay=0.02)
+        person_ids = [str(i) for i in range(20)]
+        result = self.breeze_api.bulk_assign_tag(person_ids, '77', workers=4)
+        self.assertEqual(person_ids, list(result))
+        self.assertGreater(self.connection.max_in_flight, 1)
+        self.assertLessEqual(self.connection.max_in_flight, 4)
+        self.assertRaises(breeze.BreezeBadParameter,
+                          lambda: self.breeze_api.bulk_assign_tag(person_ids, '77',
+                                                                  workers=0))
+
     def test_add_event(self):
         ret = [{
             "id": "8324092",
@@ -692,6 +1303,62 @@ class BreezeApiTestCase(unittest.TestCase):
         api = breeze.breeze_api(overrides=overrides)
         self.assertEqual(url, api.breeze_url)
 
+    def test_own_session(self):
+        api1 = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY)
+        api2 = breeze.BreezeApi(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY)
+        self.assertIsInstance(api1.connection, requests.Session)
+        self.assertIsNot(api1.connection, api2.connection)
+
+    def test_build_session_settings(self):
+        api = breeze.breeze_api(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                pool_size=25, keep_alive=False, max_retries=2)
+        adapter = api.connection.get_adapter(FAKE_SUBDOMAIN)
+        self.assertEqual(25, adapter._pool_maxsize)
+        self.assertEqual(2, adapter.max_retries.total)
+        self.assertEqual('close', api.connection.headers.get('Connection'))
+
+    def test_build_session_from_config(self):
+        overrides = {'breeze_url': FAKE_SUBDOMAIN, 'api_key': FAKE_API_KEY,
+                     'pool_size': 30, 'rate_limit': 2, 'rate_burst': 4}
+        api = breeze.breeze_api(overrides=overrides)
+        adapter = api.connection.get_adapter(FAKE_SUBDOMAIN)
+        self.assertEqual(30, adapter._pool_maxsize)
+        self.assertEqual('keep-alive', api.connection.headers.get('Connection'))
+        self.assertEqual(2, api.rate_limiter.rate)
+        self.assertEqual(4, api.rate_limiter.burst)
+        # Explicit arguments beat the configuration
+        api = breeze.breeze_api(overrides=overrides, pool_size=5)
+        self.assertEqual(5, api.connection.get_adapter(FAKE_SUBDOMAIN)._pool_maxsize)
+
+    def test_build_explicit_key_reads_config(self):
+        # Settings not given as arguments come from the configuration,
+        # even when the url and key are given.
+        overrides = {'pool_size': 30, 'keep_alive': False, 'max_retries': 3,
+                     'rate_limit': 2, 'rate_burst': 4}
+        api = breeze.breeze_api(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                overrides=overrides)
+        adapter = api.connection.get_adapter(FAKE_SUBDOMAIN)
+        self.assertEqual(FAKE_SUBDOMAIN, api.breeze_url)
+        self.assertEqual(30, adapter._pool_maxsize)
+        self.assertEqual(3, adapter.max_retries.total)
+        self.assertEqual('close', api.connection.headers.get('Connection'))
+        self.assertEqual(2, api.rate_limiter.rate)
+        self.assertEqual(4, api.rate_limiter.burst)
+
+    def test_build_profile_cache_from_config(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = os.path.join(tmp, 'profile.json')
+            overrides = {'profile_cache': cache, 'profile_cache_ttl': 60}
+            api = breeze.breeze_api(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                    connection=requests.Session(), overrides=overrides)
+            self.assertEqual(cache, api.profile_cache.path)
+            self.assertEqual(60, api.profile_cache.ttl)
+            # Explicit arguments beat the configuration
+            api = breeze.breeze_api(breeze_url=FAKE_SUBDOMAIN, api_key=FAKE_API_KEY,
+                                    connection=requests.Session(), overrides=overrides,
+                                    profile_cache_ttl=5)
+            self.assertEqual(5, api.profile_cache.ttl)
+
     def test_build_bad_url(self):
         url = 'https://4breeetest.breezy.com'
         self.assertRaises(breeze.BreezeError,
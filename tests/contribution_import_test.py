@@ -0,0 +1,224 @@
+"""Unittests for contribution_import.py
+
+Usage:
+  python -m unittest tests.contribution_import_test
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from breeze_chms_api.breeze import BreezeBadParameter, BreezeError
+from breeze_chms_api.contribution_import import (import_contributions,
+                                                 ImportValidationError)
+from .mock_breeze import MockBreezeData, MockBreezeTestCase
+
+# Person ids whose contributions GivingData doesn't add
+_NOT_ADDED = ('bad', 'odd')
+
+
+class GivingData(MockBreezeData):
+    """
+    Mock Breeze giving. Fails contributions for person_id 'bad', and
+    answers those for 'odd' without a payment id.
+    """
+
+    def __init__(self):
+        MockBreezeData.__init__(self, people=0)
+
+    @property
+    def added(self) -> list:
+        """Parameters of each contribution added"""
+        return [params for params in self.calls.get('giving_add', [])
+                if params.get('person_id') not in _NOT_ADDED]
+
+    def _giving_add(self, command, params):
+        if params.get('person_id') == 'bad':
+            return {'errors': {'person_id': 'No such person'}}
+        if params.get('person_id') == 'odd':
+            return {'success': True}
+        return MockBreezeData._giving_add(self, command, params)
+
+
+class ContributionImportTests(MockBreezeTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.dir.name, 'giving.csv')
+        self.checkpoint = os.path.join(self.dir.name, 'giving.checkpoint')
+        self.data = GivingData()
+        self.api = self.serve(self.data)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _write(self, *lines: str):
+        with open(self.csv_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def test_import(self):
+        self._write('date,person_id,amount,fund,method',
+                    '2024-03-03,101,50.00,General,Check',
+                    '',
+                    '2024-03-03,102,"1,000",Building,Cash')
+        progress = []
+        summary = import_contributions(
+            self.api, self.csv_path, self.checkpoint, workers=2,
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual({2, 4}, set(summary.posted))
+        self.assertEqual({}, summary.failed)
+        self.assertEqual(0, summary.skipped)
+        self.assertEqual([(1, 2), (2, 2)], progress)
+
+        added = sorted(self.data.added, key=lambda p: p['person_id'])
+        self.assertEqual('50.00', added[0]['amount'])
+        self.assertEqual('Check', added[0]['method'])
+        self.assertEqual([{'name': 'General', 'amount': '50.00'}],
+                         json.loads(added[0]['funds_json']))
+        self.assertEqual('1000.00', added[1]['amount'])
+        self.assertEqual([{'name': 'Building', 'amount': '1000.00'}],
+                         json.loads(added[1]['funds_json']))
+
+    def test_split_and_funds_json(self):
+        self._write('date,uid,amount,fund:General,fund:Missions,funds_json',
+                    '2024-03-03,9,75,50,25.00,',
+                    '2024-03-03,10,,,,"[{""id"": ""12"", ""amount"": ""20""}]"')
+        import_contributions(self.api, self.csv_path, self.checkpoint)
+        added = sorted(self.data.added, key=lambda p: p['uid'])
+        self.assertEqual('20.00', added[0]['amount'])
+        self.assertEqual([{'id': '12', 'amount': '20'}],
+                         json.loads(added[0]['funds_json']))
+        self.assertEqual('75.00', added[1]['amount'])
+        self.assertEqual([{'name': 'General', 'amount': '50.00'},
+                          {'name': 'Missions', 'amount': '25.00'}],
+                         json.loads(added[1]['funds_json']))
+
+    def test_defaults(self):
+        self._write('date,person_id,amount,fund_id,batch_name',
+                    '2024-03-03,101,10,12,',
+                    '2024-03-03,102,20,12,Special')
+        import_contributions(self.api, self.csv_path, self.checkpoint,
+                             defaults={'batch_name': 'Week 10', 'method': 'Check'})
+        added = sorted(self.data.added, key=lambda p: p['person_id'])
+        self.assertEqual(['Week 10', 'Special'], [p['batch_name'] for p in added])
+        self.assertEqual(['Check', 'Check'], [p['method'] for p in added])
+        self.assertEqual([{'id': '12', 'amount': '10.00'}],
+                         json.loads(added[0]['funds_json']))
+
+    def test_validation(self):
+        self._write('date,person_id,amount,fund,fund:Missions',
+                    '2024-03-03,101,50,General,',
+                    '3/3/2024,101,50,General,',
+                    '2024-03-03,,50,General,',
+                    '2024-03-03,101,-5,General,',
+                    '2024-03-03,101,5.001,General,',
+                    '2024-03-03,101,50,,',
+                    '2024-03-03,101,50,,40',
+                    '2024-03-03,101,50,General,50')
+        with self.assertRaises(ImportValidationError) as context:
+            import_contributions(self.api, self.csv_path, self.checkpoint)
+        self.assertEqual([3, 4, 5, 6, 7, 8, 9],
+                         [line for line, _ in context.exception.problems])
+        self.assertEqual([], self.data.added)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_bad_columns(self):
+        self._write('date,person_id,amount,fund,color',
+                    '2024-03-03,101,50,General,blue')
+        with self.assertRaises(BreezeBadParameter):
+            import_contributions(self.api, self.csv_path, self.checkpoint)
+        self._write('date,person_id,amount,fund',
+                    '2024-03-03,101,50,General')
+        with self.assertRaises(BreezeBadParameter):
+            import_contributions(self.api, self.csv_path, self.checkpoint,
+                                 defaults={'color': 'blue'})
+        with self.assertRaises(BreezeBadParameter):
+            import_contributions(self.api, self.csv_path, self.checkpoint, workers=0)
+        self.assertEqual([], self.data.added)
+
+    def test_resume(self):
+        self._write('date,person_id,amount,fund',
+                    '2024-03-03,101,50,General',
+                    '2024-03-03,bad,50,General',
+                    '2024-03-03,101,50,General',
+                    '2024-03-03,103,30,General')
+        summary = import_contributions(self.api, self.csv_path, self.checkpoint,
+                                       workers=3)
+        self.assertEqual({2, 4, 5}, set(summary.posted))
+        self.assertEqual([3], list(summary.failed))
+        self.assertIsInstance(summary.failed[3], BreezeError)
+        self.assertEqual(3, len(self.data.added))
+
+        # Fix the bad row and run again. Only it gets sent, though
+        # there's another row just like the first one.
+        self._write('date,person_id,amount,fund',
+                    '2024-03-03,101,50,General',
+                    '2024-03-03,102,50,General',
+                    '2024-03-03,101,50,General',
+                    '2024-03-03,103,30,General')
+        # A line cut short by a crash is ignored.
+        with open(self.checkpoint, 'a') as f:
+            f.write('{"key": "abc')
+        progress = []
+        summary = import_contributions(
+            self.api, self.csv_path, self.checkpoint,
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual([3], list(summary.posted))
+        self.assertEqual(3, summary.skipped)
+        self.assertEqual([(1, 1)], progress)
+        self.assertEqual(4, len(self.data.added))
+        self.assertEqual('102', self.data.added[-1]['person_id'])
+
+    def test_unexpected_error(self):
+        self._write('date,person_id,amount,fund',
+                    '2024-03-03,101,50,General',
+                    '2024-03-03,odd,50,General',
+                    '2024-03-03,103,30,General')
+        summary = import_contributions(self.api, self.csv_path, self.checkpoint,
+                                       workers=2)
+        self.assertEqual({2, 4}, set(summary.posted))
+        self.assertEqual([3], list(summary.failed))
+        self.assertIsInstance(summary.failed[3], KeyError)
+
+    def test_interrupted_repeatedly(self):
+        # Progress reports keep failing, but everything sent is still recorded.
+        self._write('date,person_id,amount,fund',
+                    *[f'2024-03-03,{100 + i},10,General' for i in range(20)])
+
+        def progress(done, total):
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            import_contributions(self.api, self.csv_path, self.checkpoint,
+                                 workers=4, progress=progress)
+        with open(self.checkpoint) as f:
+            self.assertEqual(len(self.data.added), len(f.readlines()))
+        summary = import_contributions(self.api, self.csv_path, self.checkpoint)
+        self.assertEqual(20, summary.skipped + len(summary.posted))
+        self.assertEqual(20, len({p['person_id'] for p in self.data.added}))
+
+    def test_interrupted(self):
+        self._write('date,person_id,amount,fund',
+                    *[f'2024-03-03,{100 + i},10,General' for i in range(20)])
+
+        def progress(done, total):
+            if done == 5:
+                raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            import_contributions(self.api, self.csv_path, self.checkpoint,
+                                 workers=2, progress=progress)
+        sent = len(self.data.added)
+        self.assertLess(sent, 20)
+        with open(self.checkpoint) as f:
+            self.assertEqual(sent, len(f.readlines()))
+
+        summary = import_contributions(self.api, self.csv_path, self.checkpoint)
+        self.assertEqual(sent, summary.skipped)
+        self.assertEqual(20, len(self.data.added))
+        self.assertEqual(20, len({p['person_id'] for p in self.data.added}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Unittests for instrumentation.py
+
+Usage:
+  python -m unittest tests.instrumentation_test
+"""
+
+import unittest
+
+from breeze_chms_api.instrumentation import RequestInfo, RequestStats
+
+
+def _info(call: str, elapsed: float, error=None, response_bytes=100) -> RequestInfo:
+    endpoint, command = call.split('/')
+    return RequestInfo(endpoint, command, call, 10, 200, response_bytes, elapsed, error)
+
+
+class InstrumentationTests(unittest.TestCase):
+
+    def test_stats(self):
+        stats = RequestStats()
+        # 0.01 .. 1.00 seconds
+        for i in range(1, 101):
+            stats(_info('people/', i / 100))
+        stats(_info('giving/list', 0.0001, error=ValueError('bad'), response_bytes=0))
+        got = stats.get()
+
+        people = got['people/']
+        self.assertEqual(100, people['calls'])
+        self.assertEqual(0, people['errors'])
+        self.assertEqual(0, people['abandoned'])
+        self.assertAlmostEqual(50.5, people['seconds'])
+        self.assertAlmostEqual(0.505, people['mean_seconds'])
+        self.assertEqual(1.0, people['max_seconds'])
+        self.assertEqual(1000, people['param_bytes'])
+        self.assertEqual(10000, people['response_bytes'])
+        # Percentiles are accurate to about 9%, and never more than the maximum.
+        for name, expect in (('p50_seconds', 0.50), ('p90_seconds', 0.90),
+                             ('p99_seconds', 0.99)):
+            self.assertGreaterEqual(people[name], expect)
+            self.assertLessEqual(people[name], expect * 1.1)
+            self.assertLessEqual(people[name], 1.0)
+
+        giving = got['giving/list']
+        self.assertEqual(1, giving['errors'])
+        self.assertEqual(0.0001, giving['p50_seconds'])
+
+        stats.reset()
+        self.assertEqual({}, stats.get())
+
+    def test_abandoned(self):
+        stats = RequestStats()
+        stats(_info('people/', 0.1))
+        stats(_info('people/', 0.1)._replace(abandoned=True))
+        got = stats.get()['people/']
+        self.assertEqual(2, got['calls'])
+        self.assertEqual(0, got['errors'])
+        self.assertEqual(1, got['abandoned'])
+
+    def test_percentiles(self):
+        stats = RequestStats(percentiles=[25, 99.9])
+        stats(_info('people/', 0.2))
+        got = stats.get()['people/']
+        self.assertEqual(0.2, got['p25_seconds'])
+        self.assertEqual(0.2, got['p99.9_seconds'])
+        self.assertNotIn('p50_seconds', got)
+
+
+if __name__ == '__main__':
+    unittest.main()
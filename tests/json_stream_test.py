@@ -0,0 +1,68 @@
+"""Unittests for json_stream.py
+
+Usage:
+  python -m unittest tests.json_stream_test
+"""
+
+import json
+import unittest
+
+from breeze_chms_api.json_stream import iter_array, NotAnArray
+
+
+def split_every(data: bytes, size: int) -> list:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class JsonStreamTests(unittest.TestCase):
+    VALUE = [
+        {'id': '1', 'name': 'Zoë Washburne', 'amount': 12.5, 'tags': ['a', 'b']},
+        {'id': '2', 'nested': {'list': [1, 2, [3, 4]], 'none': None}},
+        1234567,
+        -0.25e-3,
+        'a string with "quotes", commas, and ] brackets',
+        True,
+        None,
+        [],
+        {},
+    ]
+
+    def test_any_chunking(self):
+        data = json.dumps(self.VALUE, ensure_ascii=False, indent=2).encode('utf-8')
+        for size in (1, 2, 3, 7, 64, len(data)):
+            self.assertEqual(self.VALUE, list(iter_array(split_every(data, size))),
+                             f'chunk size {size}')
+
+    def test_text_chunks(self):
+        text = json.dumps(self.VALUE)
+        self.assertEqual(self.VALUE, list(iter_array([text[:10], text[10:]])))
+
+    def test_numbers_split(self):
+        # A number cut off by a chunk boundary mustn't end early.
+        self.assertEqual([123, 4], list(iter_array([b'[12', b'3, 4]'])))
+        self.assertEqual([1.5, 2], list(iter_array([b'[1.', b'5,2]'])))
+        self.assertEqual([1500.0], list(iter_array([b'[1.5e', b'3]'])))
+
+    def test_empty(self):
+        self.assertEqual([], list(iter_array([b' [ ', b' ] '])))
+
+    def test_lazy(self):
+        chunks = iter([b'[{"id": 1},', b' {"id": 2}]'])
+        items = iter_array(chunks)
+        self.assertEqual({'id': 1}, next(items))
+        # Only the first chunk has been read.
+        self.assertEqual(b' {"id": 2}]', next(chunks))
+
+    def test_not_an_array(self):
+        with self.assertRaises(NotAnArray) as context:
+            list(iter_array([b'{"errors":', b' "bad"}']))
+        self.assertEqual({'errors': 'bad'}, context.exception.value)
+
+    def test_malformed(self):
+        for bad in [b'', b'  ', b'[1,', b'[1 2]', b'[1,]', b'[{"a":', b'[1}']:
+            with self.assertRaises(json.JSONDecodeError, msg=bad):
+                list(iter_array([bad]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,603 @@
+"""A stand-in Breeze server for tests, load tests and benchmarks.
+
+MockBreezeServer serves the Breeze API calls BreezeApi makes from a local
+HTTP server, with synthetic people, profile fields, contributions, events
+and tags from tests.synthetic. Responses can be slowed down
+(latency, jitter), some can fail (error_rate), and requests can be limited
+the way Breeze limits them, with HTTP 429 and Retry-After (rate_limit).
+Changes (adding people or contributions, attendance, tags) are kept until
+the server stops.
+
+BreezeApi insists on an https://*.breezechms.com url, so server.api()
+returns a BreezeApi whose session sends that url's requests to the local
+server instead:
+
+  with MockBreezeServer(people=10000, latency=0.05) as server:
+      api = server.api()
+      people = list(api.iter_people(details=True))
+
+Tests derive from MockBreezeTestCase, which starts one server for the
+class, and give each test its own data with serve(). Every call the data
+answers is kept in its calls, so tests can check what was asked for.
+
+Or run a server for other programs to use:
+
+  python -m benchmarks.mock_server [people] [latency]
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import json
+import math
+import random
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from breeze_chms_api.breeze import BreezeApi, DEFAULT_POOL_SIZE
+from .synthetic import (make_contributions, make_events, make_funds,
+                        make_profile_fields, make_profiles, make_tags)
+
+# The url BreezeApi is given. Its requests go to the local server.
+MOCK_BREEZE_URL = 'https://mock.breezechms.com'
+MOCK_API_KEY = 'mock-api-key'
+
+# Status returned for injected errors
+INJECTED_ERROR_STATUS = 503
+
+
+class _NotFound(Exception):
+    """No such call, or no such thing to act on."""
+
+
+def _flag(value) -> bool:
+    """
+    :param value: A parameter like details or include_totals
+    :return: True if it's turned on
+    """
+    return str(value).lower() in ('1', 'true')
+
+
+def _summary(person: dict) -> dict:
+    """
+    :param person: A full profile
+    :return: The person as list_people() returns them without details
+    """
+    return {k: v for k, v in person.items() if k not in ('details', 'family')}
+
+
+class MockBreezeData(object):
+    """The data a MockBreezeServer serves, and the calls that read and change it."""
+
+    def __init__(self, people: int = 1000, fields: int = 120,
+                 contributions_per_person: float = 4, weeks: int = 52,
+                 seed: int = 0):
+        """
+        Generate data.
+        :param people: Number of people
+        :param fields: About how many profile fields
+        :param contributions_per_person: Average contributions per person
+        :param weeks: Weeks of events
+        :param seed: Random seed
+        """
+        self.lock = threading.Lock()
+        self.profile_fields = make_profile_fields(fields, seed=seed)
+        self.people: Dict[str, dict] = {
+            person['id']: person
+            for person in make_profiles(self.profile_fields, people, seed=seed)}
+        self.contributions: Dict[str, dict] = {
+            gift['id']: gift
+            for gift in make_contributions(list(self.people.values()),
+                                           contributions_per_person, seed=seed)}
+        self.funds = make_funds()
+        self.events: Dict[str, dict] = {event['id']: event
+                                        for event in make_events(weeks, seed=seed)}
+        # instance id -> person id -> check out time
+        self.attendance: Dict[str, Dict[str, str]] = {}
+        self.tags = make_tags()
+        # tag id -> person ids
+        self.tagged: Dict[str, set] = {tag['id']: set() for tag in self.tags}
+        self._next_id = 90000000
+        # handler name (e.g. 'people_', 'person', 'giving_add') -> the
+        # parameters of each call it answered
+        self.calls: Dict[str, List[Dict[str, str]]] = {}
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return str(self._next_id)
+
+    def handle(self, endpoint: str, command: str, params: Dict[str, str]):
+        """
+        Carry out a call.
+        :param endpoint: e.g. 'people'
+        :param command: e.g. 'list', or '' for the endpoint itself
+        :param params: Request parameters
+        :return: The response, ready to be sent as JSON
+        :raises: _NotFound if there's no such call
+        """
+        handler = getattr(self, f'_{endpoint}_{command}'.replace('/', '_'), None)
+        if handler is None and endpoint == 'people' and command.isdigit():
+            handler = self._person
+        if handler is None:
+            raise _NotFound(f'No such call {endpoint}/{command}')
+        with self.lock:
+            self.calls.setdefault(handler.__name__[1:], []).append(params)
+            return handler(command, params)
+
+    # ---------- account
+
+    def _account_summary(self, command, params):
+        return {'id': '1234', 'name': 'Mock Church', 'subdomain': 'mock',
+                'status': '1', 'created_on': '2015-01-01 00:00:00',
+                'details': {'timezone': 'America/Chicago',
+                            'country': {'id': '2', 'name': 'United States',
+                                        'abbreviation': 'USA'}}}
+
+    # ---------- people
+
+    def _people_(self, command, params):
+        people = list(self.people.values())
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', len(people)))
+        page = people[offset:offset + limit]
+        if _flag(params.get('details')):
+            return page
+        return [_summary(person) for person in page]
+
+    def _person(self, command, params):
+        person = self.people.get(command)
+        if person is None:
+            return {'errors': {'person_id': 'Person not found'}}
+        return person
+
+    def _update_fields(self, person: dict, fields_json: str) -> None:
+        for field in json.loads(fields_json or '[]'):
+            person['details'][str(field.get('field_id'))] = field.get('response')
+
+    def _people_add(self, command, params):
+        person_id = self._new_id()
+        person = {'id': person_id,
+                  'first_name': params.get('first', ''),
+                  'force_first_name': params.get('first', ''),
+                  'last_name': params.get('last', ''),
+                  'nick_name': '', 'middle_name': '', 'maiden_name': '',
+                  'path': 'img/profiles/generic/gray.png',
+                  'details': {'person_id': person_id}, 'family': []}
+        self._update_fields(person, params.get('fields_json'))
+        self.people[person_id] = person
+        return person
+
+    def _people_update(self, command, params):
+        person = self.people.get(params.get('person_id'))
+        if person is None:
+            return {'errors': {'person_id': 'Person not found'}}
+        self._update_fields(person, params.get('fields_json'))
+        return person
+
+    # ---------- profile fields
+
+    def _profile_(self, command, params):
+        return self.profile_fields
+
+    # ---------- events
+
+    def _events_(self, command, params):
+        start = params.get('start', '')
+        end = params.get('end', '9999')
+        events = [event for event in self.events.values()
+                  if start <= event['start_datetime'][:10] <= end and
+                  params.get('category_id', event['category_id']) == event['category_id']]
+        return events[:int(params.get('limit', 500))]
+
+    def _events_list_event(self, command, params):
+        event = self.events.get(params.get('instance_id'))
+        return event if event else {'errors': {'instance_id': 'Event not found'}}
+
+    def _events_calendars_list(self, command, params):
+        return [{'id': '1', 'oid': '1234', 'name': 'Main', 'color': '#5d8ab8'},
+                {'id': '2', 'oid': '1234', 'name': 'Ministries', 'color': '#8ab85d'}]
+
+    def _events_add(self, command, params):
+        event = {'id': self._new_id(), 'oid': '1234', 'event_id': self._new_id(),
+                 'name': params.get('name', ''),
+                 'category_id': params.get('category_id', '1'),
+                 'start_datetime': params.get('starts_on', ''),
+                 'end_datetime': params.get('ends_on', '')}
+        self.events[event['id']] = event
+        return event
+
+    def _attendance(self, params) -> Tuple[Dict[str, str], str]:
+        instance_id = params.get('instance_id')
+        if instance_id not in self.events:
+            raise _NotFound(f'No event {instance_id}')
+        return self.attendance.setdefault(instance_id, {}), params.get('person_id')
+
+    def _events_attendance_add(self, command, params):
+        attendance, person_id = self._attendance(params)
+        if person_id not in self.people:
+            return False
+        if params.get('direction') == 'out':
+            attendance[person_id] = f'{time.strftime("%Y-%m-%d %H:%M:%S")}'
+        else:
+            attendance.setdefault(person_id, '0000-00-00 00:00:00')
+        return True
+
+    def _events_attendance_delete(self, command, params):
+        attendance, person_id = self._attendance(params)
+        return attendance.pop(person_id, None) is not None
+
+    def _events_attendance_list(self, command, params):
+        attendance, _ = self._attendance(params)
+        records = []
+        for person_id, check_out in attendance.items():
+            record = {'instance_id': params['instance_id'], 'person_id': person_id,
+                      'check_out': check_out}
+            if _flag(params.get('details')):
+                record['details'] = _summary(self.people[person_id])
+            records.append(record)
+        return records
+
+    def _events_attendance_eligible(self, command, params):
+        self._attendance(params)
+        return [_summary(person) for person in self.people.values()]
+
+    # ---------- contributions
+
+    def _giving_list(self, command, params):
+        start = params.get('start', '')
+        end = params.get('end', '9999')
+        person_id = params.get('person_id')
+        return [gift for gift in self.contributions.values()
+                if start <= gift['date'] <= end and
+                (person_id is None or gift['person_id'] == person_id)]
+
+    def _giving_add(self, command, params):
+        payment_id = self._new_id()
+        funds = json.loads(params.get('funds_json') or '[]')
+        self.contributions[payment_id] = {
+            'id': payment_id, 'payment_id': payment_id,
+            'person_id': params.get('person_id'),
+            'date': params.get('date', ''),
+            'amount': params.get('amount', ''),
+            'method': params.get('method', ''),
+            'batch_num': params.get('batch_number', ''),
+            'batch_name': params.get('batch_name', ''),
+            'funds': funds,
+        }
+        return {'success': True, 'payment_id': payment_id}
+
+    def _giving_edit(self, command, params):
+        gift = self.contributions.pop(params.get('payment_id'), None)
+        if gift is None:
+            return {'errors': {'payment_id': 'Contribution not found'}}
+        gift = dict(gift)
+        gift.update({k: v for k, v in params.items() if k in gift})
+        gift['id'] = gift['payment_id'] = self._new_id()
+        self.contributions[gift['id']] = gift
+        return {'success': True, 'new_payment_id': gift['id']}
+
+    def _giving_delete(self, command, params):
+        if self.contributions.pop(params.get('payment_id'), None) is None:
+            return {'errors': {'payment_id': 'Contribution not found'}}
+        return {'success': True, 'payment_id': params['payment_id']}
+
+    def _funds_list(self, command, params):
+        if not _flag(params.get('include_totals')):
+            return self.funds
+        totals = {}
+        for gift in self.contributions.values():
+            for fund in gift['funds']:
+                fund_id = fund.get('fund_id', fund.get('id'))
+                totals[fund_id] = totals.get(fund_id, 0) + float(fund['amount'])
+        return [dict(fund, total=f'{totals.get(fund["id"], 0):.2f}')
+                for fund in self.funds]
+
+    # ---------- pledges
+
+    def _pledges_list_campaigns(self, command, params):
+        return [{'id': '1', 'name': 'Building Campaign', 'number_of_pledges': 0,
+                 'total_pledged': 0, 'created_on': '2020-01-01 00:00:00'}]
+
+    def _pledges_list_pledges(self, command, params):
+        if params.get('campaign_id') != '1':
+            return {'errors': {'campaign_id': 'Campaign not found'}}
+        return []
+
+    # ---------- forms
+
+    def _forms_list_form_entries(self, command, params):
+        return []
+
+    def _forms_list_form_fields(self, command, params):
+        return []
+
+    def _forms_remove_form_entry(self, command, params):
+        return True
+
+    # ---------- tags
+
+    def _tags_list_tags(self, command, params):
+        return self.tags
+
+    def _tags_list_folders(self, command, params):
+        return [{'id': str(folder), 'parent_id': '0', 'name': f'Folder {folder}',
+                 'created_on': '2020-01-01 00:00:00'} for folder in range(1, 5)]
+
+    def _tag_people(self, params) -> Tuple[set, str]:
+        tagged = self.tagged.get(params.get('tag_id'))
+        if tagged is None:
+            raise _NotFound(f'No tag {params.get("tag_id")}')
+        return tagged, params.get('person_id')
+
+    def _tags_assign(self, command, params):
+        tagged, person_id = self._tag_people(params)
+        if person_id not in self.people:
+            return {'errors': {'person_id': 'Person not found'}}
+        tagged.add(person_id)
+        return True
+
+    def _tags_unassign(self, command, params):
+        tagged, person_id = self._tag_people(params)
+        tagged.discard(person_id)
+        return True
+
+    # ---------- volunteers
+
+    def _volunteers_list(self, command, params):
+        return []
+
+
+class _TokenBucket(object):
+    """Server side of rate limiting: refuses requests instead of waiting."""
+
+    def __init__(self, rate: float, burst: int,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param rate: Requests allowed per second
+        :param burst: Requests allowed at once
+        :param clock: Returns the time in seconds (for tests)
+        """
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def take(self) -> float:
+        """
+        :return: 0 if a request may go ahead, otherwise seconds until one may
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(float(self.burst),
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep connections open, as Breeze does.
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately. Without this, the body
+    # waits on the client's delayed ACK, adding ~40ms to every response.
+    disable_nagle_algorithm = True
+    server: '_Server'
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self._respond()
+
+    def _send(self, status: int, body, headers: Dict[str, str] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        owner = self.server.owner
+        owner._count('requests')
+        if self.headers.get('Api-Key') != MOCK_API_KEY:
+            owner._count('unauthorized')
+            self._send(401, {'errors': 'Invalid API key'})
+            return
+        if owner.bucket:
+            wait = owner.bucket.take()
+            if wait:
+                owner._count('rate_limited')
+                self._send(429, {'errors': 'Too many requests'},
+                           {'Retry-After': str(math.ceil(wait))})
+                return
+        delay = owner.latency + owner.rng.uniform(0, owner.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if owner.error_rate and owner.rng.random() < owner.error_rate:
+            owner._count('errors')
+            self._send(INJECTED_ERROR_STATUS, {'errors': 'Injected error'})
+            return
+
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/', 2)
+        if len(parts) < 2 or parts[0] != 'api':
+            self._send(404, {'errors': 'Not found'})
+            return
+        endpoint = parts[1]
+        command = parts[2] if len(parts) > 2 else ''
+        try:
+            body = owner.data.handle(endpoint, command, dict(parse_qsl(url.query)))
+        except _NotFound as error:
+            body = {'errors': str(error)}
+        except (ValueError, KeyError) as error:
+            body = {'errors': f'Bad request: {error}'}
+        self._send(200, body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    owner: 'MockBreezeServer'
+
+
+class _LocalAdapter(HTTPAdapter):
+    """Sends requests for MOCK_BREEZE_URL to the local server."""
+
+    def __init__(self, local_url: str, **kwargs):
+        HTTPAdapter.__init__(self, **kwargs)
+        self.local_url = local_url
+
+    def send(self, request, **kwargs):
+        request.url = self.local_url + request.url[len(MOCK_BREEZE_URL):]
+        return HTTPAdapter.send(self, request, **kwargs)
+
+
+class MockBreezeServer(object):
+    """Local HTTP server that acts like Breeze."""
+
+    def __init__(self,
+                 people: int = 1000,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit: float = None,
+                 rate_burst: int = 1,
+                 port: int = 0,
+                 seed: int = 0,
+                 data: MockBreezeData = None):
+        """
+        Create a server. It doesn't run until start() (or a with block).
+        :param people: Number of people to generate (if data isn't given)
+        :param latency: Seconds each response is delayed
+        :param jitter: Up to this many more seconds are added at random
+        :param error_rate: Fraction of requests answered with
+                           INJECTED_ERROR_STATUS instead of being done
+        :param rate_limit: If set, requests per second allowed before
+                           answering 429 Too Many Requests
+        :param rate_burst: Requests allowed back-to-back before rate_limit applies
+        :param port: Port to listen on, or 0 for any free port
+        :param seed: Random seed for the data, jitter and errors
+        :param data: Data to serve, instead of generating it
+        """
+        if not 0 <= error_rate <= 1:
+            raise ValueError('error_rate must be between 0 and 1')
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError('rate_limit must be positive')
+        self.data = data if data else MockBreezeData(people, seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = _TokenBucket(rate_limit, rate_burst) if rate_limit else None
+        self.rng = random.Random(seed)
+        self.port = port
+        self._counts_lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self._server = None
+        self._thread = None
+
+    def _count(self, what: str) -> None:
+        with self._counts_lock:
+            self.counts[what] = self.counts.get(what, 0) + 1
+
+    @property
+    def url(self) -> str:
+        """The server's real url"""
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self) -> 'MockBreezeServer':
+        """Start serving on a background thread."""
+        self._server = _Server(('127.0.0.1', self.port), _Handler)
+        self._server.owner = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='mock-breeze', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def session(self, pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+        """
+        :param pool_size: Maximum number of connections kept open
+        :return: A session that sends requests for MOCK_BREEZE_URL here
+        """
+        session = requests.Session()
+        session.mount(MOCK_BREEZE_URL, _LocalAdapter(self.url, pool_maxsize=pool_size))
+        return session
+
+    def api(self, pool_size: int = DEFAULT_POOL_SIZE, **kwargs) -> BreezeApi:
+        """
+        :param pool_size: Maximum number of connections kept open
+        :param kwargs: Other BreezeApi parameters (rate_limit, retry_policy...)
+        :return: A BreezeApi that talks to this server
+        """
+        return BreezeApi(MOCK_BREEZE_URL, MOCK_API_KEY,
+                         connection=self.session(pool_size), **kwargs)
+
+
+class MockBreezeTestCase(unittest.TestCase):
+    """Tests that share a MockBreezeServer, started with no people."""
+
+    server: MockBreezeServer
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockBreezeServer(people=0).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def serve(self, data: MockBreezeData, **kwargs) -> BreezeApi:
+        """
+        :param data: What the server answers from now on
+        :param kwargs: BreezeApi parameters, as for MockBreezeServer.api()
+        :return: A BreezeApi that talks to the server
+        """
+        self.server.data = data
+        return self.server.api(**kwargs)
+
+
+def main(args: List[str]) -> None:
+    people = int(args[0]) if args else 1000
+    latency = float(args[1]) if len(args) > 1 else 0.0
+    server = MockBreezeServer(people=people, latency=latency, port=8765)
+    server.start()
+    print(f'Serving {people} people at {server.url}/api/... '
+          f'(api key {MOCK_API_KEY}). Ctrl-C to stop.')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
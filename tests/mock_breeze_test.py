@@ -0,0 +1,85 @@
+"""Unittests for mock_breeze.py
+
+Usage:
+  python -m unittest tests.mock_breeze_test
+"""
+
+import itertools
+import unittest
+
+from breeze_chms_api.breeze import BreezeApi, BreezeError
+from breeze_chms_api.retry import RetryPolicy
+from .mock_breeze import MockBreezeServer, MOCK_BREEZE_URL, _TokenBucket
+
+
+class MockServerTests(unittest.TestCase):
+
+    def test_calls(self):
+        with MockBreezeServer(people=120) as server:
+            api = server.api()
+            people = list(api.iter_people(details=True, page_size=50))
+            self.assertEqual(120, len(people))
+            self.assertIn('details', people[0])
+            self.assertNotIn('details', api.list_people(limit=1)[0])
+            self.assertEqual(people[5], api.get_person_details(people[5]['id']))
+            self.assertRaises(BreezeError, lambda: api.get_person_details('1'))
+            self.assertTrue(api.get_profile_fields())
+
+            added = api.add_person(first='New', last='Person')
+            self.assertEqual('New', api.get_person_details(added['id'])['first_name'])
+
+            gifts = api.list_contributions(start='2024-01-01', end='2024-12-31')
+            self.assertTrue(gifts)
+            payment_id = api.add_contribution(date='2024-05-01', person_id=added['id'],
+                                              amount='10.00',
+                                              funds_json=[{'id': '500', 'amount': '10.00'}])
+            mine = api.list_contributions(start='2024-01-01', end='2024-12-31',
+                                          person_id=added['id'])
+            self.assertEqual([payment_id], [gift['id'] for gift in mine])
+
+            events = api.list_events(start='2024-01-01', end='2024-01-31')
+            self.assertTrue(events)
+            instance_id = events[0]['id']
+            summary = api.bulk_attendance([(p['id'], instance_id, 'in') for p in people[:10]])
+            self.assertEqual(10, len(summary.changed))
+            self.assertEqual(10, len(api.list_attendance(instance_id)))
+
+            tag_id = api.get_tags()[0]['id']
+            results = api.bulk_assign_tag([p['id'] for p in people[:5]], tag_id)
+            self.assertEqual([True] * 5, list(results.values()))
+            self.assertEqual(5, len(server.data.tagged[tag_id]))
+
+            calls = server.data.calls
+            self.assertEqual(4, len(calls['people_']))
+            self.assertEqual(['1', '1', '1', None],
+                             [params.get('details') for params in calls['people_']])
+            self.assertEqual(3, len(calls['person']))
+            self.assertEqual([added['id']], [params['person_id']
+                                             for params in calls['giving_add']])
+
+    def test_errors(self):
+        with MockBreezeServer(people=5, error_rate=1.0) as server:
+            api = server.api(retry_policy=RetryPolicy(max_attempts=2, backoff_base=0))
+            self.assertRaises(BreezeError, api.list_funds)
+            self.assertEqual(2, server.counts['errors'])
+
+            api = BreezeApi(MOCK_BREEZE_URL, 'wrong key', connection=server.session())
+            self.assertRaises(BreezeError, api.list_funds)
+            self.assertEqual(1, server.counts['unauthorized'])
+
+    def test_rate_limit(self):
+        with MockBreezeServer(people=5, rate_limit=1, rate_burst=2) as server:
+            # A clock that moves half a second each time it's read, so the
+            # first three requests get through and the fourth is refused once,
+            # however long the requests really take.
+            clock = itertools.count(0, 0.5)
+            server.bucket = _TokenBucket(1, 2, clock=lambda: next(clock))
+            api = server.api()
+            for _ in range(4):
+                api.list_funds()
+            self.assertEqual(1, server.counts.get('rate_limited', 0))
+            self.assertEqual(0, api.get_retry_counts()['funds/list']['failures'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""Unittests for people_sync.py
+
+Usage:
+  python -m unittest tests.people_sync_test
+"""
+
+import os
+import tempfile
+import unittest
+
+from breeze_chms_api.breeze import BreezeError
+from breeze_chms_api.people_sync import (PeopleSnapshotStore, PeopleSync,
+                                         ADDED, REMOVED, CHANGED)
+from .mock_breeze import MockBreezeData, MockBreezeTestCase
+
+
+class SyncData(MockBreezeData):
+    """
+    Mock Breeze people. get_person_details() fails for the ids in broken,
+    and list_people(details=True) leaves them out, or fails if bulk_broken.
+    """
+
+    def __init__(self):
+        MockBreezeData.__init__(self, people=0)
+        self.broken = set()
+        self.bulk_broken = False
+
+    def add(self, person_id: str, first: str, email: str = ''):
+        self.people[person_id] = {
+            'id': person_id, 'first_name': first, 'last_name': 'Last',
+            'details': {'email': email}}
+
+    @property
+    def bulk_calls(self) -> int:
+        """Number of list_people(details=True) calls"""
+        return sum(1 for params in self.calls.get('people_', []) if params.get('details'))
+
+    @property
+    def detail_calls(self) -> int:
+        """Number of get_person_details() calls"""
+        return len(self.calls.get('person', []))
+
+    def _people_(self, command, params):
+        people = MockBreezeData._people_(self, command, params)
+        if not params.get('details'):
+            return people
+        if self.bulk_broken:
+            return {'errors': {'details': 'Server error'}}
+        return [person for person in people if person['id'] not in self.broken]
+
+    def _person(self, command, params):
+        if command in self.broken:
+            return {'errors': {'person_id': 'Server error'}}
+        return MockBreezeData._person(self, command, params)
+
+
+class PeopleSyncTests(MockBreezeTestCase):
+
+    def setUp(self):
+        self.data = SyncData()
+        for i in range(5):
+            self.data.add(str(i), f'First{i}')
+        self.api = self.serve(self.data)
+        self.store = PeopleSnapshotStore(':memory:')
+        self.addCleanup(self.store.close)
+        self.now = 0
+        self.syncer = PeopleSync(self.api, self.store, bulk_threshold=3,
+                                 clock=self._tick)
+        self.events = []
+
+    def _tick(self):
+        self.now += 1
+        return self.now
+
+    def sync(self, **kwargs):
+        self.events = []
+        return self.syncer.sync(on_event=self.events.append, **kwargs)
+
+    def test_first_sync_is_bulk(self):
+        stats = self.sync()
+        self.assertEqual(5, stats[ADDED])
+        self.assertEqual(1, self.data.bulk_calls)
+        self.assertEqual(0, self.data.detail_calls)
+        self.assertEqual(5, len(self.store))
+        self.assertEqual({ADDED}, {e.kind for e in self.events})
+        self.assertEqual('First2', self.store.get('2')['first_name'])
+
+    def test_steady_state(self):
+        self.sync()
+        stats = self.sync()
+        self.assertEqual({ADDED: 0, REMOVED: 0, CHANGED: 0, 'fetched': 0, 'failed': 0}, stats)
+        self.assertEqual(0, self.data.detail_calls)
+        self.assertEqual([], self.events)
+
+    def test_churn(self):
+        self.sync()
+        self.data.add('9', 'Newbie')
+        self.data.people['1']['first_name'] = 'Renamed'
+        del self.data.people['3']
+        stats = self.sync()
+        self.assertEqual(2, self.data.detail_calls)
+        self.assertEqual(1, stats[ADDED])
+        self.assertEqual(1, stats[REMOVED])
+        self.assertEqual(1, stats[CHANGED])
+        by_kind = {e.kind: e for e in self.events}
+        self.assertEqual('9', by_kind[ADDED].person_id)
+        self.assertEqual('First1', by_kind[CHANGED].previous['first_name'])
+        self.assertEqual('Renamed', by_kind[CHANGED].current['first_name'])
+        self.assertEqual('3', by_kind[REMOVED].person_id)
+        self.assertIsNone(by_kind[REMOVED].current)
+        self.assertIsNone(self.store.get('3'))
+
+    def test_refresh_oldest(self):
+        self.sync()
+        # Not visible in the summary
+        self.data.people['0']['details']['email'] = 'new@example.com'
+        self.assertEqual(0, self.sync()[CHANGED])
+        stats = self.sync(refresh_oldest=2)
+        self.assertEqual(2, stats['fetched'])
+        self.assertEqual(1, stats[CHANGED])
+        self.assertEqual('0', self.events[0].person_id)
+        # Those two are now the newest, so the next refresh gets others.
+        self.sync(refresh_oldest=2)
+        self.assertEqual(['4'], self.store.oldest(1))
+
+    def test_full(self):
+        self.sync()
+        stats = self.sync(full=True)
+        self.assertEqual(5, stats['fetched'])
+        self.assertEqual(0, stats[CHANGED])
+        self.assertEqual(2, self.data.bulk_calls)
+
+    def test_failure_rolls_back(self):
+        def fail(event):
+            raise RuntimeError('boom')
+        self.assertRaises(RuntimeError, lambda: self.syncer.sync(on_event=fail))
+        self.assertEqual(0, len(self.store))
+
+    def test_fetch_failure(self):
+        self.sync()
+        self.data.add('9', 'Newbie')
+        self.data.people['1']['first_name'] = 'Renamed'
+        self.data.people['2']['first_name'] = 'Renamed'
+        self.data.broken = {'2', '9'}
+        stats = self.sync()
+        self.assertEqual(1, stats['fetched'])
+        self.assertEqual(2, stats['failed'])
+        self.assertEqual({'2', '9'}, set(self.syncer.failures))
+        self.assertIsInstance(self.syncer.failures['9'], BreezeError)
+        self.assertEqual(['1'], [e.person_id for e in self.events])
+        self.assertEqual('Renamed', self.store.get('1')['first_name'])
+        self.assertEqual('First2', self.store.get('2')['first_name'])
+        self.assertIsNone(self.store.get('9'))
+
+        # Retried next time
+        self.data.broken = set()
+        stats = self.sync()
+        self.assertEqual(2, stats['fetched'])
+        self.assertEqual(0, stats['failed'])
+        self.assertEqual({}, self.syncer.failures)
+        self.assertEqual({ADDED: '9', CHANGED: '2'},
+                         {e.kind: e.person_id for e in self.events})
+
+    def test_bulk_fetch_failure(self):
+        self.data.broken = {'2'}
+        stats = self.sync()
+        self.assertEqual(4, stats[ADDED])
+        self.assertEqual(1, stats['failed'])
+        self.assertEqual(['2'], list(self.syncer.failures))
+        self.assertIsInstance(self.syncer.failures['2'], BreezeError)
+        self.assertIsNone(self.store.get('2'))
+
+        self.data.broken = set()
+        self.data.bulk_broken = True
+        stats = self.sync(full=True)
+        self.assertEqual(0, stats['fetched'])
+        self.assertEqual(5, stats['failed'])
+        self.assertEqual({str(i) for i in range(5)}, set(self.syncer.failures))
+        self.assertIsInstance(self.syncer.failures['0'], BreezeError)
+        self.assertEqual(4, len(self.store))
+
+        # Retried next time
+        self.data.bulk_broken = False
+        stats = self.sync()
+        self.assertEqual(0, stats['failed'])
+        self.assertEqual(['2'], [e.person_id for e in self.events])
+        self.assertEqual(5, len(self.store))
+
+    def test_persistent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'people.sqlite')
+            store = PeopleSnapshotStore(path)
+            PeopleSync(self.api, store).sync()
+            store.close()
+            store = PeopleSnapshotStore(path)
+            self.assertEqual(5, len(list(store.iter_people())))
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Unittests for profile_cache.py
+
+Usage:
+  python -m unittest tests.profile_cache_test
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from breeze_chms_api.profile_cache import ProfileFieldCache
+
+TEST_FILES_DIR = os.path.join(os.path.split(__file__)[0], 'test_files')
+URL = 'https://demo.breezechms.com'
+
+
+class ProfileCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'sub', 'profile.json')
+        self.now = 1000.0
+        self.cache = ProfileFieldCache(self.path, ttl=60, clock=lambda: self.now)
+        with open(os.path.join(TEST_FILES_DIR, 'profiles.json'), 'r') as f:
+            self.fields = json.load(f)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.load(URL))
+        self.cache.save(URL, self.fields)
+        self.assertEqual(self.fields, self.cache.load(URL))
+
+    def test_expired(self):
+        self.cache.save(URL, self.fields)
+        self.now += 61
+        self.assertIsNone(self.cache.load(URL))
+
+    def test_other_account(self):
+        self.cache.save(URL, self.fields)
+        self.assertIsNone(self.cache.load('https://other.breezechms.com'))
+
+    def test_damaged(self):
+        self.cache.save(URL, self.fields)
+        with open(self.path, 'r') as f:
+            saved = json.load(f)
+        saved['profile_fields'][0]['name'] = 'Tampered'
+        with open(self.path, 'w') as f:
+            json.dump(saved, f)
+        self.assertIsNone(self.cache.load(URL))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(self.cache.load(URL))
+
+    def test_clear(self):
+        self.cache.save(URL, self.fields)
+        self.cache.clear()
+        self.assertFalse(os.path.exists(self.path))
+        self.cache.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import csv
+import io
 import unittest
 import os
 import json
@@ -5,6 +7,8 @@ from typing import List
 from breeze_chms_api.profile_helper import (join_dicts,
                                             ProfileHelper,
                                             compare_profiles,
+                                            HouseholdIndex,
+                                            HouseholdMember,
                                             _AddressExtractor,
                                             _extract_name)
 
@@ -60,6 +64,25 @@ class HelperTests(unittest.TestCase):
             else:
                 self.assertIsNone(lv, f'Got unexpected left {lv}')
 
+    def test_merge_orders(self):
+        # Orders produced by the original OrderedDict version of join_dicts
+        self._validate_merge(list('abcdef'), list('fedcba'), list('fedcba'))
+        self._validate_merge(list('xaybzc'), list('abc'), list('abcxyz'))
+        self._validate_merge(list('abc'), list('pqr'), list('apbqcr'))
+        self._validate_merge(list('cab'), list('abcd'), list('abcd'))
+        self._validate_merge(list('badcfe'), list('abcdefg'), list('abcdefg'))
+        self._validate_merge([], list('abc'), list('abc'))
+        self._validate_merge(list('abc'), [], list('abc'))
+        self.assertEqual(join_dicts(None, None), {})
+
+    def test_merge_large(self):
+        # Reversed order is the worst case for moving keys around
+        keys = [str(k) for k in range(100000)]
+        result = join_dicts(dict.fromkeys(keys, 'r'),
+                            dict.fromkeys(reversed(keys), 'l'))
+        self.assertEqual(list(result), keys[::-1])
+        self.assertEqual(result['0'], ('r', 'l'))
+
     def test_name(self):
         # Testing various name extractions
         test_id = '1463'
@@ -127,6 +150,268 @@ class HelperTests(unittest.TestCase):
         self.assertEqual(['1600 Pennsylvania AV;Rm 222;Washington DC 99999'],
                          result)
 
+    def test_process_member_profile(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            field_spec, profiles = json.load(f)
+        helper = ProfileHelper(field_spec)
+        for profile in profiles:
+            # Same values, in the same order, as asking each extractor
+            expected = {}
+            for field_id, extractor in helper.id_to_field.items():
+                value = extractor.get_value(profile)
+                if value:
+                    expected[field_id] = value
+            result = helper.process_member_profile(profile)
+            self.assertEqual(list(expected.items()), list(result.items()))
+
+        result = helper.process_member_profile({'id': '1', 'first_name': 'Solo'})
+        self.assertEqual(result, {'name': 'Solo'})
+
+    def test_lazy_profile(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            field_spec, profiles = json.load(f)
+        helper = ProfileHelper(field_spec)
+        for lazy, profile in zip(helper.lazy_profiles(profiles), profiles):
+            expected = helper.process_member_profile(profile)
+            self.assertEqual(lazy.id, profile['id'])
+            for field_id in helper.id_to_field:
+                self.assertEqual(lazy.get(field_id), expected.get(field_id))
+                self.assertEqual(field_id in lazy, field_id in expected)
+            self.assertEqual(list(lazy.to_dict().items()), list(expected.items()))
+        lazy = helper.lazy_profile({'id': '1', 'first_name': 'Solo'})
+        self.assertEqual(lazy['name'], 'Solo')
+        self.assertIsNone(lazy.get('family'))
+        self.assertEqual(lazy.get('no such field', 'none'), 'none')
+        with self.assertRaises(KeyError):
+            _ = lazy['family']
+
+    def test_lazy_profile_only_extracts_fields_used(self):
+        field_spec = [{'name': 'Main', 'fields': [
+            {'field_id': '1', 'field_type': 'dropdown', 'name': 'Status'},
+            {'field_id': '2', 'field_type': 'email', 'name': 'Email'},
+        ]}]
+        helper = ProfileHelper(field_spec)
+        # The dropdown value is malformed, so extracting it would fail.
+        profile = {'id': '7', 'first_name': 'Pat', 'details': {
+            '1': 'not a dict',
+            '2': [{'address': 'pat@example.com', 'field_type': 'email_primary'}]}}
+        lazy = helper.lazy_profile(profile)
+        email = lazy['2']
+        self.assertEqual(email, 'pat@example.com')
+        self.assertIs(lazy['2'], email)
+        self.assertEqual(lazy['name'], 'Pat')
+
+        # to_dict() extracts the rest, after some fields were read.
+        profile['details']['1'] = {'value': '3', 'name': 'Member'}
+        lazy = helper.lazy_profile(profile)
+        self.assertEqual(lazy['2'], 'pat@example.com')
+        self.assertEqual(list(helper.process_member_profile(profile).items()),
+                         list(lazy.to_dict().items()))
+
+    def test_projection(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            field_spec, profiles = json.load(f)
+        full = ProfileHelper(field_spec)
+        helper = ProfileHelper(field_spec,
+                               fields=['Communication:Email', '605365827',
+                                       'No Such:Field'])
+        self.assertEqual(['name', '605365827', '485792520'], list(helper.id_to_name))
+        expected = {person_id: {f: v for f, v in values.items() if f in helper.id_to_name}
+                    for person_id, values in full.process_profiles(profiles).items()}
+        self.assertEqual(expected, helper.process_profiles(profiles))
+        self.assertIsNone(helper.lazy_profile(profiles[0]).get('family'))
+
+        helper = ProfileHelper(field_spec, sections=['Family', 'Spiritual Gifts'],
+                               fields=['Main:Age'])
+        self.assertEqual(['name', '756872714', '2114298826', '2114298985',
+                          '2114298820', '2114298825', 'family'],
+                         list(helper.id_to_name))
+        self.assertEqual(['name', 'family'],
+                         list(ProfileHelper(field_spec, fields=['Family:Family']).id_to_name))
+        self.assertEqual(['name'], list(ProfileHelper(field_spec, fields=[]).id_to_name))
+
+    def test_household_index(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            field_spec, profiles = json.load(f)
+        households = HouseholdIndex(profiles)
+        for profile in profiles:
+            family = profile.get('family')
+            family_id = households.household_of(profile['id'])
+            if not family:
+                self.assertIsNone(households.family_value(profile))
+                continue
+            self.assertEqual(family_id, family[0]['family_id'])
+            members = households.members(family_id)
+            self.assertEqual({e['person_id'] for e in family},
+                             {m.person_id for m in members})
+            for entry in family:
+                self.assertEqual(households.name(entry['person_id']),
+                                 _extract_name(entry['details']))
+        self.assertEqual(len(households), len({households.household_of(p['id'])
+                                                for p in profiles if p.get('family')}))
+        self.assertEqual([], households.members('no such family'))
+        self.assertIsNone(households.household_of('no such person'))
+
+        self.assertIn(HouseholdMember('13701083', 'Alast, Firstname1', 'Spouse'),
+                      households.members(households.household_of('13701083')))
+
+        # Family values are the same as without the index, and shared
+        # between the people in a household.
+        helper = ProfileHelper(field_spec)
+        expected = {p['id']: helper.process_member_profile(p) for p in profiles}
+        self.assertEqual(expected, helper.process_profiles(profiles))
+        self.assertEqual(expected, helper.process_profiles(profiles, households))
+        table = helper.process_profiles_columnar(profiles, households)
+        for row, values in enumerate(expected.values()):
+            self.assertEqual(values, table.row(row))
+        alast = next(p for p in profiles if p['id'] == '13701083')
+        spouse = json.loads(json.dumps(alast))
+        spouse['id'] = '13701085'
+        values = helper.process_profiles([alast, spouse], HouseholdIndex())
+        self.assertEqual(values['13701083']['family'], values['13701085']['family'])
+        self.assertIs(values['13701083']['family'][0], values['13701085']['family'][0])
+        # but each gets their own list
+        self.assertIsNot(values['13701083']['family'], values['13701085']['family'])
+
+    def test_household_index_reused(self):
+        field_spec = [{'name': 'Main', 'fields': []}]
+        helper = ProfileHelper(field_spec)
+
+        def snapshot(last_name):
+            family = [{'person_id': '1', 'family_id': '9', 'role_name': 'Spouse',
+                       'details': {'id': '1', 'first_name': 'Pat', 'last_name': last_name}},
+                      {'person_id': '2', 'family_id': '9', 'role_name': 'Spouse',
+                       'details': {'id': '2', 'first_name': 'Sam', 'last_name': 'Jones'}}]
+            return [{'id': '1', 'first_name': 'Pat', 'last_name': last_name,
+                     'family': family}]
+
+        households = HouseholdIndex()
+        before = helper.process_profiles(snapshot('Smith'), households)
+        later = snapshot('Jones')
+        for profile in later:
+            households.add(profile)
+        after = helper.process_profiles(later, households)
+        self.assertEqual(['Smith, Pat (Spouse)', 'Jones, Sam (Spouse)'],
+                         before['1']['family'])
+        self.assertEqual(['Jones, Pat (Spouse)', 'Jones, Sam (Spouse)'],
+                         after['1']['family'])
+        # Unchanged names are still shared
+        self.assertIs(before['1']['family'][1], after['1']['family'][1])
+
+    def test_household_index_moves(self):
+        def profile(person_id, family):
+            return {'id': person_id, 'family': [
+                {'person_id': member_id, 'family_id': family_id, 'role_name': role,
+                 'details': {'id': member_id, 'first_name': first, 'last_name': last}}
+                for member_id, family_id, role, first, last in family]}
+
+        households = HouseholdIndex([
+            profile('1', [('1', 'A', 'Spouse', 'Pat', 'Smith'),
+                          ('2', 'A', 'Spouse', 'Sam', 'Smith'),
+                          ('3', 'A', 'Child', 'Kim', 'Smith')])])
+        self.assertEqual(['1', '2', '3'], [m.person_id for m in households.members('A')])
+
+        # Later, Kim moves out and marries, and Sam changes their name.
+        # A name is only formatted again from the person's own profile.
+        households.add(profile('1', [('1', 'A', 'Spouse', 'Pat', 'Smith'),
+                                     ('2', 'A', 'Spouse', 'Sam', 'Jones')]))
+        self.assertEqual('Smith, Sam', households.name('2'))
+        households.add(profile('2', [('1', 'A', 'Spouse', 'Pat', 'Smith'),
+                                     ('2', 'A', 'Spouse', 'Sam', 'Jones')]))
+        households.add(profile('3', [('3', 'B', 'Spouse', 'Kim', 'Lee'),
+                                     ('4', 'B', 'Spouse', 'Lou', 'Lee')]))
+        self.assertEqual([HouseholdMember('1', 'Smith, Pat', 'Spouse'),
+                          HouseholdMember('2', 'Jones, Sam', 'Spouse')],
+                         households.members('A'))
+        self.assertEqual([HouseholdMember('3', 'Lee, Kim', 'Spouse'),
+                          HouseholdMember('4', 'Lee, Lou', 'Spouse')],
+                         households.members('B'))
+        self.assertEqual('B', households.household_of('3'))
+        self.assertEqual('Jones, Sam', households.name('2'))
+        self.assertEqual('Lee, Kim', households.name('3'))
+
+        # Household C is gone once its only member leaves.
+        households.add(profile('5', [('5', 'C', 'Head', 'Jo', 'Ray')]))
+        households.add(profile('5', [('5', 'B', 'Child', 'Jo', 'Lee')]))
+        self.assertEqual(2, len(households))
+        self.assertEqual([], households.members('C'))
+        self.assertEqual(['3', '4', '5'], [m.person_id for m in households.members('B')])
+
+    def test_interned_values(self):
+        field_spec = [{'name': 'Main', 'fields': [
+            {'field_id': '1', 'field_type': 'dropdown', 'name': 'Status'},
+            {'field_id': '2', 'field_type': 'checkbox', 'name': 'Gifts'},
+        ]}]
+        helper = ProfileHelper(field_spec)
+        # Separately parsed, so the strings start out as different objects
+        people = [json.loads('{"id": "%d", "details": {"1": {"value": "1", "name": '
+                             '"Member in good standing"}, "2": [{"name": null}, '
+                             '{"name": "Hospitality and more"}]}}' % i)
+                  for i in range(2)]
+        first, second = helper.process_profiles(people).values()
+        self.assertEqual(first['1'], 'Member in good standing')
+        self.assertIs(first['1'], second['1'])
+        self.assertEqual(first['2'], 'Hospitality and more')
+        self.assertIs(first['2'], second['2'])
+        for extractor in helper.id_to_field.values():
+            self.assertFalse(hasattr(extractor, '__dict__'))
+
+    def test_non_string_values(self):
+        field_spec = [{'name': 'Main', 'fields': [
+            {'field_id': '1', 'field_type': 'dropdown', 'name': 'Year'},
+            {'field_id': '2', 'field_type': 'checkbox', 'name': 'Years'},
+        ]}]
+        helper = ProfileHelper(field_spec)
+        profile = {'id': '1', 'first_name': 'Pat', 'details': {
+            '1': {'value': '3', 'name': 2020},
+            '2': [{'name': None}, {'name': 2021}, {'name': 'Always'}]}}
+        self.assertEqual({'name': 'Pat', '1': 2020, '2': [2021, 'Always']},
+                         helper.process_member_profile(profile))
+        self.assertEqual(2020, helper.lazy_profile(profile)['1'])
+
+    def test_process_profiles_columnar(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            field_spec, profiles = json.load(f)
+        helper = ProfileHelper(field_spec)
+        expected = helper.process_profiles(profiles)
+        table = helper.process_profiles_columnar(iter(profiles))
+        self.assertEqual(len(table), len(profiles))
+        self.assertEqual(table.person_ids, list(expected))
+        for row, (person_id, values) in enumerate(expected.items()):
+            self.assertEqual(table.row_of(person_id), row)
+            self.assertEqual(list(table.row(row).items()), list(values.items()))
+            for field_id in table.columns:
+                self.assertEqual(table.get(row, field_id), values.get(field_id))
+        self.assertIsNone(table.row_of('no such person'))
+        self.assertEqual(list(table.column('name')),
+                         [values['name'] for values in expected.values()])
+        # Repeated values are only stored once
+        self.assertEqual(len(table.values), len(set(table.values)))
+
+        spiritual_gifts = '2114298820'
+        counts = {}
+        for values in expected.values():
+            gifts = values.get(spiritual_gifts, [])
+            for gift in gifts if isinstance(gifts, list) else [gifts]:
+                counts[gift] = counts.get(gift, 0) + 1
+        self.assertEqual(table.value_counts(spiritual_gifts), counts)
+
+        out = io.StringIO()
+        table.write_csv(out, field_ids=['name', spiritual_gifts], separator='|')
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['id', 'Name', 'Spiritual Gifts:Spiritual Gifts'])
+        self.assertEqual(len(rows), len(profiles) + 1)
+        for row, (person_id, values) in zip(rows[1:], expected.items()):
+            gifts = values.get(spiritual_gifts, '')
+            self.assertEqual(row, [person_id, values['name'],
+                                   gifts if isinstance(gifts, str) else '|'.join(gifts)])
+
+    def test_process_profiles_columnar_empty(self):
+        table = ProfileHelper([]).process_profiles_columnar([])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(list(table.column('name')), [])
+
+
 class DiffTests(unittest.TestCase):
     def test_diff(self):
         with open(os.path.join(TEST_FILES_DIR, 'TestDataRef.json'), 'r') as f:
@@ -174,6 +459,46 @@ class DiffTests(unittest.TestCase):
         self.assertEqual(len(d[1]), 0)
         self.assertEqual(d[2], ['205 S Pleasant St;Los Angeles CA 12456'])
 
+    def test_diff_projection(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestDataRef.json'), 'r') as f:
+            ref_field_spec, ref_profiles = json.load(f)
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            test_field_spec, test_profiles = json.load(f)
+        sections = ['Spiritual Gifts']
+        result = compare_profiles(ProfileHelper(ref_field_spec, sections=sections),
+                                  ProfileHelper(test_field_spec, sections=sections),
+                                  ref_profiles, test_profiles)
+        full = compare_profiles(ProfileHelper(ref_field_spec),
+                                ProfileHelper(test_field_spec),
+                                ref_profiles, test_profiles)
+        expected = []
+        for name, diffs in full:
+            # The name is always compared
+            diffs = [d for d in diffs
+                     if d[0] == 'Name' or d[0].startswith('Spiritual Gifts:')]
+            if diffs:
+                expected.append((name, diffs))
+        self.assertTrue(expected)
+        self.assertEqual(expected, result)
+
+    def test_diff_workers(self):
+        with open(os.path.join(TEST_FILES_DIR, 'TestDataRef.json'), 'r') as f:
+            ref_field_spec, ref_profiles = json.load(f)
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            test_field_spec, test_profiles = json.load(f)
+        ref_helper = ProfileHelper(ref_field_spec)
+        test_helper = ProfileHelper(test_field_spec)
+        # Reordering the current profiles changes the report order,
+        # so check that the workers keep it too.
+        for cur_profiles in (test_profiles, test_profiles[::-1]):
+            serial = compare_profiles(ref_helper, test_helper,
+                                      ref_profiles, cur_profiles)
+            for workers in (2, 3, 100):
+                parallel = compare_profiles(ref_helper, test_helper,
+                                            ref_profiles, iter(cur_profiles),
+                                            workers=workers)
+                self.assertEqual(serial, parallel)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""Unittests for rate_limiter.py
+
+Usage:
+  python -m unittest tests.rate_limiter_test
+"""
+
+import threading
+import time
+import unittest
+
+from breeze_chms_api.rate_limiter import RateLimiter
+
+
+class FakeClock(object):
+    """Clock that only moves when something sleeps."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def make_limiter(self, rate=None, burst=1) -> RateLimiter:
+        self.clock = FakeClock()
+        return RateLimiter(rate, burst, clock=self.clock.time, sleep=self.clock.sleep)
+
+    def test_unlimited(self):
+        limiter = self.make_limiter()
+        for _ in range(100):
+            self.assertEqual(0, limiter.acquire())
+        self.assertEqual([], self.clock.slept)
+
+    def test_burst_then_rate(self):
+        limiter = self.make_limiter(rate=2, burst=3)
+        start = self.clock.now
+        for _ in range(3):
+            self.assertEqual(0, limiter.acquire())
+        for _ in range(4):
+            limiter.acquire()
+        # Three free, then four more at two per second.
+        self.assertAlmostEqual(2.0, self.clock.now - start)
+
+    def test_refill_capped_at_burst(self):
+        limiter = self.make_limiter(rate=1, burst=2)
+        self.clock.now += 1000
+        start = self.clock.now
+        for _ in range(3):
+            limiter.acquire()
+        self.assertAlmostEqual(1.0, self.clock.now - start)
+
+    def test_pause(self):
+        limiter = self.make_limiter()
+        limiter.pause(7.5)
+        self.assertAlmostEqual(7.5, limiter.acquire())
+        self.assertEqual(0, limiter.acquire())
+
+    def test_pause_extends_only(self):
+        limiter = self.make_limiter()
+        limiter.pause(10)
+        limiter.pause(2)
+        self.assertAlmostEqual(10, limiter.acquire())
+
+    def test_threads_share_bucket(self):
+        limiter = RateLimiter(rate=200, burst=1)
+        threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)])
+                   for _ in range(4)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 20 requests at 200/s, the first one free, take at least 95ms.
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_bad_settings(self):
+        self.assertRaises(ValueError, lambda: RateLimiter(rate=0))
+        self.assertRaises(ValueError, lambda: RateLimiter(rate=1, burst=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
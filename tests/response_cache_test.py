@@ -0,0 +1,103 @@
+"""Unittests for response_cache.py
+
+Usage:
+  python -m unittest tests.response_cache_test
+"""
+
+import unittest
+
+from breeze_chms_api.response_cache import ResponseCache
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def make_cache(self, **kwargs) -> ResponseCache:
+        self.now = 0.0
+        return ResponseCache(clock=lambda: self.now, **kwargs)
+
+    def test_ttl_for(self):
+        cache = self.make_cache(ttls={'events': 5, 'events/calendars/list': 50})
+        self.assertEqual(50, cache.ttl_for('events', 'calendars/list'))
+        self.assertEqual(5, cache.ttl_for('events', 'attendance/list'))
+        self.assertIsNone(cache.ttl_for('people', ''))
+
+    def test_hit_and_expire(self):
+        cache = self.make_cache(ttls={'funds': 10})
+        cache.put('funds', 'list', {'include_totals': '1'}, [{'id': '1'}])
+        self.assertEqual([{'id': '1'}], cache.get('funds', 'list', {'include_totals': '1'}))
+        self.assertIsNone(cache.get('funds', 'list', {}))
+        self.now = 10
+        self.assertIsNone(cache.get('funds', 'list', {'include_totals': '1'}))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+    def test_uncached_call(self):
+        cache = self.make_cache(ttls={'funds': 10})
+        cache.put('people', '', {}, [{'id': '1'}])
+        self.assertEqual(0, len(cache))
+        self.assertIsNone(cache.get('people', '', {}))
+
+    def test_returns_copy(self):
+        cache = self.make_cache()
+        response = [{'id': '1'}]
+        cache.put('funds', 'list', {}, response)
+        response[0]['id'] = 'changed'
+        got = cache.get('funds', 'list', {})
+        got[0]['id'] = 'also changed'
+        self.assertEqual([{'id': '1'}], cache.get('funds', 'list', {}))
+
+    def test_lru(self):
+        cache = self.make_cache(max_entries=2)
+        cache.put('tags', 'list_tags', {'folder_id': '1'}, 1)
+        cache.put('tags', 'list_tags', {'folder_id': '2'}, 2)
+        cache.get('tags', 'list_tags', {'folder_id': '1'})
+        cache.put('tags', 'list_tags', {'folder_id': '3'}, 3)
+        self.assertEqual(1, cache.get('tags', 'list_tags', {'folder_id': '1'}))
+        self.assertIsNone(cache.get('tags', 'list_tags', {'folder_id': '2'}))
+        self.assertEqual(3, cache.get('tags', 'list_tags', {'folder_id': '3'}))
+
+    def test_invalidate_dependents(self):
+        cache = self.make_cache()
+        cache.put('funds', 'list', {'include_totals': '1'}, [{'id': '1'}])
+        cache.put('tags', 'list_tags', {}, [{'id': '2'}])
+        cache.invalidate('giving')
+        self.assertIsNone(cache.get('funds', 'list', {'include_totals': '1'}))
+        self.assertEqual([{'id': '2'}], cache.get('tags', 'list_tags', {}))
+
+        cache = self.make_cache(dependents={})
+        cache.put('funds', 'list', {}, [{'id': '1'}])
+        cache.invalidate('giving')
+        self.assertEqual([{'id': '1'}], cache.get('funds', 'list', {}))
+
+    def test_put_after_invalidate(self):
+        cache = self.make_cache()
+        generation = cache.generation('funds')
+        cache.invalidate('giving')
+        # Fetched before the change, so not saved
+        cache.put('funds', 'list', {}, [{'id': 'old'}], generation)
+        self.assertIsNone(cache.get('funds', 'list', {}))
+        generation = cache.generation('funds')
+        cache.clear()
+        cache.put('funds', 'list', {}, [{'id': 'old'}], generation)
+        self.assertIsNone(cache.get('funds', 'list', {}))
+        # Changes to other endpoints don't matter.
+        generation = cache.generation('funds')
+        cache.invalidate('tags')
+        cache.put('funds', 'list', {}, [{'id': 'new'}], generation)
+        self.assertEqual([{'id': 'new'}], cache.get('funds', 'list', {}))
+
+    def test_invalidate(self):
+        cache = self.make_cache()
+        cache.put('tags', 'list_tags', {}, 1)
+        cache.put('tags', 'list_folders', {}, 2)
+        cache.put('funds', 'list', {}, 3)
+        cache.invalidate('tags')
+        self.assertEqual(1, len(cache))
+        self.assertEqual(3, cache.get('funds', 'list', {}))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Unittests for retry.py
+
+Usage:
+  python -m unittest tests.retry_test
+"""
+
+import unittest
+
+from breeze_chms_api.retry import RetryPolicy, RetryCounts
+
+
+class RetryTests(unittest.TestCase):
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_base=1, backoff_cap=5, jitter=False)
+        self.assertEqual([1, 2, 4, 5, 5], [policy.backoff(r) for r in range(1, 6)])
+
+    def test_backoff_jitter(self):
+        policy = RetryPolicy(backoff_base=1, backoff_cap=5)
+        for retry in range(1, 6):
+            delay = policy.backoff(retry)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5, 2 ** (retry - 1)))
+
+    def test_bad_attempts(self):
+        self.assertRaises(ValueError, lambda: RetryPolicy(max_attempts=0))
+
+    def test_counts(self):
+        counts = RetryCounts()
+        counts.record('people/', 0, 0, False)
+        counts.record('people/', 2, 1.5, True)
+        counts.record('giving/list', 1, 0.5, False)
+        got = counts.get()
+        self.assertEqual({'calls': 2, 'retries': 2, 'retry_seconds': 1.5, 'failures': 1},
+                         got['people/'])
+        self.assertEqual(1, got['giving/list']['retries'])
+        # get() returns a copy
+        got['people/']['calls'] = 99
+        self.assertEqual(2, counts.get()['people/']['calls'])
+        counts.reset()
+        self.assertEqual({}, counts.get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Unittests for snapshot.py
+
+Usage:
+  python -m unittest tests.snapshot_test
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from breeze_chms_api.snapshot import (BadSnapshot, SnapshotReader, load_snapshot,
+                                      save_snapshot, write_snapshot, MAGIC)
+from .mock_breeze import MockBreezeData, MockBreezeTestCase
+
+TEST_FILES_DIR = os.path.join(os.path.split(__file__)[0], 'test_files')
+
+
+class SnapshotTests(MockBreezeTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'people.bzs')
+        with open(os.path.join(TEST_FILES_DIR, 'TestData.json'), 'r') as f:
+            self.profile_fields, self.people = json.load(f)
+        # More people than fit in one block
+        self.many = [dict(person, id=str(1000 + index))
+                     for index in range(25) for person in self.people[:1]]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_and_load(self):
+        data = MockBreezeData(people=0)
+        data.profile_fields = self.profile_fields
+        data.people = {person['id']: person for person in self.people}
+        self.assertEqual(len(self.people), save_snapshot(self.serve(data), self.path))
+        profile_fields, people = load_snapshot(self.path)
+        self.assertEqual(self.profile_fields, profile_fields)
+        self.assertEqual(self.people, people)
+        self.assertEqual(['.bzs'], [os.path.splitext(name)[1]
+                                    for name in os.listdir(self.dir.name)])
+
+    def test_save_from_api(self):
+        # A real BreezeApi adds references from fields back to their sections.
+        api = self.serve(MockBreezeData(people=30))
+        self.assertEqual(30, save_snapshot(api, self.path, block_size=7))
+        profile_fields, people = load_snapshot(self.path)
+        self.assertEqual(api.list_people(details=True), people)
+        expected = [dict(section, fields=[
+            {k: v for k, v in field.items() if k != 'section_spec'}
+            for field in section['fields']]) for section in api.get_profile_fields()]
+        self.assertEqual(expected, profile_fields)
+        self.assertIn('section_spec', api.get_profile_fields()[0]['fields'][0])
+
+    def test_subset(self):
+        write_snapshot(self.path, self.profile_fields, self.many, block_size=4)
+        with SnapshotReader(self.path) as snapshot:
+            self.assertEqual(25, len(snapshot))
+            self.assertEqual([p['id'] for p in self.many], snapshot.person_ids())
+            self.assertEqual(self.many[13], snapshot.get('1013'))
+            self.assertEqual(self.many[13], snapshot.get(1013))
+            self.assertIsNone(snapshot.get('999'))
+            self.assertIn('1000', snapshot)
+            self.assertNotIn('999', snapshot)
+            self.assertEqual(self.many, list(snapshot.iter_people()))
+            self.assertEqual(self.profile_fields, snapshot.profile_fields)
+
+        # Subsets come back in the order saved, without duplicates.
+        subset = load_snapshot(self.path, ['1020', '1002', '999', '1003', '1002'])
+        self.assertEqual([self.many[i] for i in (2, 3, 20)], subset.people)
+        self.assertEqual([], load_snapshot(self.path, []).people)
+
+    def test_empty(self):
+        write_snapshot(self.path, self.profile_fields, [])
+        self.assertEqual((self.profile_fields, []), tuple(load_snapshot(self.path)))
+
+    def test_bad_files(self):
+        self.assertRaises(ValueError, lambda: write_snapshot(self.path, [], [], block_size=0))
+        with open(self.path, 'w') as f:
+            json.dump(self.people, f)
+        self.assertRaises(BadSnapshot, lambda: load_snapshot(self.path))
+
+        write_snapshot(self.path, self.profile_fields, self.many, block_size=4)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # Cut short
+        with open(self.path, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        self.assertRaises(BadSnapshot, lambda: load_snapshot(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC)
+        self.assertRaises(BadSnapshot, lambda: load_snapshot(self.path))
+        # Damaged block
+        middle = len(data) // 2
+        with open(self.path, 'wb') as f:
+            f.write(data[:middle] + bytes(b ^ 0xff for b in data[middle:middle + 8]) +
+                    data[middle + 8:])
+        with self.assertRaises(BadSnapshot):
+            load_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,327 @@
+"""Synthetic Breeze data for tests and benchmarks.
+
+The profile fields and profiles built here have the same shape as what
+Breeze returns from get_profile_fields() and list_people(details=True),
+with values drawn from small pools the way real dropdowns and checkboxes
+are. Everything is generated from a seed, so runs are repeatable.
+"""
+
+__author__ = 'daw30410@yahoo.com (David A. Willcox)'
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+# Types of generated profile fields, in proportions similar to a real account.
+# 'paragraph' fields are just text on the form and never have values.
+FIELD_TYPE_MIX = (
+    ['single_line'] * 8 + ['date'] * 4 + ['notes'] * 2 + ['dropdown'] * 3 +
+    ['multiple_choice'] * 3 + ['checkbox'] * 2 + ['paragraph'] * 2
+)
+
+FIELDS_PER_SECTION = 12
+
+# Profile fields of a real account, as used by the unit tests
+SAMPLE_PROFILE_FIELDS = os.path.join(os.path.dirname(__file__),
+                                     'test_files', 'profiles.json')
+
+# Fraction of a profile's fields that have a value
+DEFAULT_FILL = 0.3
+
+_FIRST_NAMES = ('Mary', 'John', 'Linda', 'James', 'Susan', 'Robert', 'Karen',
+                'Michael', 'Nancy', 'David', 'Lisa', 'William', 'Grace', 'Paul')
+_LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
+               'Miller', 'Davis', 'Wilson', 'Anderson', 'Taylor', 'Thomas')
+_CHOICES = ('Include (Default for adults)', 'Member', 'Regular Attender',
+            'Visitor', 'Active', 'Inactive', 'Yes', 'No', 'Maybe',
+            'Not Recorded', 'Married', 'Single', 'Widowed', 'Divorced')
+_ROLES = ('Head of Household', 'Spouse', 'Adult', 'Child')
+_CITIES = (('Springfield', 'IL', '62701'), ('Madison', 'WI', '53703'),
+           ('Portland', 'OR', '97201'), ('Austin', 'TX', '73301'))
+
+
+def _field(field_id: str, section_id: str, field_type: str, name: str,
+           options: List[str] = ()) -> dict:
+    return {
+        'field_id': field_id,
+        'profile_section_id': section_id,
+        'field_type': field_type,
+        'name': name,
+        'options': [{'option_id': str(100 + index), 'profile_field_id': field_id,
+                     'name': option}
+                    for index, option in enumerate(options)],
+    }
+
+
+def make_profile_fields(field_count: int = 120, seed: int = 0) -> List[dict]:
+    """
+    Build profile field definitions.
+    :param field_count: About how many fields (a phone, email, address and
+                        birthdate field are always included)
+    :param seed: Random seed
+    :return: Sections as returned by BreezeApi.get_profile_fields()
+    """
+    rng = random.Random(seed)
+    fields = [
+        _field('1000', '1', 'name', 'Name'),
+        _field('1001', '1', 'birthdate', 'Birthdate'),
+        _field('1002', '1', 'phone', 'Phone'),
+        _field('1003', '1', 'email', 'Email'),
+        _field('1004', '1', 'address', 'Address'),
+        _field('1005', '1', 'family', 'Family'),
+    ]
+    for index in range(len(fields), field_count):
+        field_type = rng.choice(FIELD_TYPE_MIX)
+        options = []
+        if field_type in ('dropdown', 'multiple_choice', 'checkbox'):
+            options = rng.sample(_CHOICES, rng.randint(2, 8))
+        section_id = str(2 + index // FIELDS_PER_SECTION)
+        fields.append(_field(str(2114300000 + index), section_id, field_type,
+                             f'Field {index}', options))
+
+    sections = {}
+    for field in fields:
+        section_id = field['profile_section_id']
+        section = sections.setdefault(section_id, {
+            'section_id': section_id,
+            'name': 'Main' if section_id == '1' else f'Section {section_id}',
+            'fields': [],
+        })
+        section['fields'].append(field)
+    return list(sections.values())
+
+
+def load_sample_profile_fields() -> List[dict]:
+    """
+    :return: The profile fields in SAMPLE_PROFILE_FIELDS, which can be
+             given to make_profiles() for profiles shaped like a real account's
+    """
+    with open(SAMPLE_PROFILE_FIELDS, 'r') as f:
+        return json.load(f)
+
+
+def _field_value(rng: random.Random, field: dict, person_id: str):
+    """
+    :return: A value for the field as it appears in a profile's details
+    """
+    field_type = field['field_type']
+    options = [o['name'] for o in field['options']]
+    if field_type in ('single_line', 'notes'):
+        return f'{field["name"]} {rng.randint(1, 50)}'
+    if field_type in ('date', 'birthdate'):
+        return f'{rng.randint(1, 12):02}/{rng.randint(1, 28):02}/{rng.randint(1940, 2020)}'
+    if field_type in ('dropdown', 'multiple_choice'):
+        index = rng.randrange(len(options))
+        return {'value': str(100 + index), 'name': options[index]}
+    if field_type == 'checkbox':
+        chosen = rng.sample(range(len(options)), rng.randint(1, len(options)))
+        return [{'name': None, 'value': 'null'}] + \
+            [{'name': options[i], 'value': str(100 + i)} for i in sorted(chosen)]
+    if field_type == 'phone':
+        return [{'field_type': 'phone',
+                 'phone_number': f'(555) {rng.randint(200, 999)}-{rng.randint(0, 9999):04}',
+                 'phone_type': rng.choice(('mobile', 'home', 'work')),
+                 'do_not_text': rng.choice(('0', '1')),
+                 'is_private': rng.choice(('0', '1'))}]
+    if field_type == 'email':
+        return [{'address': f'person{person_id}@example.com', 'is_primary': '1',
+                 'is_private': rng.choice(('0', '1')), 'field_type': 'email_primary'}]
+    if field_type == 'address':
+        city, state, zip_code = rng.choice(_CITIES)
+        return [{'field_type': 'address_primary',
+                 'street_address': f'{rng.randint(1, 9999)} Main St',
+                 'city': city, 'state': state, 'zip': zip_code,
+                 'is_primary': '1', 'is_private': '0'}]
+    return ''
+
+
+def _value_fields(profile_fields: List[dict]) -> List[dict]:
+    """
+    :param profile_fields: Field definitions
+    :return: The fields whose values are kept in a profile's details
+    """
+    return [f for section in profile_fields for f in section['fields']
+            if f['field_type'] not in ('name', 'family', 'paragraph')]
+
+
+def make_profiles(profile_fields: List[dict], count: int,
+                  fill: float = DEFAULT_FILL, seed: int = 0,
+                  first_id: int = 10000000) -> List[dict]:
+    """
+    Build profiles.
+    :param profile_fields: Field definitions from make_profile_fields()
+                           or load_sample_profile_fields()
+    :param count: Number of profiles
+    :param fill: Fraction of fields that have a value in each profile
+    :param seed: Random seed
+    :param first_id: Person id of the first profile; the rest follow it
+    :return: Profiles as returned by BreezeApi.list_people(details=True)
+    """
+    rng = random.Random(seed)
+    fields = _value_fields(profile_fields)
+    people = []
+    for index in range(count):
+        person_id = str(first_id + index)
+        first = rng.choice(_FIRST_NAMES)
+        details = {'person_id': person_id}
+        for field in fields:
+            # Breeze includes most fields, with '' if they have no value.
+            details[field['field_id']] = _field_value(rng, field, person_id) \
+                if rng.random() < fill else ''
+        people.append({
+            'id': person_id,
+            'first_name': first,
+            'force_first_name': first,
+            'last_name': rng.choice(_LAST_NAMES),
+            'nick_name': '',
+            'middle_name': rng.choice(('', '', 'Lee', 'Ann')),
+            'maiden_name': '',
+            'path': 'img/profiles/generic/gray.png',
+            'details': details,
+            'family': [],
+        })
+
+    # Group people into households of one to five.
+    index = 0
+    while index < count:
+        size = min(rng.randint(1, 5), count - index)
+        household = people[index:index + size]
+        family_id = str(first_id - 7000000 + index)
+        members = [{
+            'person_id': person['id'],
+            'family_id': family_id,
+            'role_name': _ROLES[min(position, len(_ROLES) - 1)],
+            'details': {'id': person['id'],
+                        'first_name': person['first_name'],
+                        'force_first_name': person['force_first_name'],
+                        'last_name': person['last_name']},
+        } for position, person in enumerate(household)]
+        if size > 1:
+            for person in household:
+                person['family'] = members
+        index += size
+    return people
+
+
+_FUNDS = ('General Fund', 'Building Fund', 'Missions', 'Youth', 'Benevolence')
+_METHODS = (('1', 'Cash'), ('2', 'Check'), ('3', 'Credit/Debit Online'), ('4', 'ACH'))
+_EVENT_NAMES = ('Sunday Worship', 'Wednesday Dinner', 'Youth Group', 'Choir Practice',
+                'Bible Study', 'Nursery')
+
+
+def make_later_profiles(profile_fields: List[dict], profiles: List[dict],
+                        change: float = 0.05, seed: int = 0) -> List[dict]:
+    """
+    Build a later snapshot of some profiles: a few people removed, a few
+    added, and a few with changed fields. The rest are the same objects.
+    :param profile_fields: Field definitions the profiles were built from
+    :param profiles: Profiles from make_profiles()
+    :param change: Fraction of people removed, and also added and changed
+    :param seed: Random seed
+    :return: The new profiles
+    """
+    rng = random.Random(seed)
+    fields = _value_fields(profile_fields)
+    count = int(len(profiles) * change)
+    removed = set(rng.sample(range(len(profiles)), count))
+    changed = set(rng.sample(range(len(profiles)), count)) - removed
+    later = []
+    for index, person in enumerate(profiles):
+        if index in removed:
+            continue
+        if index in changed:
+            person = dict(person, details=dict(person['details']))
+            for field in rng.sample(fields, min(3, len(fields))):
+                person['details'][field['field_id']] = \
+                    _field_value(rng, field, person['id'])
+        later.append(person)
+    later.extend(make_profiles(profile_fields, count, seed=seed + 1,
+                               first_id=20000000))
+    return later
+
+
+def make_funds() -> List[dict]:
+    """
+    :return: Funds as returned by BreezeApi.list_funds()
+    """
+    return [{'id': str(500 + index), 'name': name, 'tax_deductible': '1',
+             'is_default': '1' if index == 0 else '0',
+             'created_on': '2015-01-01 00:00:00'}
+            for index, name in enumerate(_FUNDS)]
+
+
+def make_contributions(people: List[dict], per_person: float = 4,
+                       seed: int = 0) -> List[dict]:
+    """
+    Build contributions from some of the people, on dates in 2024.
+    :param people: Profiles from make_profiles()
+    :param per_person: Average number of contributions per person
+    :param seed: Random seed
+    :return: Contributions as returned by BreezeApi.list_contributions(), by date
+    """
+    rng = random.Random(seed)
+    funds = make_funds()
+    gifts = []
+    for _ in range(int(len(people) * per_person)):
+        person = rng.choice(people)
+        method_id, method = rng.choice(_METHODS)
+        fund = rng.choice(funds)
+        amount = f'{rng.choice((5, 10, 20, 25, 50, 100, 250, 500)):.2f}'
+        date = f'2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}'
+        gifts.append({
+            'person_id': person['id'],
+            'first_name': person['first_name'],
+            'last_name': person['last_name'],
+            'date': date,
+            'paid_on': f'{date} 00:00:00',
+            'amount': amount,
+            'method_id': method_id,
+            'method': method,
+            'batch_num': str(100 + int(date[5:7])),
+            'batch_name': f'{date[:7]} Offering',
+            'funds': [{'fund_id': fund['id'], 'name': fund['name'], 'amount': amount}],
+        })
+    gifts.sort(key=lambda gift: gift['date'])
+    for index, gift in enumerate(gifts):
+        gift['id'] = gift['payment_id'] = str(7000000 + index)
+    return gifts
+
+
+def make_events(weeks: int = 52, seed: int = 0) -> List[dict]:
+    """
+    Build weekly event instances starting in January 2024.
+    :param weeks: Number of weeks of events
+    :param seed: Random seed
+    :return: Event instances as returned by BreezeApi.list_events(), by start time
+    """
+    rng = random.Random(seed)
+    first_sunday = datetime(2024, 1, 7)
+    events = []
+    for week in range(weeks):
+        for day_offset, (event_id, name) in zip(
+                (0, 3, 3, 3, 5, 0), enumerate(_EVENT_NAMES, 1)):
+            start = first_sunday + timedelta(days=week * 7 + day_offset,
+                                             hours=rng.choice((9, 10, 18, 19)))
+            events.append({
+                'id': str(8000000 + len(events)),
+                'oid': '1234',
+                'event_id': str(600 + event_id),
+                'name': name,
+                'category_id': '1' if event_id == 1 else '2',
+                'start_datetime': f'{start:%Y-%m-%d %H:%M:%S}',
+                'end_datetime': f'{start + timedelta(hours=1):%Y-%m-%d %H:%M:%S}',
+            })
+    events.sort(key=lambda event: event['start_datetime'])
+    return events
+
+
+def make_tags(count: int = 40) -> List[dict]:
+    """
+    :param count: Number of tags
+    :return: Tags as returned by BreezeApi.get_tags()
+    """
+    return [{'id': str(900000 + index), 'name': f'Tag {index}',
+             'created_on': '2020-01-01 00:00:00', 'folder_id': str(1 + index % 4)}
+            for index in range(count)]